@@ -1,13 +1,35 @@
 from django.contrib import admin
+from django.db import transaction
+from .counters import approve, refresh_comment_counts
 from .models import Comment
+from qfb_main.signals import content_changed
 
 class CommentAdmin(admin.ModelAdmin):
     list_display = ('name', 'email', 'created_on')  
     list_filter = ('approved', 'created_on')  
     search_fields = ('name', 'email', 'comment_content') 
+    actions = ['approve_comments']
 
     def approve_comments(self, request, queryset):
-        queryset.update(approved=True)
+        with transaction.atomic():
+            article_ids = approve(queryset)
+        # update() sends no post_save, so drop the affected cached cards and pages here.
+        content_changed(article_ids)
     approve_comments.short_description = "Mark selected comments as approved"
 
+    def save_model(self, request, obj, form, change):
+        # The form can change approval or move a comment, so recount rather than adjust.
+        previous = Comment.objects.filter(pk=obj.pk).values_list('news_article_id', flat=True).first()
+        super().save_model(request, obj, form, change)
+        refresh_comment_counts({obj.news_article_id, previous} - {None})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        refresh_comment_counts([obj.news_article_id])
+
+    def delete_queryset(self, request, queryset):
+        article_ids = set(queryset.values_list('news_article_id', flat=True))
+        super().delete_queryset(request, queryset)
+        refresh_comment_counts(article_ids)
+
 admin.site.register(Comment, CommentAdmin)
@@ -0,0 +1,114 @@
+"""
+Denormalised comment activity on NewsArticle.
+
+Every article carries the number of its approved comments in
+comment_count and the creation time of its newest approved comment in
+last_comment_at, so counting comments or ranking articles by activity
+never aggregates over comments_comment. The add and delete views and the
+admin approval action adjust both with single atomic F() updates in the
+same transaction as the comment change; edits and deletions in the admin
+recount the articles involved. Anything else that writes comments, such as
+a bulk update or a shell session, can leave the counters off;
+reconcile_comment_counts repairs them.
+
+Ranking articles by their comments within a time window cannot use the
+lifetime counters, so most_discussed() is a grouped COUNT over the
+window's approved comments, joined to NewsArticle for the status filter.
+"""
+from django.db.models import Count, F, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from comments.models import Comment
+from qfb_main.models import NewsArticle
+
+
+def comments_added(article_id, count, newest):
+    """
+    Records `count` newly approved comments on an article, the newest
+    created at `newest`.
+    """
+    NewsArticle.objects.filter(id=article_id).update(
+        comment_count=F('comment_count') + count,
+        last_comment_at=Greatest(Coalesce('last_comment_at', Value(newest)), Value(newest)),
+    )
+
+
+def comment_removed(comment):
+    """
+    Records that an approved comment was deleted.
+
+    last_comment_at is left as it is: the article was still active then.
+    """
+    if comment.approved:
+        NewsArticle.objects.filter(id=comment.news_article_id, comment_count__gt=0).update(
+            comment_count=F('comment_count') - 1,
+        )
+
+
+def approve(queryset):
+    """
+    Approves the comments in `queryset` and adds the ones that were not yet
+    approved to their articles' counters.
+
+    Returns:
+        The ids of the articles whose counters changed.
+    """
+    pending = queryset.filter(approved=False)
+    added = list(
+        pending.order_by().values('news_article_id').annotate(count=Count('id'), newest=Max('created_on'))
+    )
+    pending.update(approved=True)
+    for row in added:
+        comments_added(row['news_article_id'], row['count'], row['newest'])
+    return [row['news_article_id'] for row in added]
+
+
+def actual_counters():
+    """
+    Returns NewsArticle annotated with the 'actual_count' and
+    'actual_last_comment_at' recomputed from the approved comments.
+    """
+    return NewsArticle.objects.annotate(actual_count=_approved_count(), actual_last_comment_at=_approved_newest())
+
+
+def refresh_comment_counts(article_ids):
+    """
+    Recomputes the counters of the given articles from their comments in
+    one UPDATE.
+    """
+    NewsArticle.objects.filter(id__in=article_ids).update(
+        comment_count=_approved_count(),
+        last_comment_at=_approved_newest(),
+    )
+
+
+def _approved():
+    return Comment.objects.filter(news_article=OuterRef('pk'), approved=True).order_by().values('news_article')
+
+
+def _approved_count():
+    return Coalesce(Subquery(_approved().annotate(total=Count('id')).values('total')), 0)
+
+
+def _approved_newest():
+    return Subquery(_approved().annotate(newest=Max('created_on')).values('newest'))
+
+
+def most_discussed(since):
+    """
+    Returns the ids of the published articles with approved comments
+    created since `since`, most such comments first and ties broken by the
+    newest comment.
+
+    This is not read from a counter: it groups and counts the approved
+    comments in the window on every call, joining NewsArticle to keep only
+    published articles. The view caches its result for
+    MOST_DISCUSSED_REFRESH seconds.
+    """
+    return (
+        Comment.objects.filter(approved=True, created_on__gte=since, news_article__status=1)
+        .order_by().values('news_article')
+        .annotate(recent=Count('id'), newest=Max('created_on'))
+        .order_by('-recent', '-newest')
+        .values_list('news_article', flat=True)
+    )
@@ -0,0 +1,32 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from comments.write_behind import CommentQueue
+
+
+class Command(BaseCommand):
+    """
+    A custom Django management command to write queued comments to the database.
+    """
+
+    help = 'Moves comments queued by COMMENT_WRITE_BEHIND into the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Comments written per transaction.')
+        parser.add_argument('--loop', action='store_true', help='Keep flushing every COMMENT_FLUSH_INTERVAL seconds.')
+
+    def handle(self, *args, **options):
+        """
+        Drains the comment queue once, or until interrupted with --loop.
+        """
+        queue = CommentQueue()
+        while True:
+            flushed = queue.drain(options['batch_size'])
+            if not options['loop']:
+                break
+            if flushed and options['verbosity'] > 1:
+                self.stdout.write(f"Flushed {flushed} comments.")
+            time.sleep(settings.COMMENT_FLUSH_INTERVAL)
+        self.stdout.write(self.style.SUCCESS(f"Flushed {flushed} queued comments; {len(queue)} left."))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from comments.counters import actual_counters
+from qfb_main.models import NewsArticle
+from qfb_main.signals import content_changed
+
+
+class Command(BaseCommand):
+    """
+    A custom Django management command to repair drifted NewsArticle comment counters.
+    """
+
+    help = 'Recomputes comment_count and last_comment_at from the approved comments and fixes articles that drifted.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drifted articles without changing them.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Articles written together.')
+
+    def handle(self, *args, **options):
+        """
+        Compares every article's counters with its comments and reports how many were repaired.
+        """
+        rows = actual_counters().values_list(
+            'id', 'comment_count', 'last_comment_at', 'actual_count', 'actual_last_comment_at'
+        ).order_by('id')
+        drifted = []
+        checked = 0
+        for article_id, count, last, actual_count, actual_last in rows.iterator():
+            checked += 1
+            if (count, last) != (actual_count, actual_last):
+                drifted.append(NewsArticle(id=article_id, comment_count=actual_count, last_comment_at=actual_last))
+                if options['verbosity'] > 1:
+                    self.stdout.write(f"Article {article_id}: {count} -> {actual_count} comments, last {last} -> {actual_last}")
+
+        if drifted and not options['dry_run']:
+            with transaction.atomic():
+                NewsArticle.objects.bulk_update(drifted, ['comment_count', 'last_comment_at'], batch_size=options['batch_size'])
+            content_changed([article.id for article in drifted])
+        verb = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(drifted)} of {checked} articles with drifted comment counters."))
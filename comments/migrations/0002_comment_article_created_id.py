@@ -0,0 +1,17 @@
+# Generated by Django 3.2.21 on 2026-10-18 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['news_article', 'approved', 'created_on', 'id'], name='comment_article_created_id'),
+        ),
+    ]
@@ -12,9 +12,16 @@ class Comment(models.Model):
     comment_content = models.TextField()  
     created_on = models.DateTimeField(auto_now_add=True)
     approved = models.BooleanField(default=True)
+    # Provisional id of a comment that went through the write-behind queue (see comments.write_behind).
+    queue_key = models.CharField(max_length=32, unique=True, null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ["created_on"]
+        indexes = [
+            # Serves an article's comment pages and their cursors on (created_on, id), and
+            # counting each article's comments in the most discussed window.
+            models.Index(fields=['news_article', 'approved', 'created_on', 'id'], name='comment_article_created_id'),
+        ]
 
     def __str__(self):
         return f"Comment {self.content} by {self.name}"
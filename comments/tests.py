@@ -1,15 +1,50 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.test import TestCase, Client
 from django.urls import reverse
+from django.utils import timezone
 from qfb_main.models import NewsArticle, User
 from comments.models import Comment
 from unittest.mock import patch
+from io import StringIO
+from django.contrib import admin
+from django.core.management import call_command
+from django.test import RequestFactory
+from comments.admin import CommentAdmin
+from comments.counters import refresh_comment_counts
+from comments.write_behind import CommentQueue
+import tempfile
+import os
 import json
 import logging
+import shutil
+import subprocess
+from unittest import skipUnless
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Runs sendAjaxRequest from UserFeedback.js against a canned response and
+# prints the alerts and reloads it caused.
+SEND_AJAX_HARNESS = """
+const fs = require('fs');
+const vm = require('vm');
+const [script, response] = process.argv.slice(1);
+const calls = [];
+const sandbox = {
+    console,
+    document: {addEventListener() {}, cookie: ''},
+    window: {location: {reload: () => calls.push('reload')}},
+    alert: (message) => calls.push(message),
+    fetch: () => Promise.resolve({ok: true, json: () => Promise.resolve(JSON.parse(response))}),
+};
+vm.runInNewContext(fs.readFileSync(script, 'utf8'), sandbox);
+sandbox.sendAjaxRequest('/comments/add_comment/1/', null);
+setTimeout(() => console.log(JSON.stringify(calls)), 0);
+"""
+
 class TestAddCommentToArticle(TestCase):
     def setUp(self):
         self.client = Client()
@@ -78,3 +113,213 @@ class TestAddCommentToArticle(TestCase):
         logger.info(f"Test associate comment with article: Comment Article ID = {comment.news_article.id}, Expected Article ID = {self.article.id}")
 
         self.assertEqual(comment.news_article, self.article)
+
+class TestArticleComments(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test_user', email='test@example.com', password='testpassword')
+        self.other = User.objects.create_user(username='other_user', password='testpassword')
+        self.article = NewsArticle.objects.create(
+            title='Test Article',
+            slug='test-article',
+            author=self.user,
+            content='Test content',
+            source_priority=1
+        )
+        start = timezone.now()
+        for i in range(7):
+            comment = Comment.objects.create(news_article=self.article, user=self.user if i % 2 else self.other,
+                                             name='test_user', email='test@example.com', comment_content=f'Comment {i}')
+            # Comments 2 and 3 share a timestamp, so the cursor has to break the tie on id.
+            Comment.objects.filter(id=comment.id).update(created_on=start + timedelta(seconds=min(i, 7 - i, 2)))
+        Comment.objects.create(news_article=self.article, user=self.user, name='test_user', email='test@example.com',
+                               comment_content='Hidden', approved=False)
+        refresh_comment_counts([self.article.id])
+        self.url = reverse('article_comments', kwargs={'article_id': self.article.id})
+
+    def test_pages_cover_approved_comments_once_in_order(self):
+        expected = list(Comment.objects.filter(approved=True).order_by('created_on', 'id').values_list('id', flat=True))
+        seen = []
+        response = self.client.get(self.url, {'limit': 3}).json()
+        pages = 1
+        while True:
+            seen.extend(comment['id'] for comment in response['comments'])
+            if not response['next_cursor']:
+                break
+            response = self.client.get(self.url, {'limit': 3, 'cursor': response['next_cursor']}).json()
+            pages += 1
+
+        logger.info(f"Test comment pages: Pages = {pages}, Count = {response['count']}")
+
+        self.assertEqual(seen, expected)
+        self.assertEqual(pages, 3)
+        self.assertEqual(response['count'], 7)
+
+    def test_own_comments_are_marked_for_the_author_only(self):
+        self.client.force_login(self.user)
+        own = self.client.get(self.url).json()['comments']
+        self.client.logout()
+        anonymous = self.client.get(self.url).json()['comments']
+
+        self.assertEqual([c['own'] for c in own], [c['content'] in ('Comment 1', 'Comment 3', 'Comment 5') for c in own])
+        self.assertFalse(any(c['own'] for c in anonymous))
+
+    def test_first_page_is_one_query_per_lookup(self):
+        # The article's cached count and one page of comments.
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+    def test_invalid_cursor_and_missing_article(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'forged'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('article_comments', kwargs={'article_id': 99999})).status_code, 404)
+
+
+class TestCommentCounters(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test_user', email='test@example.com', password='testpassword')
+        self.article = NewsArticle.objects.create(
+            title='Test Article',
+            slug='test-article',
+            author=self.user,
+            content='Test content',
+            source_priority=1,
+            status=1
+        )
+        self.client.force_login(self.user)
+
+    def counters(self):
+        article = NewsArticle.objects.get(id=self.article.id)
+        return article.comment_count, article.last_comment_at
+
+    def test_add_and_delete_views_adjust_counters(self):
+        for i in range(3):
+            self.client.post(reverse('add_comment_to_article', kwargs={'article_id': self.article.id}), {'comment_content': f'Comment {i}'})
+        newest = Comment.objects.latest('created_on')
+        self.assertEqual(self.counters(), (3, newest.created_on))
+
+        self.client.post(reverse('delete_comment', kwargs={'comment_id': newest.id}))
+
+        logger.info(f"Test comment counters: {self.counters()}")
+
+        self.assertEqual(self.counters(), (2, newest.created_on))
+
+    def test_admin_approval_counts_only_newly_approved_comments(self):
+        comments = [
+            Comment.objects.create(news_article=self.article, user=self.user, name='test_user', email='test@example.com',
+                                   comment_content=f'Comment {i}', approved=i == 0)
+            for i in range(3)
+        ]
+        refresh_comment_counts([self.article.id])
+        request = RequestFactory().post('/')
+        request.user = self.user
+
+        CommentAdmin(Comment, admin.site).approve_comments(request, Comment.objects.all())
+
+        self.assertEqual(self.counters(), (3, comments[-1].created_on))
+
+    def test_reconcile_repairs_drift(self):
+        Comment.objects.create(news_article=self.article, user=self.user, name='test_user', email='test@example.com',
+                               comment_content='Written behind the counters')
+        out = StringIO()
+
+        call_command('reconcile_comment_counts', stdout=out)
+        call_command('reconcile_comment_counts', stdout=out)
+
+        self.assertIn('Repaired 1 of 1 articles', out.getvalue())
+        self.assertIn('Repaired 0 of 1 articles', out.getvalue())
+        self.assertEqual(self.counters()[0], 1)
+
+    def test_most_discussed_ranks_comments_in_the_window(self):
+        quiet, busy, stale = [
+            NewsArticle.objects.create(title=f'Article {i}', slug=f'article-{i}', author=self.user, content='Body',
+                                       source_priority=1, status=1)
+            for i in range(3)
+        ]
+        now = timezone.now()
+        ages = [(quiet, 5), (busy, 1), (busy, 2), (busy, 3), (stale, 0)] + [(stale, 30 + i) for i in range(50)]
+        for article, hours in ages:
+            comment = Comment.objects.create(news_article=article, user=self.user, name='test_user',
+                                             email='test@example.com', comment_content='Comment')
+            # An update bypasses auto_now_add.
+            Comment.objects.filter(id=comment.id).update(created_on=now - timedelta(hours=hours, minutes=1))
+
+        with self.settings(PAGE_CACHE_TIMEOUT=0):
+            response = self.client.get(reverse('most_discussed'))
+
+        self.assertEqual([article.id for article in response.context['articles']], [busy.id, stale.id, quiet.id])
+
+    def test_most_discussed_etag_changes_as_the_window_moves(self):
+        with patch('qfb_main.page_cache.time.time', return_value=1_000_000.0):
+            first = self.client.get(reverse('most_discussed'))
+            same = self.client.get(reverse('most_discussed'), HTTP_IF_NONE_MATCH=first['ETag'])
+        with patch('qfb_main.page_cache.time.time', return_value=1_000_000.0 + settings.MOST_DISCUSSED_REFRESH):
+            later = self.client.get(reverse('most_discussed'), HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(same.status_code, 304)
+        self.assertEqual(later.status_code, 200)
+        self.assertNotEqual(later['ETag'], first['ETag'])
+
+
+class TestCommentWriteBehind(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test_user', email='test@example.com', password='testpassword')
+        self.article = NewsArticle.objects.create(
+            title='Test Article',
+            slug='test-article',
+            author=self.user,
+            content='Test content',
+            source_priority=1,
+            status=1
+        )
+        self.client.force_login(self.user)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.queue = CommentQueue(os.path.join(directory.name, 'queue.sqlite3'))
+
+    def test_post_is_queued_then_flushed(self):
+        url = reverse('add_comment_to_article', kwargs={'article_id': self.article.id})
+        with self.settings(COMMENT_WRITE_BEHIND=True), patch('comments.write_behind.comment_queue', return_value=self.queue):
+            response = self.client.post(url, {'comment_content': 'Queued comment'})
+        data = response.json()
+
+        self.assertTrue(data['success'])
+        self.assertEqual(len(self.queue), 1)
+        self.assertFalse(Comment.objects.exists())
+
+        flushed = self.queue.drain()
+        comment = Comment.objects.get()
+
+        logger.info(f"Test write-behind: flushed {flushed}, queue_key {comment.queue_key}")
+
+        self.assertEqual(flushed, 1)
+        self.assertEqual(len(self.queue), 0)
+        self.assertEqual(comment.queue_key, data['comment_id'])
+        self.assertEqual((comment.user, comment.comment_content), (self.user, 'Queued comment'))
+        article = NewsArticle.objects.get(id=self.article.id)
+        self.assertEqual((article.comment_count, article.last_comment_at), (1, comment.created_on))
+
+    @skipUnless(shutil.which('node'), "node is not installed")
+    def test_client_accepts_both_comment_id_types(self):
+        url = reverse('add_comment_to_article', kwargs={'article_id': self.article.id})
+        direct = self.client.post(url, {'comment_content': 'Stored comment'})
+        with self.settings(COMMENT_WRITE_BEHIND=True), patch('comments.write_behind.comment_queue', return_value=self.queue):
+            queued = self.client.post(url, {'comment_content': 'Queued comment'})
+        script = os.path.join(settings.BASE_DIR, 'static', 'js', 'UserFeedback.js')
+
+        self.assertIsInstance(direct.json()['comment_id'], int)
+        self.assertIsInstance(queued.json()['comment_id'], str)
+        for response in (direct, queued):
+            result = subprocess.run(['node', '-e', SEND_AJAX_HARNESS, script, response.content.decode()],
+                                    capture_output=True, text=True, timeout=30)
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertEqual(json.loads(result.stdout), ['Comment added successfully', 'reload'])
+
+    def test_flush_skips_comments_already_stored(self):
+        queue_key = self.queue.put(self.article.id, self.user, 'Stored before the queue was cleared')
+        Comment.objects.create(news_article=self.article, user=self.user, name='test_user', email='test@example.com',
+                               comment_content='Stored before the queue was cleared', queue_key=queue_key)
+        self.queue.put(self.article.id, self.user, 'Second comment')
+        self.queue.put(self.article.id + 1, self.user, 'On a deleted article')
+
+        self.assertEqual(self.queue.drain(batch_size=2), 3)
+        self.assertEqual(Comment.objects.count(), 2)
+        self.assertEqual(NewsArticle.objects.get(id=self.article.id).comment_count, 1)
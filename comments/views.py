@@ -1,22 +1,119 @@
+from datetime import datetime
+
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from django.db.models import Q
 from django.shortcuts import render, get_object_or_404
 from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_GET, require_POST
+from .counters import comment_removed, comments_added
 from .forms import CommentForm
 from .models import Comment
 from qfb_main.models import NewsArticle
+from quickfire_bulletin.db_routers import pin_to_primary
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
 from django.views.decorators.csrf import csrf_protect
 
+CURSOR_SALT = 'comments.views'
+
+
+def encode_cursor(comment):
+    """
+    Returns an opaque, signed token pointing just past `comment`.
+    """
+    return signing.dumps([comment.created_on.isoformat(), comment.id], salt=CURSOR_SALT)
+
+
+def decode_cursor(token):
+    """
+    Returns (created_on, id) for a token, or None if it is invalid.
+    """
+    try:
+        created_on, comment_id = signing.loads(token, salt=CURSOR_SALT)
+        return datetime.fromisoformat(created_on), int(comment_id)
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+
+
+@require_GET
+def article_comments(request, article_id):
+    """
+    Returns one page of an article's approved comments as JSON, oldest first.
+
+    Pages are addressed by a keyset cursor on (created_on, id), so every
+    page is one indexed range scan however many comments the article has.
+    The 'cursor' parameter takes the 'next_cursor' of the previous page and
+    'limit' the page size, up to COMMENTS_MAX_PAGE_SIZE. 'count' is the
+    article's cached number of approved comments, and 'own' marks the
+    comments the requesting user may edit and delete.
+    """
+    article = get_object_or_404(NewsArticle.objects.only('id', 'comment_count'), id=article_id)
+    try:
+        limit = int(request.GET.get('limit', settings.COMMENTS_PAGE_SIZE))
+    except ValueError:
+        limit = settings.COMMENTS_PAGE_SIZE
+    limit = max(1, min(limit, settings.COMMENTS_MAX_PAGE_SIZE))
+
+    comments = Comment.objects.filter(news_article_id=article.id, approved=True).order_by('created_on', 'id').only(
+        'id', 'user_id', 'name', 'comment_content', 'created_on'
+    )
+    cursor = request.GET.get('cursor')
+    if cursor:
+        position = decode_cursor(cursor)
+        if position is None:
+            return JsonResponse({'success': False, 'error': 'Invalid cursor'}, status=400)
+        created_on, comment_id = position
+        comments = comments.filter(Q(created_on__gt=created_on) | Q(created_on=created_on, id__gt=comment_id))
+
+    page = list(comments[:limit + 1])
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    user_id = request.user.id if request.user.is_authenticated else None
+    response = JsonResponse({
+        'success': True,
+        'count': article.comment_count,
+        'comments': [
+            {
+                'id': comment.id,
+                'name': comment.name,
+                'content': comment.comment_content,
+                'created_on': comment.created_on.isoformat(),
+                'own': user_id is not None and comment.user_id == user_id,
+            }
+            for comment in page[:limit]
+        ],
+        'next_cursor': next_cursor,
+    })
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+@pin_to_primary
 @require_POST
 @csrf_protect 
 @login_required  
 def add_comment_to_article(request, article_id):
     """
     Adds a comment to an article identified by article_id.
+
+    Responds with JSON holding 'success', 'message' and 'comment_id', the
+    new comment's integer primary key. With COMMENT_WRITE_BEHIND on, the
+    comment is queued instead (see comments.write_behind) and 'comment_id'
+    is its provisional id, a hex string that becomes the stored comment's
+    queue_key; the comment appears on the article once the queue is flushed.
     """
-    article = get_object_or_404(NewsArticle, id=article_id)
+    article = get_object_or_404(NewsArticle.objects.only('id'), id=article_id)
     form = CommentForm(request.POST)
+    if form.is_valid() and settings.COMMENT_WRITE_BEHIND:
+        # Imported here, so web processes without write-behind never load it.
+        from .write_behind import comment_queue
+        try:
+            queue_key = comment_queue().put(article.id, request.user, form.cleaned_data['comment_content'])
+            return JsonResponse({'success': True, 'message': 'Comment added successfully', 'comment_id': queue_key})
+        except Exception as e:
+            return JsonResponse({'success': False, 'error': 'Failed to save comment'}, status=500)
     if form.is_valid():
         new_comment = form.save(commit=False)
         new_comment.news_article = article
@@ -25,13 +122,17 @@ def add_comment_to_article(request, article_id):
         new_comment.name = request.user.username
         new_comment.email = request.user.email
         try:
-            new_comment.save()
+            with transaction.atomic():
+                new_comment.save()
+                if new_comment.approved:
+                    comments_added(article.id, 1, new_comment.created_on)
             return JsonResponse({'success': True, 'message': 'Comment added successfully', 'comment_id': new_comment.id})
         except Exception as e:  
             return JsonResponse({'success': False, 'error': 'Failed to save comment'}, status=500)
     else:
         return JsonResponse({'success': False, 'error': 'Invalid form data'}, status=400)
 
+@pin_to_primary
 @require_POST
 @login_required
 def edit_comment(request, comment_id):
@@ -51,6 +152,7 @@ def edit_comment(request, comment_id):
     else:
         return JsonResponse({'success': False, 'error': 'Invalid form data'}, status=400)
     
+@pin_to_primary
 @require_POST
 @login_required
 def delete_comment(request, comment_id):
@@ -62,7 +164,9 @@ def delete_comment(request, comment_id):
     if not request.user == comment.user:
         raise PermissionDenied("You do not have permission to delete this comment.")
     try:
-        comment.delete()
+        with transaction.atomic():
+            comment.delete()
+            comment_removed(comment)
         return JsonResponse({'success': True, 'message': 'Comment deleted successfully'})
     except Exception as e:
         return JsonResponse({'success': False, 'error': 'Failed to delete comment'}, status=500)
\ No newline at end of file
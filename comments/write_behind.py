@@ -0,0 +1,207 @@
+"""
+Write-behind buffering of new comments.
+
+With COMMENT_WRITE_BEHIND on, add_comment_to_article does not insert into
+the main database. It appends the comment to a queue in a separate SQLite
+database in WAL mode (COMMENT_QUEUE_PATH) and answers at once with a
+provisional id. A flusher thread in each web process moves queued comments
+into Comment with one bulk_create per batch, so a burst of submissions
+costs the main database a few short transactions instead of one
+write-lock round per comment.
+
+The queue is committed before the request is answered, so an acknowledged
+comment survives a crash of the process. Each queued comment carries its
+provisional id into Comment.queue_key, and a flush skips keys already
+stored, so a flush interrupted between its two commits never inserts a
+comment twice. Flushes hold the queue's write lock, so processes sharing
+a queue never flush the same comments at once.
+"""
+import logging
+import sqlite3
+import threading
+import traceback
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from comments.counters import comments_added
+from comments.models import Comment
+from qfb_main.models import NewsArticle
+from qfb_main.signals import content_changed
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS queued_comment (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        queue_key TEXT NOT NULL UNIQUE,
+        article_id INTEGER NOT NULL,
+        user_id INTEGER,
+        name TEXT NOT NULL,
+        email TEXT NOT NULL,
+        comment_content TEXT NOT NULL
+    )
+"""
+
+
+class CommentQueue:
+    """
+    A durable FIFO of comments waiting to be written to the main database.
+
+    Args:
+        path: The SQLite file holding the queue; defaults to COMMENT_QUEUE_PATH.
+    """
+
+    def __init__(self, path=None):
+        self.path = str(path or settings.COMMENT_QUEUE_PATH)
+        self._local = threading.local()
+
+    def connection(self):
+        """
+        Returns this thread's connection to the queue, opening it on first use.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=settings.COMMENT_QUEUE_TIMEOUT, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            # Every acknowledged comment is on disk before the response goes out.
+            conn.execute('PRAGMA synchronous=FULL')
+            conn.execute(QUEUE_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def put(self, article_id, user, comment_content):
+        """
+        Queues a comment by `user` on an article.
+
+        Returns:
+            The comment's provisional id, which becomes its Comment.queue_key.
+        """
+        queue_key = uuid.uuid4().hex
+        self.connection().execute(
+            'INSERT INTO queued_comment (queue_key, article_id, user_id, name, email, comment_content) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (queue_key, article_id, user.id, user.username, user.email, comment_content),
+        )
+        return queue_key
+
+    def __len__(self):
+        return self.connection().execute('SELECT COUNT(*) FROM queued_comment').fetchone()[0]
+
+    def flush(self, batch_size=None):
+        """
+        Moves up to `batch_size` of the oldest queued comments into Comment.
+
+        Returns:
+            The number of comments taken off the queue.
+        """
+        batch_size = batch_size or settings.COMMENT_FLUSH_BATCH_SIZE
+        conn = self.connection()
+        # Taking the write lock first keeps other flushers out until this batch is done.
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute(
+                'SELECT seq, queue_key, article_id, user_id, name, email, comment_content '
+                'FROM queued_comment ORDER BY seq LIMIT ?',
+                (batch_size,),
+            ).fetchall()
+            if rows:
+                article_ids = _store(rows)
+                conn.execute('DELETE FROM queued_comment WHERE seq <= ?', (rows[-1][0],))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        if rows and article_ids:
+            content_changed(article_ids)
+        return len(rows)
+
+    def drain(self, batch_size=None):
+        """
+        Flushes until the queue is empty.
+
+        Returns:
+            The number of comments taken off the queue.
+        """
+        flushed = 0
+        while True:
+            moved = self.flush(batch_size)
+            flushed += moved
+            if not moved:
+                return flushed
+
+
+def _store(rows):
+    # Writes one batch in a single transaction of the main database and
+    # returns the ids of the articles that received comments. created_on is
+    # set by the flush, at most a flush interval after the submission.
+    keys = [row[1] for row in rows]
+    stored = set(Comment.objects.filter(queue_key__in=keys).values_list('queue_key', flat=True))
+    articles = set(NewsArticle.objects.filter(id__in={row[2] for row in rows}).values_list('id', flat=True))
+    comments = []
+    for _, queue_key, article_id, user_id, name, email, content in rows:
+        if queue_key in stored:
+            continue
+        if article_id not in articles:
+            logger.warning(f"Dropped queued comment {queue_key}: article {article_id} no longer exists")
+            continue
+        comments.append(Comment(
+            queue_key=queue_key, news_article_id=article_id, user_id=user_id, name=name, email=email,
+            comment_content=content,
+        ))
+    added = defaultdict(list)
+    with transaction.atomic():
+        for comment in Comment.objects.bulk_create(comments):
+            if comment.approved:
+                added[comment.news_article_id].append(comment.created_on)
+        for article_id, created in added.items():
+            comments_added(article_id, len(created), max(created))
+    return list(added)
+
+
+_queue = None
+_flusher = None
+_lock = threading.Lock()
+
+
+def comment_queue():
+    """
+    Returns this process's CommentQueue, starting its flusher thread on first use.
+    """
+    global _queue, _flusher
+    with _lock:
+        if _queue is None or _queue.path != str(settings.COMMENT_QUEUE_PATH):
+            if _flusher is not None:
+                _flusher.stop()
+            _queue = CommentQueue()
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = CommentFlusher(_queue)
+            _flusher.start()
+    return _queue
+
+
+class CommentFlusher(threading.Thread):
+    """
+    Drains a CommentQueue every COMMENT_FLUSH_INTERVAL seconds.
+    """
+
+    def __init__(self, queue, interval=None):
+        super().__init__(name='comment-flusher', daemon=True)
+        self.queue = queue
+        self.interval = settings.COMMENT_FLUSH_INTERVAL if interval is None else interval
+        self.stopping = threading.Event()
+
+    def run(self):
+        while not self.stopping.wait(self.interval):
+            try:
+                close_old_connections()
+                self.queue.drain()
+            except Exception as e:
+                # The comments stay queued and are retried on the next tick.
+                tb_str = traceback.format_exception(type(e), e, e.__traceback__)
+                logger.error(f"Failed to flush queued comments: {e}\n{''.join(tb_str)}")
+
+    def stop(self):
+        self.stopping.set()
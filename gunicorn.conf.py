@@ -0,0 +1,17 @@
+"""
+Gunicorn settings for the web process (see Procfile).
+
+The application is loaded once in the master before the workers are
+forked, so the imported modules, the compiled templates and WhiteNoise's
+index of the static files are shared by all workers through copy-on-write
+instead of being built again in each one. Freezing the garbage collector
+keeps collections in the workers from touching, and so copying, those
+shared objects.
+"""
+import gc
+
+preload_app = True
+
+
+def when_ready(server):
+    gc.freeze()
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import NewsArticle
+from .models import IngestionJob, NewsArticle
+from .search import search_backend
 from django_summernote.admin import SummernoteModelAdmin
 from django_summernote.models import Attachment
 
@@ -27,5 +28,36 @@ class NewsArticleAdmin(SummernoteModelAdmin):
             bool: True if the user is a superuser, False otherwise.
         """
         return request.user.is_superuser
+
+    def save_model(self, request, obj, form, change):
+        """
+        Marks the content as the Summernote editor's HTML before saving, so
+        NewsArticle.save() stores it sanitized as content_html rather than
+        escaped.
+        """
+        obj.content_is_html = True
+        super().save_model(request, obj, form, change)
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Searches title and content through the full-text index instead of
+        LIKE scans over search_fields.
+        """
+        if not search_term:
+            return queryset, False
+        return search_backend().filter_queryset(queryset, search_term), False
     
     admin.site.unregister(Attachment)
+
+
+@admin.register(IngestionJob)
+class IngestionJobAdmin(admin.ModelAdmin):
+    """
+    Read-only view of the ingestion jobs queued for and run by news_worker.
+    """
+    list_display = ('id', 'state', 'attempts', 'run_after', 'started_on', 'finished_on')
+    list_filter = ('state',)
+    readonly_fields = ('params', 'state', 'attempts', 'run_after', 'started_on', 'finished_on', 'result', 'last_error')
+
+    def has_add_permission(self, request):
+        return False
@@ -1,7 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class QfbMainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'qfb_main'
-    verbose_name = 'Newsarticles' 
+    verbose_name = 'Newsarticles'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from quickfire_bulletin import sqlite  # noqa: F401
+        from .search import restore_triggers
+        post_migrate.connect(restore_triggers, sender=self)
@@ -0,0 +1,827 @@
+"""
+Benchmarks run through ``manage.py benchmark <name>``.
+
+Every benchmark runs inside a transaction that is rolled back afterwards,
+or deletes what it wrote, so it can be pointed at a real database without
+leaving rows behind.
+"""
+import json
+import logging.config
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import close_old_connections, connection, connections, router, transaction
+from django.db.models import Count, Max, Q
+from django.template.loader import render_to_string
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from comments.counters import most_discussed, refresh_comment_counts
+from comments.models import Comment
+from comments.views import add_comment_to_article, encode_cursor
+from comments.write_behind import comment_queue
+from qfb_main.fragments import (
+    SUMMARY_CARD_FIELDS, card_articles, card_cache_stats, invalidate_article_cards, render_article_card,
+)
+from qfb_main.ingestion import upsert_articles
+from qfb_main.models import ArticleFingerprint, IngestionSource, NewsArticle
+from qfb_main.pipeline import fetch_news
+from qfb_main.replay import replay_pages, synthetic_payloads, write_payloads
+from qfb_main.search import search_backend
+from qfb_main.segmentation import SegmentationPool, segment_texts
+from qfb_main.summaries import render_content, summarize
+
+CORPUS_PATH = Path(__file__).resolve().parent / 'api-result.json'
+
+SEARCH_VOCABULARY = (
+    'election', 'market', 'storm', 'court', 'senate', 'vaccine', 'football', 'climate',
+    'startup', 'merger', 'wildfire', 'budget', 'tariff', 'satellite', 'festival', 'strike',
+)
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Registers a benchmark function under the given name.
+
+    Benchmark functions take the number of items to work on and return a
+    list of (label, value) pairs for the command to print.
+    """
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+@contextmanager
+def rolled_back():
+    """
+    Runs the enclosed block in a transaction that is always rolled back.
+    """
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def benchmark_author():
+    user, _ = User.objects.get_or_create(username='benchmark-author')
+    return user
+
+
+def synthetic_rows(count, author, revision=0):
+    """
+    Builds NewsArticle field values for `count` fake articles.
+
+    Rows with the same index share a title across revisions, so a second
+    call with a higher revision simulates the feed updating those articles.
+    """
+    start = timezone.make_aware(datetime(2024, 1, 1))
+    return [
+        {
+            'title': f"Benchmark article {i}",
+            'slug': f"benchmark-article-{i}",
+            'content': f"Body of benchmark article {i}, revision {revision}.",
+            'content_html': render_content(f"Body of benchmark article {i}, revision {revision}."),
+            **summarize(f"Body of benchmark article {i}, revision {revision}."),
+            'author_id': author.id,
+            'source_id': 'benchmark',
+            'source_priority': i,
+            'category': 'top',
+            'language': 'english',
+            'pub_date': start + timedelta(minutes=i),
+            'image_url': '',
+            'status': 1,
+        }
+        for i in range(count)
+    ]
+
+
+def _measure(func):
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+    return len(queries), elapsed
+
+
+def _latency_percentiles(label, latencies):
+    # The p50 and nearest-rank p99 of latencies in ms, as result rows.
+    latencies = sorted(latencies)
+    p99 = latencies[max(0, math.ceil(0.99 * len(latencies)) - 1)]
+    return [(f"{label} p50: ms", f"{statistics.median(latencies):.2f}"), (f"{label} p99: ms", f"{p99:.2f}")]
+
+
+def _median_ms(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return f"{statistics.median(timings) * 1000:.2f}"
+
+
+def _update_or_create_each(rows):
+    for row in rows:
+        defaults = dict(row)
+        title = defaults.pop('title')
+        NewsArticle.objects.update_or_create(title=title, defaults=defaults)
+
+
+@benchmark('ingest')
+def ingest_roundtrips(count):
+    """
+    Compares per-row update_or_create() with upsert_articles() for a feed
+    batch that first inserts `count` articles and then updates all of them.
+    """
+    results = []
+    for label, ingest in (
+        ('update_or_create', _update_or_create_each),
+        ('upsert_articles', upsert_articles),
+    ):
+        with rolled_back():
+            author = benchmark_author()
+            for phase, revision in (('insert', 0), ('update', 1)):
+                rows = synthetic_rows(count, author, revision)
+                queries, elapsed = _measure(lambda: ingest(rows))
+                results.append((f"{label} {phase}: queries per {count} articles", queries))
+                results.append((f"{label} {phase}: seconds", f"{elapsed:.4f}"))
+    return results
+
+
+def load_article_corpus():
+    """
+    Returns the article bodies stored in qfb_main/api-result.json.
+    """
+    with open(CORPUS_PATH, encoding='utf-8') as corpus:
+        return [article['content'] for article in json.load(corpus)['results'] if article.get('content')]
+
+
+def _sentence_ends(text, sentences):
+    ends = set()
+    cursor = 0
+    for sentence in sentences:
+        sentence = sentence.strip()
+        found = text.find(sentence, cursor)
+        if found == -1:
+            continue
+        cursor = found + len(sentence)
+        ends.add(cursor)
+    return ends
+
+
+@benchmark('segmentation')
+def segmentation_throughput(count):
+    """
+    Measures sentences per second for each segmentation backend over
+    `count` passes of the stored corpus, and scores the rule-based
+    splitter's sentence boundaries against spaCy's.
+    """
+    corpus = load_article_corpus()
+    texts = corpus * count
+    results = []
+    segmented = {}
+    for backend in ('rules', 'spacy'):
+        try:
+            segment_texts(corpus[:1], backend=backend)
+        except (ImportError, OSError) as e:
+            results.append((f"{backend}: unavailable", e))
+            continue
+        start = time.perf_counter()
+        sentences = segment_texts(texts, backend=backend)
+        elapsed = time.perf_counter() - start
+        total = sum(len(doc) for doc in sentences)
+        segmented[backend] = sentences[:len(corpus)]
+        results.append((f"{backend}: sentences", total))
+        results.append((f"{backend}: sentences per second", f"{total / elapsed:.0f}"))
+
+    if len(segmented) == 2:
+        matched = predicted = expected = 0
+        for text, rules, spacy in zip(corpus, segmented['rules'], segmented['spacy']):
+            rule_ends = _sentence_ends(text, rules)
+            spacy_ends = _sentence_ends(text, spacy)
+            matched += len(rule_ends & spacy_ends)
+            predicted += len(rule_ends)
+            expected += len(spacy_ends)
+        precision = matched / predicted if predicted else 0
+        recall = matched / expected if expected else 0
+        results.append(('rules vs spacy: boundary precision', f"{precision:.3f}"))
+        results.append(('rules vs spacy: boundary recall', f"{recall:.3f}"))
+    return results
+
+
+@benchmark('nlp')
+def nlp_scaling(count):
+    """
+    Measures articles per second through the segmentation worker pool at
+    1, 2, 4 and 8 processes, over `count` passes of the stored corpus
+    submitted in feed-page sized batches. Worker start-up, including the
+    model load, is timed separately from the steady state.
+    """
+    corpus = load_article_corpus()
+    texts = corpus * count
+    pages = [texts[i:i + 50] for i in range(0, len(texts), 50)]
+    backend = settings.SEGMENTATION_BACKEND
+    try:
+        segment_texts(corpus[:1], backend=backend)
+    except (ImportError, OSError) as e:
+        backend = 'rules'
+        results = [('spacy: unavailable, using rules', e)]
+    else:
+        results = []
+    results.append(('cpu cores', os.cpu_count()))
+    baseline = None
+    for processes in (1, 2, 4, 8):
+        start = time.perf_counter()
+        with SegmentationPool(processes=processes, backend=backend) as pool:
+            # One warm-up batch per worker, so each has loaded its model.
+            for future in [pool.submit(corpus[:1]) for _ in range(processes)]:
+                future.result()
+            ready = time.perf_counter()
+            futures = [pool.submit(page) for page in pages]
+            segmented = [sentences for future in futures for sentences in future.result()]
+            elapsed = time.perf_counter() - ready
+        rate = len(segmented) / elapsed
+        baseline = baseline or rate
+        results.append((f"{backend} x{processes}: start-up seconds", f"{ready - start:.2f}"))
+        results.append((f"{backend} x{processes}: articles per second", f"{rate:.0f} ({rate / baseline:.2f}x)"))
+    return results
+
+
+@contextmanager
+def counted_queries():
+    """
+    Counts the queries run on the default connection without keeping them,
+    unlike CaptureQueriesContext, so the count does not add to memory use.
+    """
+    counter = Counter()
+
+    def count(execute, sql, params, many, context):
+        counter['queries'] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        yield counter
+
+
+@benchmark('replay')
+def replay_ingestion(count):
+    """
+    Replays `count` synthetic articles from recorded response files through
+    the full fetch_news pipeline and reports wall time, peak traced memory,
+    queries per article and segmentation time per article.
+
+    The pipeline runs twice, each time into an empty table and rolled back:
+    once for timing and once under tracemalloc, which slows Python down.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_payloads(directory, count)
+        results.append(('payload files', len(paths)))
+        results.append(('payload MB', f"{sum(os.path.getsize(path) for path in paths) / 1e6:.1f}"))
+
+        with rolled_back():
+            User.objects.get_or_create(id=1, defaults={'username': 'newsbot'})
+            with counted_queries() as queries:
+                start = time.perf_counter()
+                stats = fetch_news(replay=paths, processes=1)
+                elapsed = time.perf_counter() - start
+        results.append(('inserted', stats['inserted']))
+        results.append(('wall seconds', f"{elapsed:.2f}"))
+        results.append(('articles per second', f"{count / elapsed:.0f}"))
+        results.append(('queries per article', f"{queries['queries'] / count:.3f}"))
+
+        with rolled_back():
+            User.objects.get_or_create(id=1, defaults={'username': 'newsbot'})
+            peak = _traced_peak(lambda: fetch_news(replay=paths, processes=1))
+        results.append(('peak traced MB', f"{peak / 1e6:.1f}"))
+
+        bodies = (article.get('content') or '' for page in replay_pages(paths) for article in page)
+        start = time.perf_counter()
+        segmented = sum(1 for _ in segment_texts(bodies))
+        results.append(('segmentation ms per article', f"{(time.perf_counter() - start) * 1000 / segmented:.3f}"))
+    return results
+
+
+@benchmark('stream')
+def streaming_memory(count):
+    """
+    Compares peak traced memory of loading one recorded response holding
+    `count` articles whole with json.load against parsing it incrementally
+    in INGEST_BATCH_SIZE batches, and of replaying it through fetch_news.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        [path] = write_payloads(directory, count, page_size=count)
+        results.append(('payload MB', f"{os.path.getsize(path) / 1e6:.1f}"))
+
+        def load_whole():
+            with open(path, encoding='utf-8') as payload:
+                for article in json.load(payload)['results']:
+                    article.get('content')
+
+        def stream_batches():
+            for batch in replay_pages([path]):
+                for article in batch:
+                    article.get('content')
+
+        for label, func in (('json.load', load_whole), ('streamed batches', stream_batches)):
+            start = time.perf_counter()
+            peak = _traced_peak(func)
+            results.append((f"{label}: peak traced MB", f"{peak / 1e6:.1f}"))
+            results.append((f"{label}: seconds", f"{time.perf_counter() - start:.2f}"))
+
+        with rolled_back():
+            User.objects.get_or_create(id=1, defaults={'username': 'newsbot'})
+            peak = _traced_peak(lambda: fetch_news(replay=[path], processes=1))
+        results.append(('fetch_news replay: peak traced MB', f"{peak / 1e6:.1f}"))
+    return results
+
+
+def _traced_peak(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@benchmark('router')
+def router_probes(count):
+    """
+    Runs `count` ORM reads and reports how many health probes the database
+    router made for them.
+    """
+    monitors = [
+        handler.monitor(alias)
+        for handler in router.routers if hasattr(handler, 'monitor')
+        for alias in ('default', *settings.DATABASE_REPLICAS)
+    ]
+    before = [monitor.stats() for monitor in monitors]
+    queries, elapsed = _measure(lambda: [NewsArticle.objects.filter(id=i).exists() for i in range(count)])
+    results = [('reads', count), ('queries', queries), ('seconds', f"{elapsed:.4f}")]
+    for monitor, old in zip(monitors, before):
+        stats = monitor.stats()
+        results.append((f"{monitor.alias}: probes", stats['probes'] - old['probes']))
+        results.append((f"{monitor.alias}: probe seconds total",
+                        f"{stats['probe_seconds_total'] - old['probe_seconds_total']:.6f}"))
+    return results
+
+
+@benchmark('cards')
+def article_card_rendering(count):
+    """
+    Renders `count` article cards with five comments each, cold and then
+    from the fragment cache, and reports the time and hit/miss counts.
+    """
+    results = []
+    with rolled_back():
+        author = benchmark_author()
+        upsert_articles(synthetic_rows(count, author))
+        articles = NewsArticle.objects.filter(source_id='benchmark')
+        Comment.objects.bulk_create([
+            Comment(news_article=article, user=author, name=author.username, comment_content=f"Comment {i}")
+            for article in articles for i in range(5)
+        ])
+        articles = list(card_articles().filter(source_id='benchmark'))
+        for label in ('cold', 'cached'):
+            before = card_cache_stats()
+            start = time.perf_counter()
+            for article in articles:
+                render_article_card(article)
+            elapsed = time.perf_counter() - start
+            after = card_cache_stats()
+            results.append((f"{label}: ms per card", f"{elapsed / count * 1000:.3f}"))
+            results.append((f"{label}: hits", after['hits'] - before['hits']))
+            results.append((f"{label}: misses", after['misses'] - before['misses']))
+    return results
+
+
+@benchmark('list')
+def list_page_bytes(count):
+    """
+    Stores `count` articles with multi-paragraph bodies and compares full
+    cards, as the home page used to show, with the summary cards it shows
+    now: bytes read from the database, bytes of HTML per three-card page
+    and the time to load a page's rows.
+    """
+    results = []
+    with rolled_back():
+        author = benchmark_author()
+        rows = synthetic_rows(count, author)
+        feed_articles = (article for payload in synthetic_payloads(count) for article in payload['results'])
+        for row, article in zip(rows, feed_articles):
+            row['content'] = article['content']
+            row['content_html'] = render_content(article['content'])
+            row.update(summarize(article['content']))
+        upsert_articles(rows)
+        for label, full in (('full rows', True), ('summary columns', False)):
+            articles = card_articles(full).filter(source_id='benchmark').order_by('-pub_date')
+            fields = [field.attname for field in NewsArticle._meta.concrete_fields] if full else SUMMARY_CARD_FIELDS
+            db_bytes = sum(len(str(value)) for row in articles.values_list(*fields) for value in row)
+            html_bytes = sum(len(render_article_card(article, full).encode()) for article in articles)
+            results.append((f"{label}: DB bytes per page", round(db_bytes / count * 3)))
+            results.append((f"{label}: card HTML bytes per page", round(html_bytes / count * 3)))
+            results.append((f"{label}: page query ms", _median_ms(lambda: list(articles.all()[:3]))))
+    return results
+
+
+@benchmark('render')
+def full_card_rendering(count):
+    """
+    Renders the full card of `count` multi-paragraph articles, bypassing the
+    card cache, from stored content_html and with the linebreaks filter the
+    template used before, and reports the time per card.
+    """
+    results = []
+    with rolled_back():
+        rows = synthetic_rows(count, benchmark_author())
+        feed_articles = (article for payload in synthetic_payloads(count) for article in payload['results'])
+        for row, article in zip(rows, feed_articles):
+            row['content'] = article['content']
+            row['content_html'] = render_content(article['content'])
+        upsert_articles(rows)
+        articles = list(card_articles(full=True).filter(source_id='benchmark'))
+        for label in ('content_html', 'linebreaks'):
+            if label == 'linebreaks':
+                for article in articles:
+                    article.content_html = ''
+            start = time.perf_counter()
+            for article in articles:
+                render_to_string('article_card.html', {'news_article': article, 'full': True})
+            results.append((f"{label}: ms per card", f"{(time.perf_counter() - start) / count * 1000:.3f}"))
+    return results
+
+
+@benchmark('comments')
+def comment_loading(count):
+    """
+    Gives one article `count` comments and reports the size of the home
+    page, which only shows the comment count, and the latency of the first
+    and the last page of the comments endpoint.
+    """
+    results = []
+    with rolled_back(), override_settings(PAGE_CACHE_TIMEOUT=0, ALLOWED_HOSTS=['testserver']):
+        author = benchmark_author()
+        upsert_articles(synthetic_rows(3, author))
+        article = NewsArticle.objects.filter(source_id='benchmark').latest('pub_date')
+        client = Client()
+        results.append(('home page bytes, no comments', len(client.get(reverse('home')).content)))
+        start = timezone.now()
+        Comment.objects.bulk_create([
+            Comment(news_article=article, user=author, name=author.username, comment_content=f"Comment {i}",
+                    created_on=start + timedelta(seconds=i))
+            for i in range(count)
+        ])
+        refresh_comment_counts([article.id])
+        invalidate_article_cards([article.id])
+        results.append((f"home page bytes, {count} comments", len(client.get(reverse('home')).content)))
+
+        url = reverse('article_comments', args=[article.id])
+        results.append(('first comments page: ms', _median_ms(lambda: client.get(url))))
+        if count <= settings.COMMENTS_PAGE_SIZE:
+            results.append(('last comments page', f"none, {count} comments fit on the first page"))
+            return results
+        last = Comment.objects.filter(news_article=article).order_by('-created_on', '-id')[settings.COMMENTS_PAGE_SIZE]
+        last_page = f"{url}?cursor={encode_cursor(last)}"
+        results.append(('last comments page: ms', _median_ms(lambda: client.get(last_page))))
+        results.append(('last comments page: comments', len(client.get(last_page).json()['comments'])))
+    return results
+
+
+@benchmark('discussed')
+def most_discussed_ranking(count):
+    """
+    Spreads 20 comments per article over `count` articles and the last
+    three days, then ranks the last day's most discussed articles by
+    counting each article's comments in the window, grouped over the
+    articles and over the comments as most_discussed() does.
+    """
+    rng = random.Random(0)
+    results = []
+    with rolled_back():
+        author = benchmark_author()
+        upsert_articles(synthetic_rows(count, author))
+        articles = list(NewsArticle.objects.filter(source_id='benchmark').values_list('id', flat=True))
+        now = timezone.now()
+        Comment.objects.bulk_create([
+            Comment(news_article_id=rng.choice(articles), user=author, name=author.username, comment_content='Comment')
+            for _ in range(count * 20)
+        ], batch_size=1000)
+        # bulk_create() stamps created_on itself; bulk_update() leaves it as set.
+        comments = list(Comment.objects.filter(news_article_id__in=articles).only('id'))
+        for comment in comments:
+            comment.created_on = now - timedelta(minutes=rng.randrange(3 * 24 * 60))
+        Comment.objects.bulk_update(comments, ['created_on'], batch_size=1000)
+
+        since = now - timedelta(hours=24)
+        joined = NewsArticle.objects.filter(
+            status=1, comments__approved=True, comments__created_on__gte=since
+        ).annotate(recent=Count('comments'), newest=Max('comments__created_on')).order_by(
+            '-recent', '-newest'
+        ).values_list('id', flat=True)[:settings.MOST_DISCUSSED_LIMIT]
+        grouped = most_discussed(since)[:settings.MOST_DISCUSSED_LIMIT]
+        results.append(('same ranking', list(joined) == list(grouped)))
+        results.append(('COUNT joined from articles: ms', _median_ms(lambda: list(joined.all()))))
+        results.append(('COUNT grouped over comments: ms', _median_ms(lambda: list(grouped.all()))))
+        results.append(('grouped plan', grouped.explain().replace('\n', '; ')))
+    return results
+
+
+def _comment_burst(article, users, per_user):
+    # Posts per_user comments from each user in its own thread at once and
+    # returns the response latencies in ms and the number of failed posts.
+    factory = RequestFactory()
+    url = reverse('add_comment_to_article', args=[article.id])
+    latencies = []
+    failures = []
+    start = threading.Barrier(len(users))
+
+    def post_comments(user):
+        start.wait()
+        try:
+            for i in range(per_user):
+                request = factory.post(url, {'comment_content': f"Burst comment {i} from {user.username}"})
+                request.user = user
+                request._dont_enforce_csrf_checks = True
+                began = time.perf_counter()
+                response = add_comment_to_article(request, article.id)
+                latencies.append((time.perf_counter() - began) * 1000)
+                if response.status_code != 200:
+                    failures.append(response.status_code)
+        finally:
+            close_old_connections()
+            connection.close()
+
+    threads = [threading.Thread(target=post_comments, args=(user,)) for user in users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, len(failures)
+
+
+@benchmark('comment_burst')
+def comment_burst(count):
+    """
+    Posts `count` comments to one article from eight threads at once, first
+    straight into the database and then through the write-behind queue,
+    and reports the response latencies, failed posts and how long the
+    queue takes to drain.
+
+    The threads need committed rows, so unlike the other benchmarks this
+    one commits its article and users and deletes them afterwards.
+    """
+    results = []
+    author = benchmark_author()
+    users = [User.objects.create(username=f"benchmark-commenter-{i}") for i in range(8)]
+    upsert_articles(synthetic_rows(1, author))
+    article = NewsArticle.objects.get(source_id='benchmark', slug='benchmark-article-0')
+    per_user = max(1, count // len(users))
+    try:
+        for label, write_behind in (('direct', False), ('write-behind', True)):
+            with tempfile.TemporaryDirectory() as directory, override_settings(
+                COMMENT_WRITE_BEHIND=write_behind, COMMENT_QUEUE_PATH=Path(directory) / 'queue.sqlite3'
+            ):
+                Comment.objects.filter(news_article=article).delete()
+                latencies, failed = _comment_burst(article, users, per_user)
+                results.extend(_latency_percentiles(label, latencies))
+                results.append((f"{label} failed posts", failed))
+                if write_behind:
+                    start = time.perf_counter()
+                    comment_queue().drain()
+                    results.append(('write-behind drain: ms', f"{(time.perf_counter() - start) * 1000:.2f}"))
+                results.append((f"{label} comments stored", Comment.objects.filter(news_article=article).count()))
+    finally:
+        Comment.objects.filter(news_article=article).delete()
+        article.delete()
+        User.objects.filter(id__in=[user.id for user in users]).delete()
+    return results
+
+
+def _read_while_ingesting(paths, readers):
+    # Fetches the home page from `readers` threads for as long as fetch_news
+    # ingests the payloads, and returns the read latencies in ms, the
+    # number of failed reads and the ingest time in seconds.
+    latencies = []
+    failures = []
+    ingesting = threading.Event()
+    ingesting.set()
+
+    def read_pages():
+        client = Client()
+        try:
+            while ingesting.is_set():
+                began = time.perf_counter()
+                try:
+                    if client.get(reverse('home')).status_code != 200:
+                        failures.append(1)
+                except Exception:
+                    failures.append(1)
+                latencies.append((time.perf_counter() - began) * 1000)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=read_pages) for _ in range(readers)]
+    for thread in threads:
+        thread.start()
+    start = time.perf_counter()
+    fetch_news(replay=paths, processes=1)
+    elapsed = time.perf_counter() - start
+    ingesting.clear()
+    for thread in threads:
+        thread.join()
+    return latencies, len(failures), elapsed
+
+
+@benchmark('mixed')
+def mixed_read_write(count):
+    """
+    Replays `count` synthetic articles through fetch_news while two threads
+    keep reading the home page, once with SQLite's defaults and a new
+    connection per request and once with SQLITE_PRAGMAS and persistent
+    connections (see quickfire_bulletin.sqlite), and reports read
+    latencies, failed reads and ingest time.
+
+    Readers only see committed rows, so the ingested articles are
+    committed and deleted afterwards.
+    """
+    results = []
+    profiles = (
+        ('defaults', {'journal_mode': 'DELETE', 'synchronous': 'FULL'}, 0),
+        ('tuned', settings.SQLITE_PRAGMAS, settings.DATABASES['default'].get('CONN_MAX_AGE', 0)),
+    )
+    conn_max_age = connection.settings_dict['CONN_MAX_AGE']
+    User.objects.get_or_create(id=1, defaults={'username': 'newsbot'})
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_payloads(directory, count)
+        for label, pragmas, max_age in profiles:
+            # The journal mode only changes once no other connection is open.
+            connections.close_all()
+            connection.settings_dict['CONN_MAX_AGE'] = max_age
+            try:
+                with override_settings(SQLITE_PRAGMAS=pragmas, PAGE_CACHE_TIMEOUT=0, ALLOWED_HOSTS=['testserver']):
+                    latencies, failed, elapsed = _read_while_ingesting(paths, readers=2)
+            finally:
+                connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+                NewsArticle.objects.filter(source_id__startswith='synthetic').delete()
+                ArticleFingerprint.objects.filter(title__startswith='Synthetic article').delete()
+                IngestionSource.objects.filter(source_id__startswith='synthetic').delete()
+            results.append((f"{label} reads", len(latencies)))
+            results.extend(_latency_percentiles(f"{label} read", latencies))
+            results.append((f"{label} failed reads", failed))
+            results.append((f"{label} ingest: seconds", f"{elapsed:.2f}"))
+    connections.close_all()
+    return results
+
+
+def _logging_config(handler, level, sql):
+    return {
+        'version': 1,
+        'disable_existing_loggers': False,
+        'handlers': {'file': handler},
+        'loggers': {
+            'django': {'handlers': ['file'], 'level': level},
+            'django.db.backends': {'level': 'DEBUG' if sql else 'WARNING'},
+        },
+    }
+
+
+@benchmark('logging')
+def logging_overhead(count):
+    """
+    Fetches the home page `count` times with logging off, with the old
+    synchronous FileHandler logging django and its SQL at DEBUG, and with
+    the queued JSON handler (see quickfire_bulletin.log) at DEBUG without
+    SQL and at the production level INFO, and reports the request
+    latencies and the bytes logged. SQL is logged as with DEBUG on.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory, rolled_back(), \
+            override_settings(PAGE_CACHE_TIMEOUT=0, ALLOWED_HOSTS=['testserver']):
+        upsert_articles(synthetic_rows(30, benchmark_author()))
+        client = Client()
+        client.get(reverse('home'))
+        configs = (
+            ('off', None, None, False),
+            ('sync FileHandler, DEBUG + SQL', 'logging.FileHandler', 'DEBUG', True),
+            ('queued JSON, DEBUG', 'quickfire_bulletin.log.QueuedFileHandler', 'DEBUG', False),
+            ('queued JSON, INFO', 'quickfire_bulletin.log.QueuedFileHandler', 'INFO', False),
+        )
+        connection.force_debug_cursor = True
+        try:
+            for index, (label, handler_class, level, sql) in enumerate(configs):
+                path = os.path.join(directory, f"{index}.log")
+                if handler_class:
+                    handler = {'level': 'DEBUG', 'class': handler_class, 'filename': path}
+                    logging.config.dictConfig(_logging_config(handler, level, sql))
+                latencies = []
+                for _ in range(count):
+                    start = time.perf_counter()
+                    client.get(reverse('home'))
+                    latencies.append((time.perf_counter() - start) * 1000)
+                results.extend(_latency_percentiles(label, latencies))
+                if handler_class:
+                    handler = logging.getLogger('django').handlers[0]
+                    # The queued handler writes out its backlog on stop().
+                    getattr(handler, 'stop', handler.close)()
+                    size = os.path.getsize(path) if os.path.exists(path) else 0
+                    results.append((f"{label} logged KB", f"{size / 1024:.0f}"))
+        finally:
+            connection.force_debug_cursor = False
+            logging.config.dictConfig(settings.LOGGING)
+    return results
+
+
+@benchmark('perf')
+def perf_overhead(count):
+    """
+    Fetches the home page and a comments page `count` times each with
+    PerfMiddleware off and on (see quickfire_bulletin.perf), alternating
+    so both see the same caches, and reports the mean time per request.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory, rolled_back(), \
+            override_settings(PAGE_CACHE_TIMEOUT=0, ALLOWED_HOSTS=['testserver'], PERF_STATS_DIR=directory):
+        upsert_articles(synthetic_rows(30, benchmark_author()))
+        article = NewsArticle.objects.filter(source_id='benchmark').latest('pub_date')
+        client = Client()
+        for label, url in (('home', reverse('home')), ('comments', reverse('article_comments', args=[article.id]))):
+            client.get(url)
+            timings = {False: [], True: []}
+            for _ in range(count):
+                for enabled in (False, True):
+                    with override_settings(PERF_METRICS=enabled):
+                        start = time.perf_counter()
+                        client.get(url)
+                        timings[enabled].append(time.perf_counter() - start)
+            off, on = (statistics.mean(timings[enabled]) * 1000 for enabled in (False, True))
+            results.append((f"{label} off: ms", f"{off:.3f}"))
+            results.append((f"{label} on: ms", f"{on:.3f}"))
+            results.append((f"{label} overhead: ms", f"{on - off:.3f}"))
+    return results
+
+
+@benchmark('coldstart')
+def cold_start(count):
+    """
+    Starts min(`count`, 10) fresh interpreters that each load the WSGI
+    application and serve one page (see quickfire_bulletin.coldstart), for
+    the home and the login page, and reports the median seconds per step.
+    """
+    results = []
+    for label, path in (('home', reverse('home')), ('login', reverse('account_login'))):
+        runs = []
+        for _ in range(min(count, 10)):
+            output = subprocess.run(
+                [sys.executable, '-m', 'quickfire_bulletin.coldstart', path],
+                cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+            ).stdout
+            runs.append(json.loads(output.splitlines()[-1]))
+        for step in ('import_seconds', 'first_response_seconds', 'total_seconds'):
+            results.append((f"{label} {step}", f"{statistics.median(run[step] for run in runs):.3f}"))
+        results.append((f"{label} lazy modules imported", sorted({name for run in runs for name in run['lazy_modules']})))
+    return results
+
+
+@benchmark('search')
+def search_latency(count):
+    """
+    Indexes `count` synthetic articles and compares full-text search with
+    the LIKE scan the admin used to run, per query term.
+    """
+    rng = random.Random(0)
+    results = []
+    with rolled_back():
+        author = benchmark_author()
+        rows = synthetic_rows(count, author)
+        for row in rows:
+            row['content'] = ' '.join(rng.choice(SEARCH_VOCABULARY) for _ in range(60))
+        start = time.perf_counter()
+        upsert_articles(rows)
+        results.append(('indexing: seconds', f"{time.perf_counter() - start:.2f}"))
+
+        backend = search_backend()
+        for term in ('election', 'satellite merger', 'wildf'):
+            results.append((f"'{term}' fts first page: ms", _median_ms(lambda: backend.search(term, 10))))
+            results.append((f"'{term}' fts count: ms", _median_ms(lambda: backend.count(term))))
+            like = NewsArticle.objects.filter(Q(title__icontains=term) | Q(content__icontains=term))
+            results.append((f"'{term}' LIKE count: ms", _median_ms(lambda: like.count())))
+    return results
@@ -0,0 +1,100 @@
+"""
+Cache of rendered article cards for the home page.
+
+A card is keyed by the article id, its updated_on timestamp, its comment
+count and a comment version, so editing the article or any of its comments
+makes the old entry unreachable, whichever process made the change. The
+home page shows summary cards, which render the excerpt precomputed at
+ingest and need none of the article body; the detail page shows the full
+card. Cards show only the article's comment count; the comments themselves
+are loaded on demand from the comments JSON endpoint, so a card is the
+same for every viewer and does not grow with its comments.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from qfb_main.models import NewsArticle
+
+logger = logging.getLogger(__name__)
+
+CARD_KEY = 'qfb_main:card:{id}:{variant}:{updated}:{count}:{comments}'
+COMMENT_VERSION_KEY = 'qfb_main:card-comments:{id}'
+
+# The columns a summary card renders.
+SUMMARY_CARD_FIELDS = ('id', 'title', 'created_on', 'updated_on', 'pub_date', 'excerpt_html', 'reading_time', 'comment_count')
+
+_stats = Counter(hits=0, misses=0)
+_stats_lock = threading.Lock()
+
+
+def card_articles(full=False):
+    """
+    Returns the NewsArticle queryset cards are rendered from. Unless `full`
+    is set only the columns of a summary card are loaded.
+    """
+    articles = NewsArticle.objects.all()
+    return articles if full else articles.only(*SUMMARY_CARD_FIELDS)
+
+
+def comment_version(article_id):
+    """
+    Returns the current comment version of an article.
+
+    Versions are timestamps rather than counters, so if the cache evicts a
+    version a fresh one is minted and no stale card can match it.
+    """
+    key = COMMENT_VERSION_KEY.format(id=article_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_article_cards(article_ids):
+    """
+    Makes the cached cards of the given articles unreachable.
+    """
+    now = time.time_ns()
+    cache.set_many({COMMENT_VERSION_KEY.format(id=article_id): now for article_id in article_ids}, None)
+
+
+def render_article_card(news_article, full=False):
+    """
+    Returns the HTML of an article card, rendering it only on a cache miss.
+
+    Args:
+        news_article: A NewsArticle from card_articles().
+        full: Whether to show the whole article rather than its excerpt.
+
+    Returns:
+        The rendered 'article_card.html' fragment.
+    """
+    key = CARD_KEY.format(
+        id=news_article.id,
+        variant='full' if full else 'summary',
+        updated=news_article.updated_on.timestamp() if news_article.updated_on else '',
+        count=news_article.comment_count,
+        comments=comment_version(news_article.id),
+    )
+    html = cache.get(key)
+    with _stats_lock:
+        _stats['hits' if html is not None else 'misses'] += 1
+    if html is None:
+        html = render_to_string('article_card.html', {'news_article': news_article, 'full': full})
+        cache.set(key, html, settings.ARTICLE_CARD_CACHE_TIMEOUT)
+    return html
+
+
+def card_cache_stats():
+    """
+    Returns the hit and miss counts of this process.
+    """
+    with _stats_lock:
+        return dict(_stats)
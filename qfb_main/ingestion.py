@@ -0,0 +1,278 @@
+import hashlib
+import json
+import logging
+import traceback
+from collections import Counter
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, transaction
+from django.utils import timezone
+
+from qfb_main.models import ArticleFingerprint, IngestionSource, NewsArticle
+from qfb_main.signals import articles_upserted
+
+logger = logging.getLogger(__name__)
+
+UPSERT_BATCH_SIZE = 500
+
+# Fields refreshed on an existing article when the feed sends new values.
+# The slug is deliberately left out so links to an article stay valid.
+UPDATE_FIELDS = (
+    'content',
+    'content_html',
+    'content_is_html',
+    'excerpt',
+    'excerpt_html',
+    'reading_time',
+    'author_id',
+    'source_id',
+    'source_priority',
+    'category',
+    'language',
+    'pub_date',
+    'image_url',
+    'status',
+)
+
+
+# Feed fields an article's fingerprint covers: everything build_article_row reads.
+FINGERPRINT_FIELDS = (
+    'title',
+    'content',
+    'pubDate',
+    'source_id',
+    'source_priority',
+    'category',
+    'language',
+    'image_url',
+)
+
+
+def parse_pub_date(value):
+    """
+    Returns a feed 'pubDate' string as an aware datetime, or None if it is empty.
+    """
+    if not value:
+        return None
+    return timezone.make_aware(datetime.strptime(value, '%Y-%m-%d %H:%M:%S'))
+
+
+def article_fingerprint(article):
+    """
+    Returns a SHA-256 hex digest of the feed fields of one article.
+    """
+    fields = {field: article.get(field) for field in FINGERPRINT_FIELDS}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class IngestionState:
+    """
+    What earlier runs have already ingested, used to skip unchanged work.
+
+    Each feed source has a high-water mark, the newest pubDate ingested
+    from it. Articles published more than INGEST_LOOKBACK_HOURS before
+    their source's mark are treated as already seen, without even a
+    database lookup. Everything newer is compared against the fingerprint
+    stored for its title, so only new or edited articles reach NLP and the
+    article table.
+
+    The marks are read once when the state is created. Marks advanced
+    during a run only take effect on the next run, so the older pages of
+    the current run are not mistaken for stale ones.
+    """
+
+    def __init__(self, lookback=None):
+        hours = settings.INGEST_LOOKBACK_HOURS if lookback is None else lookback
+        self.lookback = timedelta(hours=hours)
+        self.marks = dict(IngestionSource.objects.values_list('source_id', 'high_water_mark'))
+        self.known_sources = set(self.marks)
+
+    def is_stale(self, article):
+        """
+        Returns True if the article is older than its source's mark less the lookback.
+        """
+        mark = self.marks.get(article.get('source_id'))
+        if mark is None:
+            return False
+        try:
+            pub_date = parse_pub_date(article.get('pubDate'))
+        except (TypeError, ValueError):
+            return False
+        return pub_date is not None and pub_date < mark - self.lookback
+
+    def is_stale_page(self, articles):
+        """
+        Returns True if every article of a page is stale. The feed is newest
+        first, so the pages after such a page need not be fetched.
+        """
+        return bool(articles) and all(self.is_stale(article) for article in articles)
+
+    def select_changed(self, articles, stats):
+        """
+        Returns the articles that are new or differ from their last ingestion.
+
+        Args:
+            articles: A list of article dicts from one page of the feed.
+            stats: A Counter; 'stale' and 'unchanged' are incremented for the
+                articles left out.
+
+        Returns:
+            A list of (article, fingerprint) pairs.
+        """
+        fresh = []
+        for article in articles:
+            if self.is_stale(article):
+                stats['stale'] += 1
+            else:
+                fresh.append((article, article_fingerprint(article)))
+        titles = [article.get('title') for article, _ in fresh if article.get('title')]
+        known = dict(ArticleFingerprint.objects.filter(title__in=titles).values_list('title', 'content_hash'))
+        changed = []
+        for article, fingerprint in fresh:
+            if known.get(article.get('title')) == fingerprint:
+                stats['unchanged'] += 1
+            else:
+                changed.append((article, fingerprint))
+        return changed
+
+    def record(self, ingested):
+        """
+        Stores the fingerprints of ingested articles and advances the marks of
+        their sources.
+
+        Args:
+            ingested: (article, fingerprint) pairs whose rows were written.
+        """
+        fingerprints = {article['title']: fingerprint for article, fingerprint in ingested}
+        newest = {}
+        for article, _ in ingested:
+            pub_date = parse_pub_date(article.get('pubDate'))
+            source_id = article.get('source_id')
+            if pub_date and source_id and (source_id not in newest or pub_date > newest[source_id]):
+                newest[source_id] = pub_date
+
+        now = timezone.now()
+        with transaction.atomic():
+            existing = ArticleFingerprint.objects.filter(title__in=list(fingerprints))
+            existing = {fingerprint.title: fingerprint for fingerprint in existing}
+            for title, fingerprint in existing.items():
+                fingerprint.content_hash = fingerprints[title]
+                fingerprint.updated_on = now
+            ArticleFingerprint.objects.bulk_update(list(existing.values()), ['content_hash', 'updated_on'])
+            ArticleFingerprint.objects.bulk_create([
+                ArticleFingerprint(title=title, content_hash=content_hash)
+                for title, content_hash in fingerprints.items() if title not in existing
+            ], ignore_conflicts=True)
+
+            for source_id, pub_date in newest.items():
+                if source_id not in self.known_sources:
+                    IngestionSource.objects.bulk_create(
+                        [IngestionSource(source_id=source_id, high_water_mark=pub_date)], ignore_conflicts=True
+                    )
+                    self.known_sources.add(source_id)
+                # Only ever moves forward, also when another run got there first.
+                IngestionSource.objects.filter(source_id=source_id, high_water_mark__lt=pub_date).update(
+                    high_water_mark=pub_date, updated_on=now
+                )
+
+
+def upsert_articles(rows, batch_size=UPSERT_BATCH_SIZE, failed=None):
+    """
+    Inserts or updates NewsArticle rows in set-based batches keyed on title.
+
+    Each batch costs one SELECT for the existing titles, one bulk INSERT for
+    the new rows and one bulk UPDATE for the changed rows, all inside a
+    single transaction. If the database rejects a batch, such as for a slug
+    taken by another article, its rows are written again one by one, so
+    only the bad rows are lost; each of them is logged.
+
+    Args:
+        rows: An iterable of dicts of NewsArticle field values, each with a 'title'.
+        batch_size: Number of rows read, written and committed together.
+        failed: A list the titles of the rows that could not be written are appended to.
+
+    Returns:
+        A Counter with the number of 'inserted', 'updated' and 'skipped' rows,
+        and of 'failed' rows if there were any.
+    """
+    stats = Counter(inserted=0, updated=0, skipped=0)
+    failed = [] if failed is None else failed
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            stats.update(_upsert_batch(batch, failed))
+            batch = []
+    if batch:
+        stats.update(_upsert_batch(batch, failed))
+    return stats
+
+
+def _upsert_batch(rows, failed):
+    """
+    Writes one batch of rows and commits it as a single transaction, or
+    row by row if the database rejects the batch.
+    """
+    by_title = {}
+    for row in rows:
+        # A title repeated within the feed keeps its last occurrence.
+        by_title[row['title']] = row
+    skipped = len(rows) - len(by_title)
+
+    try:
+        return _write_batch(by_title, skipped)
+    except (DataError, IntegrityError) as e:
+        if len(by_title) == 1:
+            failed.append(rows[-1]['title'])
+            tb_str = traceback.format_exception(type(e), e, e.__traceback__)
+            logger.error(f"Failed to save article {rows[-1]['title']!r}: {e}\n{''.join(tb_str)}")
+            return Counter(skipped=skipped, failed=1)
+        logger.warning(f"Batch of {len(by_title)} articles rejected ({e}), writing them one by one")
+    stats = Counter(skipped=skipped)
+    for row in by_title.values():
+        stats.update(_upsert_batch([row], failed))
+    return stats
+
+
+def _write_batch(by_title, skipped):
+    # The set-based write of one batch, keyed on title, in one transaction.
+    with transaction.atomic():
+        existing = NewsArticle.objects.filter(title__in=list(by_title)).only('title', *UPDATE_FIELDS)
+        existing = {article.title: article for article in existing}
+
+        now = timezone.now()
+        to_create = []
+        to_update = []
+        changed_fields = set()
+        for title, row in by_title.items():
+            article = existing.get(title)
+            if article is None:
+                to_create.append(NewsArticle(**row))
+                continue
+            changed = [
+                field for field in UPDATE_FIELDS
+                if field in row and getattr(article, field) != row[field]
+            ]
+            if changed:
+                for field in changed:
+                    setattr(article, field, row[field])
+                changed_fields.update(changed)
+                # bulk_update() bypasses auto_now, so stamp the row ourselves.
+                article.updated_on = now
+                to_update.append(article)
+            else:
+                skipped += 1
+
+        if to_create:
+            NewsArticle.objects.bulk_create(to_create)
+        if to_update:
+            # Only the columns that actually differ go into the CASE expressions.
+            fields = [field for field in UPDATE_FIELDS if field in changed_fields]
+            NewsArticle.objects.bulk_update(to_update, fields + ['updated_on'])
+
+    if to_create or to_update:
+        articles_upserted.send(sender=NewsArticle, updated_ids=[article.id for article in to_update])
+
+    logger.debug("Upserted batch: %d inserted, %d updated, %d skipped", len(to_create), len(to_update), skipped)
+    return Counter(inserted=len(to_create), updated=len(to_update), skipped=skipped)
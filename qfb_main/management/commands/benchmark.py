@@ -0,0 +1,29 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from qfb_main.benchmarks import BENCHMARKS
+
+
+class Command(BaseCommand):
+    """
+    A custom Django management command to run the benchmarks in qfb_main.benchmarks.
+    """
+
+    help = 'Runs a named benchmark and prints its measurements.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=sorted(BENCHMARKS), help='Benchmark to run.')
+        parser.add_argument('--count', type=int, default=100, help='Number of items to benchmark with.')
+        parser.add_argument('--json', action='store_true', help='Print the measurements as one JSON object, for comparing runs in CI.')
+
+    def handle(self, *args, **options):
+        """
+        Runs the selected benchmark and writes one line per measurement, or a JSON object.
+        """
+        results = BENCHMARKS[options['name']](options['count'])
+        if options['json']:
+            self.stdout.write(json.dumps({label: str(value) for label, value in results}, indent=2))
+            return
+        for label, value in results:
+            self.stdout.write(f"{label}: {value}")
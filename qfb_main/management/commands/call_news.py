@@ -1,24 +1,62 @@
 from django.core.management.base import BaseCommand
-from qfb_main.views import fetch_news
+from qfb_main.news_feed import feed_queries
+from qfb_main.pipeline import fetch_news
+from qfb_main.replay import expand_paths
+from qfb_main.worker import enqueue_fetch
 import logging
 
-logging.basicConfig(level=logging.DEBUG)
+logger = logging.getLogger(__name__)
+
+def comma_separated(value):
+    return [item for item in value.split(',') if item]
 
 class Command(BaseCommand):
     """
     A custom Django management command to fetch news and store it in the database.
     """
-    
+
     help = 'Fetches news from an external source and stores it in the database.'
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument('--countries', type=comma_separated, help='Comma-separated country codes; defaults to NEWS_COUNTRIES.')
+        parser.add_argument('--languages', type=comma_separated, help='Comma-separated language codes; defaults to NEWS_LANGUAGES.')
+        parser.add_argument('--categories', type=comma_separated, help='Comma-separated categories; defaults to NEWS_CATEGORIES.')
+        parser.add_argument('--max-pages', type=int, help='Pages to follow per query; defaults to NEWS_MAX_PAGES.')
+        parser.add_argument('--concurrency', type=int, help='Requests in flight at once; defaults to NEWS_FETCH_CONCURRENCY.')
+        parser.add_argument('--replay', nargs='+', metavar='PATH', help='Ingest recorded API responses from these JSON files or globs instead of calling the API.')
+        parser.add_argument('--enqueue', action='store_true', help='Queue the fetch for news_worker instead of running it here.')
+
+    def handle(self, *args, **options):
         """
         Executes the fetch_news function and handles success or failure.
         """
         try:
-            fetch_news()
+            if options['replay']:
+                paths = expand_paths(options['replay'])
+                stats = fetch_news(replay=paths)
+                self.stdout.write(self.style.SUCCESS(f'Replayed {len(paths)} recorded responses.'))
+                self.report(stats)
+                return
+            queries = feed_queries(options['countries'], options['languages'], options['categories'])
+            if options['enqueue']:
+                job = enqueue_fetch({'queries': queries, 'concurrency': options['concurrency'], 'max_pages': options['max_pages']})
+                self.stdout.write(self.style.SUCCESS(f'Queued ingestion job {job.id} for news_worker.'))
+                return
+            stats = fetch_news(queries=queries, concurrency=options['concurrency'], max_pages=options['max_pages'])
             self.stdout.write(self.style.SUCCESS('Successfully fetched news and stored it in the database.'))
-            logging.debug("Successfully executed fetch_news")
+            self.report(stats)
+            logger.debug("Successfully executed fetch_news")
         except Exception as e:
             self.stdout.write(self.style.ERROR('Failed to fetch news and store it in the database.'))
-            logging.error(f"Failed to execute fetch_news: {e}")
+            logger.error(f"Failed to execute fetch_news: {e}")
+
+    def report(self, stats):
+        """
+        Writes the counts returned by fetch_news.
+        """
+        self.stdout.write(f"Pages: {stats['pages']}, inserted: {stats['inserted']}, updated: {stats['updated']}, skipped: {stats['skipped']}")
+        received = stats['inserted'] + stats['updated'] + stats['skipped'] + stats['unchanged'] + stats['stale']
+        self.stdout.write(
+            f"Skipped before processing: {stats['unchanged'] + stats['stale']} of {received} articles "
+            f"({stats['unchanged']} unchanged, {stats['stale']} older than their source's high-water mark)"
+        )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from qfb_main.replay import PAGE_SIZE, write_payloads
+
+
+class Command(BaseCommand):
+    """
+    A custom Django management command to write synthetic newsdata.io responses for call_news --replay.
+    """
+
+    help = 'Writes synthetic feed responses holding the given number of articles to a directory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help='Directory to write page-NNNNN.json files to.')
+        parser.add_argument('--count', type=int, default=1000, help='Number of articles to generate.')
+        parser.add_argument('--page-size', type=int, default=PAGE_SIZE, help='Articles per response file.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed for the generated content.')
+
+    def handle(self, *args, **options):
+        """
+        Generates the responses and reports how many files were written.
+        """
+        paths = write_payloads(options['directory'], options['count'], options['page_size'], options['seed'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['count']} articles in {len(paths)} files to {options['directory']}."))
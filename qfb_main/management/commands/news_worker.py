@@ -0,0 +1,32 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from qfb_main.worker import NewsWorker
+
+
+class Command(BaseCommand):
+    """
+    A custom Django management command that runs the background news ingestion scheduler.
+    """
+
+    help = 'Queues and runs news ingestion jobs until stopped; only one worker ingests at a time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run a single scheduler tick and exit.')
+
+    def handle(self, *args, **options):
+        """
+        Runs the worker loop, stopping cleanly after the current job on SIGINT or SIGTERM.
+        """
+        worker = NewsWorker()
+        if options['once']:
+            job = worker.run_once()
+            worker.lease.release()
+            self.stdout.write(f"Ran job {job.id}: {job.state}" if job else "No job was due.")
+            return
+        signal.signal(signal.SIGINT, worker.stop)
+        signal.signal(signal.SIGTERM, worker.stop)
+        self.stdout.write(self.style.SUCCESS(f'News worker {worker.lease.holder} started.'))
+        worker.run()
+        self.stdout.write('News worker stopped.')
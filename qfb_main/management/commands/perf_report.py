@@ -0,0 +1,56 @@
+import json
+import os
+import shutil
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from quickfire_bulletin.perf import load_stats
+
+
+class Command(BaseCommand):
+    """
+    A custom Django management command to report the request timings recorded by PerfMiddleware.
+    """
+
+    help = 'Prints p50/p95/p99 request, query and render times per view from the histograms in PERF_STATS_DIR.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='Print the percentiles as one JSON object.')
+        parser.add_argument('--reset', action='store_true', help='Delete the recorded histograms after reporting.')
+
+    def handle(self, *args, **options):
+        """
+        Merges the histograms of every process and writes one line per view, slowest p95 first.
+        """
+        views = load_stats()
+        report = {
+            view: {
+                'requests': histograms['total_ms'].count,
+                'p50_ms': histograms['total_ms'].percentile(50),
+                'p95_ms': histograms['total_ms'].percentile(95),
+                'p99_ms': histograms['total_ms'].percentile(99),
+                'db_p95_ms': histograms['db_ms'].percentile(95),
+                'queries_mean': histograms['queries'].mean(),
+                'render_p95_ms': histograms['render_ms'].percentile(95),
+                'bytes_mean': histograms['bytes'].mean(),
+            }
+            for view, histograms in views.items()
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        elif not report:
+            self.stdout.write(f"No requests recorded in {settings.PERF_STATS_DIR}.")
+        else:
+            self.stdout.write(
+                f"{'view':<32} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+                f"{'db p95':>8} {'queries':>8} {'tpl p95':>8} {'KB':>8}"
+            )
+            for view, row in sorted(report.items(), key=lambda item: -item[1]['p95_ms']):
+                self.stdout.write(
+                    f"{view:<32} {row['requests']:>8} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+                    f"{row['p99_ms']:>8.1f} {row['db_p95_ms']:>8.1f} {row['queries_mean']:>8.1f} "
+                    f"{row['render_p95_ms']:>8.1f} {(row['bytes_mean'] or 0) / 1024:>8.1f}"
+                )
+        if options['reset'] and os.path.isdir(settings.PERF_STATS_DIR):
+            shutil.rmtree(settings.PERF_STATS_DIR)
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from qfb_main.models import NewsArticle
+from qfb_main.signals import content_changed
+from qfb_main.summaries import render_content
+
+
+class Command(BaseCommand):
+    """
+    A custom Django management command to fill in NewsArticle.content_html for existing articles.
+    """
+
+    help = (
+        'Stores the rendered HTML of articles whose content_html is empty, or with --all of every article '
+        'whose content is plain text. HTML from the admin editor is only rendered while content_html is empty.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Re-render every plain-text article, not only those without HTML.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Articles read and written together.')
+
+    def handle(self, *args, **options):
+        """
+        Renders the articles in batches and reports how many were updated.
+        """
+        articles = NewsArticle.objects.only('id', 'content', 'content_is_html').order_by('id')
+        if options['all']:
+            articles = articles.filter(Q(content_html='') | Q(content_is_html=False))
+        else:
+            articles = articles.filter(content_html='')
+        updated = 0
+        batch = []
+        for article in articles.iterator(chunk_size=options['batch_size']):
+            # For plain text, the same HTML the templates made with the linebreaks filter.
+            article.content_html = render_content(article.content, article.content_is_html)
+            batch.append(article)
+            if len(batch) >= options['batch_size']:
+                updated += self.write(batch)
+                batch = []
+        if batch:
+            updated += self.write(batch)
+        self.stdout.write(self.style.SUCCESS(f"Rendered {updated} articles."))
+
+    def write(self, batch):
+        NewsArticle.objects.bulk_update(batch, ['content_html'])
+        content_changed([article.id for article in batch])
+        return len(batch)
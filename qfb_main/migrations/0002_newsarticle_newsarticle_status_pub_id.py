@@ -0,0 +1,17 @@
+# Generated by Django 3.2.21 on 2026-10-18 07:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qfb_main', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='newsarticle',
+            index=models.Index(fields=['status', 'pub_date', 'id'], name='newsarticle_status_pub_id'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.21 on 2026-10-18 07:39
+
+from django.db import migrations
+
+from qfb_main import search
+
+
+def create_search_index(apps, schema_editor):
+    statements = {
+        'sqlite': search.SQLITE_CREATE,
+        'postgresql': search.POSTGRES_CREATE,
+    }.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    statements = {
+        'sqlite': search.SQLITE_DROP,
+        'postgresql': search.POSTGRES_DROP,
+    }.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qfb_main', '0002_newsarticle_newsarticle_status_pub_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
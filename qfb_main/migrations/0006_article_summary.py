@@ -0,0 +1,40 @@
+# Generated by Django 3.2.21 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+from qfb_main.summaries import summarize
+
+
+def fill_summaries(apps, schema_editor):
+    NewsArticle = apps.get_model('qfb_main', 'NewsArticle')
+    batch = []
+    for article in NewsArticle.objects.only('id', 'content', 'excerpt').iterator(chunk_size=500):
+        for field, value in summarize(article.content, article.excerpt).items():
+            setattr(article, field, value)
+        batch.append(article)
+        if len(batch) >= 500:
+            NewsArticle.objects.bulk_update(batch, ['excerpt', 'excerpt_html', 'reading_time'])
+            batch = []
+    if batch:
+        NewsArticle.objects.bulk_update(batch, ['excerpt', 'excerpt_html', 'reading_time'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qfb_main', '0005_ingestion_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newsarticle',
+            name='excerpt_html',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='newsarticle',
+            name='reading_time',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.21 on 2026-10-18 09:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qfb_main', '0006_article_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newsarticle',
+            name='content_html',
+            field=models.TextField(blank=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.2.21 on 2026-10-18 10:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_comments(apps, schema_editor):
+    NewsArticle = apps.get_model('qfb_main', 'NewsArticle')
+    Comment = apps.get_model('comments', 'Comment')
+    approved = (
+        Comment.objects.filter(news_article=OuterRef('pk'), approved=True)
+        .order_by().values('news_article').annotate(total=Count('id')).values('total')
+    )
+    NewsArticle.objects.update(comment_count=Coalesce(Subquery(approved), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0001_initial'),
+        ('qfb_main', '0007_newsarticle_content_html'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newsarticle',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_comments, migrations.RunPython.noop),
+    ]
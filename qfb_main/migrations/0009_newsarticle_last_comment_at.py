@@ -0,0 +1,31 @@
+# Generated by Django 3.2.21 on 2026-10-18 10:40
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+
+def fill_last_comment_at(apps, schema_editor):
+    NewsArticle = apps.get_model('qfb_main', 'NewsArticle')
+    Comment = apps.get_model('comments', 'Comment')
+    newest = (
+        Comment.objects.filter(news_article=OuterRef('pk'), approved=True)
+        .order_by().values('news_article').annotate(newest=Max('created_on')).values('newest')
+    )
+    NewsArticle.objects.update(last_comment_at=Subquery(newest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0002_comment_article_created_id'),
+        ('qfb_main', '0008_newsarticle_comment_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newsarticle',
+            name='last_comment_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_last_comment_at, migrations.RunPython.noop),
+    ]
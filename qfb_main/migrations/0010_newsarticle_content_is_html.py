@@ -0,0 +1,34 @@
+# Generated by Django 3.2.21 on 2026-10-18 11:10
+
+from django.db import migrations, models
+from django.db.models import F
+
+from qfb_main.summaries import render_content
+
+
+def mark_editor_html(apps, schema_editor):
+    # Articles saved in the admin stored the editor's HTML unchanged as content_html.
+    NewsArticle = apps.get_model('qfb_main', 'NewsArticle')
+    articles = NewsArticle.objects.exclude(content='').filter(content_html=F('content')).only('id', 'content')
+    batch = []
+    for article in articles.iterator(chunk_size=500):
+        article.content_is_html = True
+        article.content_html = render_content(article.content, is_html=True)
+        batch.append(article)
+    NewsArticle.objects.bulk_update(batch, ['content_is_html', 'content_html'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('qfb_main', '0009_newsarticle_last_comment_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='newsarticle',
+            name='content_is_html',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_editor_html, migrations.RunPython.noop),
+    ]
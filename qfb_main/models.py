@@ -1,5 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from qfb_main.summaries import render_content, summarize
 
 STATUS = ((0, "Draft"), (1, "Published"))
 
@@ -8,8 +11,18 @@ class NewsArticle(models.Model):
     slug = models.SlugField(max_length=255, unique=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="news_articles")
     excerpt = models.TextField(blank=True)
+    # Precomputed from content for the list page (see qfb_main.summaries).
+    excerpt_html = models.TextField(blank=True)
+    reading_time = models.PositiveSmallIntegerField(default=1)
+    # Approved comments and the newest one's creation time (see comments.counters).
+    comment_count = models.PositiveIntegerField(default=0)
+    last_comment_at = models.DateTimeField(null=True, blank=True)
     updated_on = models.DateTimeField(auto_now=True)
     content = models.TextField()
+    # The content as HTML, output by templates as is. Escaped plain text for
+    # ingested articles; the editor's sanitized HTML when content_is_html is set.
+    content_html = models.TextField(blank=True)
+    content_is_html = models.BooleanField(default=False)
     created_on = models.DateTimeField(auto_now_add=True)
     status = models.IntegerField(choices=STATUS, default=0)
     source_id = models.CharField(max_length=255)
@@ -22,6 +35,93 @@ class NewsArticle(models.Model):
 
     class Meta:
         ordering = ["-created_on"]
+        indexes = [
+            # Serves the published list and its keyset cursors on (pub_date, id).
+            models.Index(fields=['status', 'pub_date', 'id'], name='newsarticle_status_pub_id'),
+        ]
+
+    def __str__(self) -> str:
+        return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        article = super().from_db(db, field_names, values)
+        # Remembered so save() only renders content_html again when they change.
+        article._rendered_from = (article.__dict__.get('content'), article.__dict__.get('content_is_html'))
+        return article
+
+    def save(self, *args, **kwargs):
+        """
+        Refreshes the summary fields from the content before saving, and
+        content_html when the content changed or content_html is empty. An
+        excerpt written by hand is kept; a blank one is generated. Saves
+        whose update_fields name neither the content nor the excerpt leave
+        all of them alone.
+        """
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'content', 'excerpt', 'content_is_html'} & set(update_fields):
+            derived = ['excerpt', 'excerpt_html', 'reading_time']
+            for field, value in summarize(self.content, self.excerpt).items():
+                setattr(self, field, value)
+            if not self.content_html or getattr(self, '_rendered_from', None) != (self.content, self.content_is_html):
+                self.content_html = render_content(self.content, self.content_is_html)
+                derived.append('content_html')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *derived}
+        super().save(*args, **kwargs)
+        self._rendered_from = (self.content, self.content_is_html)
+
+
+class IngestionSource(models.Model):
+    # Newest pubDate ingested from a feed source (see qfb_main.ingestion.IngestionState).
+    source_id = models.CharField(max_length=255, unique=True)
+    high_water_mark = models.DateTimeField()
+    updated_on = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.source_id} @ {self.high_water_mark}"
+
+
+class ArticleFingerprint(models.Model):
+    # Hash of the feed fields an article was last ingested from, keyed on its title.
+    title = models.CharField(max_length=255, unique=True)
+    content_hash = models.CharField(max_length=64)
+    updated_on = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
         return self.title
+
+
+JOB_STATES = (("pending", "Pending"), ("running", "Running"), ("done", "Done"), ("failed", "Failed"))
+
+class IngestionJob(models.Model):
+    # A unit of ingestion work run by news_worker (see qfb_main.worker).
+    params = models.JSONField(default=dict, blank=True)
+    state = models.CharField(max_length=16, choices=JOB_STATES, default="pending")
+    attempts = models.IntegerField(default=0)
+    run_after = models.DateTimeField(default=timezone.now)
+    created_on = models.DateTimeField(auto_now_add=True)
+    started_on = models.DateTimeField(null=True, blank=True)
+    finished_on = models.DateTimeField(null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["-created_on"]
+        indexes = [
+            # Serves the worker's "next due job" lookup.
+            models.Index(fields=['state', 'run_after'], name='ingestionjob_state_run_after'),
+        ]
+
+    def __str__(self) -> str:
+        return f"Job {self.id} ({self.state})"
+
+
+class WorkerLease(models.Model):
+    # Held by the one news_worker allowed to run jobs until it expires.
+    name = models.CharField(max_length=64, unique=True)
+    holder = models.CharField(max_length=255)
+    expires_at = models.DateTimeField()
+
+    def __str__(self) -> str:
+        return f"{self.name} held by {self.holder}"
@@ -0,0 +1,181 @@
+"""
+Concurrent client for the newsdata.io news endpoint.
+
+Every combination of the configured countries, languages and categories is
+one query. Each query's pages are followed through the 'nextPage' cursor
+by a pool of worker threads sharing one keep-alive session. Response bodies
+are streamed and parsed incrementally (see qfb_main.streaming), and their
+articles are handed to the consumer in small batches through a bounded
+queue, so parsing and database writes overlap with the requests still in
+flight and memory use does not grow with the size of a page.
+"""
+import logging
+import queue
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from qfb_main.streaming import CHUNK_SIZE, FeedStream, batched
+
+logger = logging.getLogger(__name__)
+
+# Put on the page queue once every query has been walked to its end.
+_DONE = object()
+
+
+def make_api_call(params=None, page=None, session=None, stream=False):
+    """
+    Makes an API call to fetch one page of news data.
+
+    Args:
+        params: Query parameters such as 'country' and 'language'; defaults
+            to the first query of feed_queries().
+        page: The 'nextPage' cursor of the previous page, or None for the first page.
+        session: A requests.Session to reuse connections from, optional.
+        stream: Whether to leave the body unread until it is iterated over.
+
+    Returns:
+        Response object from the news API call.
+    """
+    params = dict(params or feed_queries()[0], apikey=settings.NEWS_API_KEY)
+    if page:
+        params['page'] = page
+    http = session or requests
+    return http.get(settings.NEWS_API_URL, params=params, timeout=settings.NEWS_FETCH_TIMEOUT, stream=stream)
+
+
+def feed_queries(countries=None, languages=None, categories=None):
+    """
+    Returns the query parameters of every country, language and category
+    combination, defaulting to the NEWS_COUNTRIES, NEWS_LANGUAGES and
+    NEWS_CATEGORIES settings. With no categories the feed is not filtered
+    by category.
+    """
+    countries = countries or settings.NEWS_COUNTRIES
+    languages = languages or settings.NEWS_LANGUAGES
+    categories = categories or settings.NEWS_CATEGORIES or [None]
+    queries = []
+    for country, language, category in product(countries, languages, categories):
+        params = {'country': country, 'language': language}
+        if category:
+            params['category'] = category
+        queries.append(params)
+    return queries
+
+
+def build_session(pool_size):
+    """
+    Returns a requests.Session that keeps up to `pool_size` connections
+    alive per host, enough for every fetch thread to hold one.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def fetch_pages(queries, concurrency=None, max_pages=None, session=None, until=None, stats=None, batch_size=None):
+    """
+    Yields the articles of every page of every query, in batches, as they arrive.
+
+    At most `concurrency` requests are in flight at once and at most twice
+    that many batches wait for the consumer, which bounds memory when the
+    consumer is the slower side. A query that fails is logged and
+    abandoned without affecting the others. Closing the generator early
+    stops the fetch threads.
+
+    Args:
+        queries: A list of query parameter dicts, see feed_queries().
+        concurrency: Number of fetch threads; defaults to NEWS_FETCH_CONCURRENCY.
+        max_pages: Pages followed per query at most; defaults to NEWS_MAX_PAGES.
+        session: A requests.Session shared by the threads, optional.
+        until: A callable given each batch, optional; once it has returned
+            True for every batch of a page the rest of that query's pages
+            are not fetched.
+        stats: A Counter, optional; 'pages' is incremented for every page
+            read and 'failed' for every query abandoned on an error.
+        batch_size: Articles per batch; defaults to INGEST_BATCH_SIZE.
+
+    Yields:
+        Lists of up to `batch_size` article dicts, each from a single page.
+    """
+    if not queries:
+        return
+    concurrency = concurrency or settings.NEWS_FETCH_CONCURRENCY
+    max_pages = max_pages or settings.NEWS_MAX_PAGES
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    own_session = session is None
+    if own_session:
+        session = build_session(concurrency)
+    pages = queue.Queue(maxsize=concurrency * 2)
+    stop = threading.Event()
+    remaining = [len(queries)]
+    remaining_lock = threading.Lock()
+
+    def put(item):
+        # Gives up once the consumer has gone away instead of blocking forever.
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def count(key):
+        if stats is not None:
+            with remaining_lock:
+                stats[key] += 1
+
+    def walk(params):
+        try:
+            cursor = None
+            for _ in range(max_pages):
+                if stop.is_set():
+                    return
+                with make_api_call(params, page=cursor, session=session, stream=True) as response:
+                    if response.status_code != 200:
+                        logger.error(f"API call for {params} failed with status code {response.status_code}: {response.text}")
+                        count('failed')
+                        return
+                    page = FeedStream(response.iter_content(CHUNK_SIZE))
+                    stale = until is not None
+                    for batch in batched(page, batch_size):
+                        if not put(batch):
+                            return
+                        stale = stale and until(batch)
+                count('pages')
+                cursor = page.fields.get('nextPage')
+                if not cursor or stale:
+                    return
+        except Exception as e:
+            count('failed')
+            tb_str = traceback.format_exception(type(e), e, e.__traceback__)
+            logger.error(f"Failed to fetch news for {params}: {e}\n{''.join(tb_str)}")
+        finally:
+            with remaining_lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                put(_DONE)
+
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='news-fetch')
+    try:
+        for params in queries:
+            executor.submit(walk, params)
+        while True:
+            batch = pages.get()
+            if batch is _DONE:
+                break
+            yield batch
+    finally:
+        stop.set()
+        executor.shutdown(wait=True)
+        if own_session:
+            session.close()
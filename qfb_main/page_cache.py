@@ -0,0 +1,155 @@
+"""
+Whole-page cache for the article list and detail pages.
+
+A page is rendered once as an anonymous "shell" in which every
+user-specific part (login links, comment forms with their CSRF token, the
+admin link, the clock) is left as a hole marker by the {% hole %} tag. Each
+request gets the cached shell with its holes filled in, so the article
+cards and layout are never rendered per visitor.
+
+Every response carries an ETag and Last-Modified derived from the content
+version, so a browser revalidating an unchanged page gets a 304 without any
+template being rendered. The version is read from the database, so writes
+made by other processes, such as the ingestion worker or other web workers,
+retire the cached pages too: at once in the process that made the write,
+and within CONTENT_VERSION_TIMEOUT seconds everywhere else.
+"""
+import hashlib
+import re
+import time
+from functools import partial, wraps
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db.models import Count, Max, Sum
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from qfb_main.models import NewsArticle
+
+CONTENT_VERSION_KEY = 'qfb_main:content-version'
+PAGE_KEY = 'qfb_main:page:{version}:{path}'
+
+HOLE_MARKER = '<!--qfb-hole:{name}:{arg}-->'
+_HOLE = re.compile(r'<!--qfb-hole:(\w+):([\w-]*)-->')
+
+
+def mark_content_changed():
+    """
+    Records that an article or comment changed, so this process reads the
+    content version again on its next request.
+    """
+    cache.delete(CONTENT_VERSION_KEY)
+
+
+def content_version():
+    """
+    Returns the version of the articles and their comment counters as a
+    (version, last_modified) pair, where version is a hash that changes
+    with any write to them and last_modified is a POSIX timestamp.
+
+    The version is computed by one aggregate query over NewsArticle and
+    kept in the cache for CONTENT_VERSION_TIMEOUT seconds.
+    """
+    cached = cache.get(CONTENT_VERSION_KEY)
+    if cached is None:
+        stats = NewsArticle.objects.aggregate(
+            count=Count('id'), newest_id=Max('id'), updated=Max('updated_on'),
+            comments=Sum('comment_count'), commented=Max('last_comment_at'),
+        )
+        changed = [value.timestamp() for value in (stats['updated'], stats['commented']) if value]
+        version = '{count}:{newest_id}:{updated}:{comments}:{commented}'.format(**stats)
+        cached = (hashlib.md5(version.encode()).hexdigest(), max(changed, default=time.time()))
+        cache.set(CONTENT_VERSION_KEY, cached, settings.CONTENT_VERSION_TIMEOUT)
+    return cached
+
+
+def is_shell_render(context):
+    """
+    Returns True while a template is being rendered into a cached shell.
+    """
+    return getattr(context.get('request'), 'page_shell', False)
+
+
+def render_hole(request, name, arg=''):
+    """
+    Renders the user-specific fragment 'holes/<name>.html' for a request.
+    """
+    return render_to_string(f'holes/{name}.html', {'arg': arg}, request=request)
+
+
+def fill_holes(request, shell):
+    """
+    Returns the shell with every hole rendered for the current request.
+    """
+    return _HOLE.sub(lambda match: render_hole(request, match.group(1), match.group(2)), shell)
+
+
+def _render_shell(view, request, args, kwargs):
+    user = request.user
+    request.page_shell = True
+    # Render as an anonymous visitor so nothing personal can reach the cache
+    # even if it sits outside a hole.
+    request.user = AnonymousUser()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+    finally:
+        request.page_shell = False
+        request.user = user
+    return response
+
+
+def cache_page_with_holes(view=None, *, period=None):
+    """
+    Serves a view from the page cache with per-request holes filled in.
+
+    Only GET and HEAD requests are cached, and only 200 responses are
+    stored. PAGE_CACHE_TIMEOUT set to 0 turns the cache off. A view whose
+    page also changes as time passes gives a `period` in seconds, and its
+    cached page and ETag are renewed at the start of every period.
+    """
+    if view is None:
+        return partial(cache_page_with_holes, period=period)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not settings.PAGE_CACHE_TIMEOUT or request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+
+        version, changed_at = content_version()
+        if period:
+            started = time.time() // period * period
+            version = f"{version}-{started:.0f}"
+            changed_at = max(changed_at, started)
+        path = request.get_full_path()
+        viewer = 'anonymous'
+        if request.user.is_authenticated:
+            # The filled page embeds a CSRF token, so it is only reusable
+            # while the visitor keeps the same user and CSRF cookie.
+            viewer = f"{request.user.id}:{request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')}"
+        etag = quote_etag(hashlib.md5(f"{path}|{version}|{viewer}".encode()).hexdigest())
+        last_modified = int(changed_at)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            key = PAGE_KEY.format(version=version, path=hashlib.md5(path.encode()).hexdigest())
+            shell = cache.get(key)
+            if shell is None:
+                rendered = _render_shell(view, request, args, kwargs)
+                if rendered.status_code != 200:
+                    return rendered
+                shell = rendered.content.decode(rendered.charset)
+                cache.set(key, shell, settings.PAGE_CACHE_TIMEOUT)
+            response = HttpResponse(fill_holes(request, shell))
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, no_cache=True, **{'private' if request.user.is_authenticated else 'public': True})
+        patch_vary_headers(response, ('Cookie',))
+        return response
+    return wrapper
@@ -0,0 +1,160 @@
+"""
+Keyset (cursor) pagination for the news article list.
+
+Pages are addressed by the (pub_date, id) of the row at the page edge
+instead of an offset, so every page is one indexed range scan and no
+COUNT(*) runs, however deep into the archive the reader goes.
+"""
+from datetime import datetime
+
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import F, Q
+
+CURSOR_SALT = 'qfb_main.pagination'
+ARTICLE_COUNT_CACHE_KEY = 'qfb_main:approximate_article_count'
+
+
+class KeysetPage:
+    """
+    One page of keyset-paginated results with opaque next/previous cursors.
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def encode_cursor(article, direction):
+    """
+    Returns an opaque, signed token pointing just past `article`.
+    """
+    pub_date = article.pub_date.isoformat() if article.pub_date else None
+    return signing.dumps([pub_date, article.id, direction], salt=CURSOR_SALT)
+
+
+def decode_cursor(token):
+    """
+    Returns (pub_date, id, direction) for a token, or None if it is invalid.
+    """
+    try:
+        pub_date, article_id, direction = signing.loads(token, salt=CURSOR_SALT)
+        pub_date = datetime.fromisoformat(pub_date) if pub_date else None
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    if direction not in ('next', 'previous'):
+        return None
+    return pub_date, article_id, direction
+
+
+def paginate_keyset(queryset, token, per_page):
+    """
+    Returns the page of `queryset` that `token` points at, newest first.
+
+    Rows are ordered by pub_date descending with undated rows last, then by
+    id descending. An empty or invalid token returns the first page.
+
+    Args:
+        queryset: An unordered NewsArticle queryset.
+        token: A cursor from a previous page, or None.
+        per_page: Number of articles per page.
+
+    Returns:
+        A KeysetPage.
+    """
+    cursor = decode_cursor(token) if token else None
+    if cursor is None:
+        rows = list(_newest_first(queryset)[:per_page + 1])
+        has_more = len(rows) > per_page
+        return _build_page(rows[:per_page], has_next=has_more, has_previous=False)
+
+    pub_date, article_id, direction = cursor
+    if direction == 'next':
+        rows = _rows_after(queryset, pub_date, article_id, per_page + 1)
+        has_more = len(rows) > per_page
+        return _build_page(rows[:per_page], has_next=has_more, has_previous=True)
+
+    rows = _rows_before(queryset, pub_date, article_id, per_page + 1)
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    rows.reverse()
+    return _build_page(rows, has_next=True, has_previous=has_more)
+
+
+def _newest_first(queryset):
+    return queryset.order_by(F('pub_date').desc(nulls_last=True), '-id')
+
+
+def _rows_after(queryset, pub_date, article_id, limit):
+    """
+    Returns up to `limit` rows that follow (pub_date, article_id), newest first.
+
+    The dated and undated rows are read separately so each read is a plain
+    range on the (status, pub_date, id) index; the undated ones are only
+    read once the dated rows run out.
+    """
+    rows = []
+    undated = queryset.filter(pub_date__isnull=True)
+    if pub_date is None:
+        undated = undated.filter(id__lt=article_id)
+    else:
+        dated = queryset.filter(Q(pub_date__lte=pub_date) & (Q(pub_date__lt=pub_date) | Q(id__lt=article_id)))
+        rows = list(dated.order_by('-pub_date', '-id')[:limit])
+    if len(rows) < limit:
+        rows += list(undated.order_by('-id')[:limit - len(rows)])
+    return rows
+
+
+def _rows_before(queryset, pub_date, article_id, limit):
+    """
+    Returns up to `limit` rows that precede (pub_date, article_id), oldest first.
+    """
+    rows = []
+    dated = queryset.filter(pub_date__isnull=False)
+    if pub_date is None:
+        rows = list(queryset.filter(pub_date__isnull=True, id__gt=article_id).order_by('id')[:limit])
+    else:
+        dated = queryset.filter(Q(pub_date__gte=pub_date) & (Q(pub_date__gt=pub_date) | Q(id__gt=article_id)))
+    if len(rows) < limit:
+        rows += list(dated.order_by('pub_date', 'id')[:limit - len(rows)])
+    return rows
+
+
+def _build_page(rows, has_next, has_previous):
+    if not rows:
+        return KeysetPage(rows)
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(rows[-1], 'next') if has_next else None,
+        previous_cursor=encode_cursor(rows[0], 'previous') if has_previous else None,
+    )
+
+
+def approximate_count(queryset, timeout):
+    """
+    Returns the number of rows in `queryset`, cached for `timeout` seconds.
+
+    The count is only refreshed when the cache entry expires, so it can lag
+    behind ingestion; it is meant for a "about N articles" label.
+    """
+    count = cache.get(ARTICLE_COUNT_CACHE_KEY)
+    if count is None:
+        count = queryset.count()
+        cache.set(ARTICLE_COUNT_CACHE_KEY, count, timeout)
+    return count
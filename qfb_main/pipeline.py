@@ -0,0 +1,181 @@
+"""
+The news ingestion pipeline run by call_news and news_worker.
+
+Pages come from the feed client (qfb_main.news_feed), are filtered against
+the ingestion state, segmented into sentences and written in set-based
+batches (qfb_main.ingestion). Nothing here is imported by the views, so
+web workers never ingest.
+"""
+import hashlib
+import logging
+import traceback
+from collections import Counter, deque
+
+from django.utils.text import slugify
+
+from qfb_main.ingestion import IngestionState, parse_pub_date, upsert_articles
+from qfb_main.news_feed import feed_queries, fetch_pages
+from qfb_main.replay import replay_pages
+from qfb_main.segmentation import SegmentationPool
+from qfb_main.summaries import paragraphs_html, summarize
+
+logger = logging.getLogger(__name__)
+
+
+def article_slug(title):
+    """
+    Returns the slug of an article title.
+
+    The suffix is derived from the title rather than random, so an article
+    keeps its slug however often it is ingested, and titles that slugify
+    alike still get distinct slugs.
+    """
+    suffix = hashlib.sha1(title.encode()).hexdigest()[:8]
+    return slugify(title)[:240].rstrip('-') + '-' + suffix
+
+
+def build_article_row(article, sentences):
+    """
+    Converts one newsdata.io result into NewsArticle field values.
+
+    Args:
+        article: A dict from the 'results' list of the API response.
+        sentences: The article's content split into sentences.
+
+    Returns:
+        A dict of NewsArticle field values ready for upsert_articles,
+        including the summary the list page shows and the body's HTML
+        (see qfb_main.summaries).
+    """
+    pub_date = parse_pub_date(article.get('pubDate', None))
+    slug = article_slug(article['title'])
+    paragraphs = group_into_paragraphs(sentences, 5)
+    formatted_content = "\n\n".join(paragraphs)
+    return {
+        'title': article['title'],
+        'slug': slug,
+        'content': formatted_content,
+        'content_html': paragraphs_html(paragraphs),
+        'content_is_html': False,
+        **summarize(formatted_content),
+        'author_id': 1,
+        'source_id': article['source_id'],
+        'source_priority': article['source_priority'],
+        'category': ','.join(article['category']),
+        'language': article['language'],
+        'pub_date': pub_date,
+        'image_url': article.get('image_url', ''),
+        'status': 1
+    }
+
+
+def fetch_news(queries=None, concurrency=None, max_pages=None, processes=None, replay=None):
+    """
+    Fetches news from an API and processes the data.
+
+    Args:
+        queries: Query parameter dicts to fetch; defaults to feed_queries().
+        concurrency: Number of concurrent requests; defaults to NEWS_FETCH_CONCURRENCY.
+        max_pages: Pages followed per query at most; defaults to NEWS_MAX_PAGES.
+        processes: Segmentation worker processes; defaults to SEGMENTATION_N_PROCESS.
+        replay: Paths of recorded API responses to ingest instead of
+            fetching from the API (see qfb_main.replay).
+
+    Pages are fetched concurrently and parsed as they stream in (see
+    qfb_main.news_feed.fetch_pages), and their articles are handed on in
+    batches of INGEST_BATCH_SIZE. Batches are segmented in a pool of
+    worker processes (see qfb_main.segmentation.SegmentationPool) and
+    stored in the order they were fetched with set-based writes (see
+    qfb_main.ingestion.upsert_articles), while later pages are still
+    downloading and being segmented. Memory use therefore depends on the
+    batch size, not on the size of a page. Articles that are unchanged
+    since the last run, or older than their source's high-water mark, are
+    dropped before segmentation (see qfb_main.ingestion.IngestionState).
+
+    Returns:
+        A Counter with the number of 'pages' fetched and of 'inserted',
+        'updated' and 'skipped' articles, plus the 'unchanged' and 'stale'
+        articles dropped before processing. 'failed' counts the queries
+        and pages that could not be fetched or stored; a run with failures
+        can simply be repeated, as whatever it did store is skipped then.
+    """
+    stats = Counter(pages=0, inserted=0, updated=0, skipped=0, stale=0, unchanged=0, failed=0)
+    state = IngestionState()
+    # Counted by the fetch threads, so kept apart until they have finished.
+    fetch_stats = Counter()
+    if replay is not None:
+        batches = replay_pages(replay, stats=fetch_stats)
+    else:
+        batches = fetch_pages(queries or feed_queries(), concurrency=concurrency, max_pages=max_pages,
+                              until=state.is_stale_page, stats=fetch_stats)
+    with SegmentationPool(processes=processes) as nlp:
+        # Batches handed to the pool, oldest first. Keeping about one batch
+        # per process in flight keeps every worker busy while batches are
+        # stored as soon as they, and all batches before them, are done.
+        in_flight = deque()
+        for articles in batches:
+            try:
+                changed = state.select_changed(articles, stats)
+                if changed:
+                    in_flight.append((changed, nlp.submit(article.get('content') or '' for article, _ in changed)))
+            except Exception as e:
+                stats['failed'] += 1
+                tb_str = traceback.format_exception(type(e), e, e.__traceback__)
+                logger.error(f"An error occurred while processing the API response: {e}\n{''.join(tb_str)}")
+            while in_flight and (len(in_flight) > nlp.processes or in_flight[0][1].done()):
+                store_segmented(*in_flight.popleft(), state, stats)
+        while in_flight:
+            store_segmented(*in_flight.popleft(), state, stats)
+    stats['pages'] += fetch_stats['pages']
+    stats['failed'] += fetch_stats['failed']
+    return stats
+
+
+def store_segmented(changed, segmented, state, stats):
+    """
+    Writes one segmented batch and records it in the ingestion state.
+
+    Args:
+        changed: The batch's (article, fingerprint) pairs.
+        segmented: The future of the batch's sentences from SegmentationPool.submit.
+        state: The run's IngestionState.
+        stats: The run's Counter, updated in place.
+    """
+    try:
+        rows = []
+        ingested = []
+        for (article, fingerprint), article_sentences in zip(changed, segmented.result()):
+            try:
+                rows.append(build_article_row(article, article_sentences))
+                ingested.append((article, fingerprint))
+            except Exception as e:
+                stats['skipped'] += 1
+                tb_str = traceback.format_exception(type(e), e, e.__traceback__)
+                logger.error(f"Failed to prepare article: {e}\n{''.join(tb_str)}")
+        failed = []
+        stats.update(upsert_articles(rows, failed=failed))
+        # Rows the database rejected are fetched and tried again next time.
+        failed = set(failed)
+        state.record([(article, fingerprint) for article, fingerprint in ingested if article['title'] not in failed])
+    except Exception as e:
+        stats['failed'] += 1
+        tb_str = traceback.format_exception(type(e), e, e.__traceback__)
+        logger.error(f"An error occurred while processing the API response: {e}\n{''.join(tb_str)}")
+
+
+def group_into_paragraphs(sentences, n=5):
+    """
+    Groups sentences into paragraphs.
+
+    Args:
+        sentences: A list of sentences to group.
+        n: Number of sentences per paragraph.
+
+    Returns:
+        A list of paragraphs.
+    """
+    paragraphs = []
+    for i in range(0, len(sentences), n):
+        paragraph = " ".join(sentences[i:i+n])
+        paragraphs.append(paragraph)
+    return paragraphs
@@ -0,0 +1,144 @@
+"""
+Offline feed payloads for replaying ingestion without the network.
+
+Recorded newsdata.io responses, one JSON document per file, can be fed
+through the full fetch_news pipeline with ``call_news --replay``. For load
+testing, synthetic_payloads() generates responses of the same shape for
+any number of articles, and write_payloads() stores them as files.
+"""
+import glob
+import json
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.conf import settings
+
+from qfb_main.streaming import FeedStream, batched, read_chunks
+
+PAGE_SIZE = 50
+
+_WORDS = (
+    'council', 'budget', 'storm', 'market', 'election', 'court', 'vaccine', 'league', 'climate',
+    'startup', 'merger', 'wildfire', 'tariff', 'satellite', 'festival', 'strike', 'harbour', 'rail',
+    'senate', 'inflation', 'drought', 'museum', 'airline', 'hospital', 'school', 'energy', 'housing',
+    'report', 'officials', 'residents', 'analysts', 'investors', 'players', 'voters', 'researchers',
+)
+_VERBS = (
+    'said', 'announced', 'warned', 'confirmed', 'rejected', 'approved', 'delayed', 'expanded',
+    'questioned', 'welcomed', 'reported', 'expected',
+)
+_NAMES = ('Smith', 'Garcia', 'Okafor', 'Nguyen', 'Kowalski', 'Haddad', 'Tanaka', 'Murphy')
+_CATEGORIES = ('top', 'world', 'business', 'politics', 'sports', 'science', 'entertainment')
+
+
+def expand_paths(patterns):
+    """
+    Returns the files matching a list of paths or glob patterns, sorted,
+    so patterns the shell did not expand work as well.
+    """
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        paths.extend(matches or [pattern])
+    return paths
+
+
+def replay_pages(paths, batch_size=None, stats=None):
+    """
+    Yields the articles of each recorded response in batches, like
+    qfb_main.news_feed.fetch_pages. Files are parsed incrementally, so a
+    large recording is never loaded whole.
+
+    Args:
+        paths: Paths of JSON files holding one newsdata.io response each.
+        batch_size: Articles per batch; defaults to INGEST_BATCH_SIZE.
+        stats: A Counter, optional; 'pages' is incremented for every file read.
+    """
+    for path in paths:
+        with open(path, 'rb') as payload:
+            yield from batched(FeedStream(read_chunks(payload)), batch_size or settings.INGEST_BATCH_SIZE)
+        if stats is not None:
+            stats['pages'] += 1
+
+
+def synthetic_payloads(count, page_size=PAGE_SIZE, seed=0, sources=20):
+    """
+    Yields newsdata.io-shaped responses holding `count` articles in total.
+
+    Articles are generated lazily, newest first like the real feed, with
+    multi-paragraph bodies whose sentences include abbreviations, initials
+    and numbers. The same arguments always produce the same payloads.
+
+    Args:
+        count: Number of articles across all pages.
+        page_size: Articles per response.
+        seed: Seed for the random content.
+        sources: Number of distinct source_id values.
+    """
+    rng = random.Random(seed)
+    newest = datetime(2024, 6, 1)
+    pages = (count + page_size - 1) // page_size
+    for page in range(pages):
+        first = page * page_size
+        results = [
+            _synthetic_article(rng, i, newest - timedelta(minutes=i), sources)
+            for i in range(first, min(first + page_size, count))
+        ]
+        yield {
+            'status': 'success',
+            'totalResults': count,
+            'results': results,
+            'nextPage': f"synthetic-{page + 1}" if page + 1 < pages else None,
+        }
+
+
+def _synthetic_article(rng, i, pub_date, sources):
+    paragraphs = []
+    for _ in range(rng.randint(2, 5)):
+        paragraphs.append(' '.join(_synthetic_sentence(rng) for _ in range(rng.randint(3, 6))))
+    source = rng.randrange(sources)
+    return {
+        'article_id': f"synthetic{i:08d}",
+        'title': f"Synthetic article {i}: {rng.choice(_WORDS).title()} {rng.choice(_VERBS)} {rng.choice(_WORDS)}",
+        'link': f"https://example.com/news/{i}",
+        'content': '\n\n'.join(paragraphs),
+        'pubDate': pub_date.strftime('%Y-%m-%d %H:%M:%S'),
+        'image_url': f"https://example.com/images/{i}.jpg",
+        'source_id': f"synthetic{source}",
+        'source_priority': 1000 + source,
+        'country': ['united states of america'],
+        'category': rng.sample(_CATEGORIES, rng.randint(1, 2)),
+        'language': 'english',
+    }
+
+
+def _synthetic_sentence(rng):
+    words = rng.sample(_WORDS, rng.randint(6, 14))
+    shape = rng.random()
+    if shape < 0.2:
+        words.insert(0, f"Dr. {rng.choice('ABCDEFGHJK')}. {rng.choice(_NAMES)} {rng.choice(_VERBS)} the")
+    elif shape < 0.35:
+        words.append(f"by {rng.randint(2, 99)}.{rng.randint(0, 9)} per cent")
+    elif shape < 0.45:
+        words.insert(0, f"“The {rng.choice(_WORDS)} {rng.choice(_VERBS)},” {rng.choice(_NAMES)} said, and")
+    sentence = ' '.join(words)
+    return sentence[0].upper() + sentence[1:] + rng.choice('..........!?')
+
+
+def write_payloads(directory, count, page_size=PAGE_SIZE, seed=0):
+    """
+    Writes synthetic_payloads() to numbered JSON files in `directory`.
+
+    Returns:
+        The list of file paths written, in page order.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for page, payload in enumerate(synthetic_payloads(count, page_size, seed)):
+        path = directory / f"page-{page:05d}.json"
+        with open(path, 'w', encoding='utf-8') as out:
+            json.dump(payload, out)
+        paths.append(str(path))
+    return paths
@@ -0,0 +1,251 @@
+"""
+Full-text search over NewsArticle titles and content.
+
+On SQLite the index is an FTS5 table kept in step with qfb_main_newsarticle
+by triggers; on PostgreSQL it is a GIN index over a weighted tsvector
+expression. Both are created by migration 0003, so every insert, bulk
+upsert from fetch_news and admin save updates the index row by row. Later
+migrations that rebuild the SQLite table drop its triggers, which
+restore_triggers puts back after every migrate.
+Callers only use search_backend() and the methods of SearchBackend.
+"""
+import re
+
+from django.db import connections
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+
+FTS_TABLE = 'qfb_main_newsarticle_fts'
+
+# Private-use characters mark highlighted terms until the text is escaped.
+_START = '\ue000'
+_STOP = '\ue001'
+
+SQLITE_TRIGGERS = [f"{FTS_TABLE}_insert", f"{FTS_TABLE}_delete", f"{FTS_TABLE}_update"]
+
+SQLITE_CREATE = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, content, content='qfb_main_newsarticle', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON qfb_main_newsarticle BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON qfb_main_newsarticle BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF title, content ON qfb_main_newsarticle BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+
+# CROSS JOIN pins the FTS table as the outer loop. Left to itself SQLite
+# scans the articles and runs the MATCH once per row, which is orders of
+# magnitude slower for common words.
+SQLITE_MATCHES = (
+    f"{FTS_TABLE} f CROSS JOIN qfb_main_newsarticle a ON a.id = f.rowid "
+    f"WHERE {FTS_TABLE} MATCH %s AND a.status = 1"
+)
+
+SQLITE_DROP = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+# Must match the indexed expression exactly for PostgreSQL to use the index.
+POSTGRES_VECTOR = (
+    "(setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'B'))"
+)
+POSTGRES_CREATE = [
+    f"CREATE INDEX IF NOT EXISTS qfb_main_newsarticle_search ON qfb_main_newsarticle USING GIN ({POSTGRES_VECTOR})",
+]
+POSTGRES_DROP = [
+    "DROP INDEX IF EXISTS qfb_main_newsarticle_search",
+]
+
+
+class SearchBackend:
+    """
+    Ranked, highlighted full-text search over published articles.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def search(self, query, limit, offset=0):
+        """
+        Returns up to `limit` results, best match first, as dicts with the
+        article 'id' and HTML-safe 'title' and 'snippet' with <mark> tags.
+        """
+        raise NotImplementedError
+
+    def count(self, query):
+        """
+        Returns the number of published articles matching `query`.
+        """
+        raise NotImplementedError
+
+    def filter_queryset(self, queryset, query):
+        """
+        Narrows a NewsArticle queryset, of any status, to rows matching `query`.
+        """
+        raise NotImplementedError
+
+    def _fetch(self, sql, params):
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+class SQLiteSearchBackend(SearchBackend):
+
+    def search(self, query, limit, offset=0):
+        match = fts5_query(query)
+        if not match:
+            return []
+        rows = self._fetch(
+            f"""SELECT f.rowid, highlight({FTS_TABLE}, 0, %s, %s), snippet({FTS_TABLE}, 1, %s, %s, '…', 24)
+            FROM {SQLITE_MATCHES}
+            ORDER BY bm25({FTS_TABLE}, 10.0, 1.0) LIMIT %s OFFSET %s""",
+            [_START, _STOP, _START, _STOP, match, limit, offset],
+        )
+        return [_result(*row) for row in rows]
+
+    def count(self, query):
+        match = fts5_query(query)
+        if not match:
+            return 0
+        return self._fetch(
+            f"SELECT COUNT(*) FROM {SQLITE_MATCHES}",
+            [match],
+        )[0][0]
+
+    def filter_queryset(self, queryset, query):
+        match = fts5_query(query)
+        if not match:
+            return queryset.none()
+        return queryset.filter(id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]))
+
+
+class PostgresSearchBackend(SearchBackend):
+
+    def search(self, query, limit, offset=0):
+        if not query.strip():
+            return []
+        options = f"StartSel={_START}, StopSel={_STOP}"
+        rows = self._fetch(
+            f"""SELECT id, ts_headline('english', title, q, %s || ', HighlightAll=true'),
+                ts_headline('english', content, q, %s || ', MaxFragments=2, MaxWords=24')
+            FROM qfb_main_newsarticle, websearch_to_tsquery('english', %s) q
+            WHERE status = 1 AND {POSTGRES_VECTOR} @@ q
+            ORDER BY ts_rank({POSTGRES_VECTOR}, q) DESC LIMIT %s OFFSET %s""",
+            [options, options, query, limit, offset],
+        )
+        return [_result(*row) for row in rows]
+
+    def count(self, query):
+        if not query.strip():
+            return 0
+        return self._fetch(
+            f"""SELECT COUNT(*) FROM qfb_main_newsarticle
+            WHERE status = 1 AND {POSTGRES_VECTOR} @@ websearch_to_tsquery('english', %s)""",
+            [query],
+        )[0][0]
+
+    def filter_queryset(self, queryset, query):
+        if not query.strip():
+            return queryset.none()
+        return queryset.filter(id__in=RawSQL(
+            f"SELECT id FROM qfb_main_newsarticle WHERE {POSTGRES_VECTOR} @@ websearch_to_tsquery('english', %s)",
+            [query],
+        ))
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def search_backend(using='default'):
+    """
+    Returns the search backend for a database alias.
+    """
+    connection = connections[using]
+    try:
+        return BACKENDS[connection.vendor](connection)
+    except KeyError:
+        raise NotImplementedError(f"Full-text search is not available on {connection.vendor}")
+
+
+def restore_triggers(using='default', **kwargs):
+    """
+    Recreates any missing SQLite index trigger and rebuilds the index.
+
+    Adding or altering a NewsArticle column makes SQLite copy the table,
+    which drops its triggers, so this runs after every migrate as a
+    post_migrate receiver. Does nothing on other databases, before
+    migration 0003 has created the index, or when every trigger is there.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT type, name FROM sqlite_master WHERE name = %s OR (type = 'trigger' AND tbl_name = %s)",
+            [FTS_TABLE, 'qfb_main_newsarticle'],
+        )
+        existing = set(cursor.fetchall())
+        if ('table', FTS_TABLE) not in existing or existing >= {('trigger', name) for name in SQLITE_TRIGGERS}:
+            return
+        # The FTS table itself survives the copy; its triggers and contents do not.
+        for statement in SQLITE_CREATE[1:]:
+            cursor.execute(statement)
+
+
+def fts5_query(query):
+    """
+    Turns free text into an FTS5 query that matches all of its words.
+
+    Every word is quoted, so operators and punctuation typed by a visitor
+    cannot produce a syntax error; the last word also matches as a prefix.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return ''
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _result(article_id, title, snippet):
+    return {'id': article_id, 'title': _highlight(title), 'snippet': _highlight(snippet)}
+
+
+def _highlight(text):
+    return escape(text or '').replace(_START, '<mark>').replace(_STOP, '</mark>')
+
+
+class SearchResults:
+    """
+    Lazily evaluated search results that Django's Paginator can page through.
+    """
+
+    def __init__(self, query, backend=None):
+        self.query = query
+        self.backend = backend or search_backend()
+
+    def count(self):
+        return self.backend.count(self.query)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self.backend.search(self.query, 1, index)[0]
+        return self.backend.search(self.query, index.stop - index.start, index.start)
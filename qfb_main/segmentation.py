@@ -0,0 +1,235 @@
+"""
+Sentence segmentation for ingested article bodies.
+
+Two backends are available, chosen by SEGMENTATION_BACKEND: 'spacy' runs the
+statistical pipeline, 'rules' runs a pure-Python splitter that never loads a
+model. spaCy is imported the first time a pipeline is needed, never at module
+import, so web workers that only serve pages do not pay for loading it.
+"""
+import logging
+import re
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Components of en_core_web_sm that sentence splitting does not need. The
+# parser is kept only when SPACY_COMPONENT asks for it; otherwise the
+# lightweight statistical senter does the work on its own.
+_EXCLUDE = {
+    'senter': ['tok2vec', 'tagger', 'parser', 'attribute_ruler', 'lemmatizer', 'ner'],
+    'parser': ['tagger', 'attribute_ruler', 'lemmatizer', 'ner', 'senter'],
+}
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline():
+    """
+    Returns the process-wide spaCy pipeline, loading it on first use.
+
+    Returns:
+        A spaCy Language object that sets sentence boundaries.
+    """
+    global _pipeline
+    if _pipeline is None:
+        with _pipeline_lock:
+            if _pipeline is None:
+                _pipeline = _load_pipeline(settings.SPACY_MODEL, settings.SPACY_COMPONENT)
+    return _pipeline
+
+
+def _load_pipeline(model, component):
+    import spacy
+
+    if component not in _EXCLUDE:
+        raise ValueError(f"SPACY_COMPONENT must be one of {sorted(_EXCLUDE)}, not {component!r}")
+    logger.info("Loading spaCy model %s with the %s component", model, component)
+    nlp = spacy.load(model, exclude=_EXCLUDE[component])
+    if component == 'senter' and 'senter' in nlp.disabled:
+        nlp.enable_pipe('senter')
+    return nlp
+
+
+def segment_texts(texts, batch_size=None, n_process=None, backend=None):
+    """
+    Splits each text into sentences with the configured backend.
+
+    Args:
+        texts: An iterable of strings.
+        batch_size: Texts per spaCy batch; defaults to SEGMENTATION_BATCH_SIZE.
+        n_process: Worker processes for spaCy; defaults to SEGMENTATION_N_PROCESS.
+        backend: 'spacy' or 'rules'; defaults to SEGMENTATION_BACKEND.
+
+    Returns:
+        A list with one list of sentence strings per input text, in input order.
+    """
+    backend = backend or settings.SEGMENTATION_BACKEND
+    if backend == 'rules':
+        return [split_sentences_rules(text) for text in texts]
+    if backend != 'spacy':
+        raise ValueError(f"SEGMENTATION_BACKEND must be 'spacy' or 'rules', not {backend!r}")
+    nlp = get_pipeline()
+    docs = nlp.pipe(
+        texts,
+        batch_size=batch_size or settings.SEGMENTATION_BATCH_SIZE,
+        n_process=n_process or settings.SEGMENTATION_N_PROCESS,
+    )
+    return [[sent.text for sent in doc.sents] for doc in docs]
+
+
+class SegmentationPool:
+    """
+    Segments batches of texts in a pool of worker processes.
+
+    Each worker loads the spaCy pipeline once, when it starts, and keeps it
+    for every batch it is given. A submitted batch is cut into chunks that
+    are spread over the workers, and its result is reassembled in input
+    order. With a single process the work runs inline and no process is
+    started. Use it as a context manager so the workers are shut down.
+    """
+
+    def __init__(self, processes=None, backend=None, chunk_size=None):
+        self.processes = processes or settings.SEGMENTATION_N_PROCESS
+        self.backend = backend or settings.SEGMENTATION_BACKEND
+        self.chunk_size = chunk_size or settings.SEGMENTATION_BATCH_SIZE
+        self.executor = None
+
+    def __enter__(self):
+        if self.processes > 1:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.processes,
+                initializer=_init_worker,
+                initargs=(self.backend, settings.SPACY_MODEL, settings.SPACY_COMPONENT, self.chunk_size),
+            )
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+    def submit(self, texts):
+        """
+        Starts segmenting a batch of texts.
+
+        Args:
+            texts: An iterable of strings.
+
+        Returns:
+            A future-like object whose result() is what segment_texts would
+            return for the batch.
+        """
+        texts = list(texts)
+        if self.executor is None:
+            future = Future()
+            future.set_result(segment_texts(texts, batch_size=self.chunk_size, n_process=1, backend=self.backend))
+            return future
+        # Small batches are still split so that every worker gets a share.
+        size = max(1, min(self.chunk_size, -(-len(texts) // self.processes)))
+        chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+        return _ChunkedResult([self.executor.submit(_segment_in_worker, chunk) for chunk in chunks])
+
+
+class _ChunkedResult:
+
+    def __init__(self, futures):
+        self.futures = futures
+
+    def done(self):
+        return all(future.done() for future in self.futures)
+
+    def result(self):
+        return [sentences for future in self.futures for sentences in future.result()]
+
+
+_worker_options = {}
+
+
+def _init_worker(backend, model, component, batch_size):
+    global _pipeline
+    _worker_options.update(backend=backend, batch_size=batch_size)
+    if backend == 'spacy':
+        _pipeline = _load_pipeline(model, component)
+
+
+def _segment_in_worker(texts):
+    return segment_texts(texts, n_process=1, **_worker_options)
+
+
+def split_sentences(text, backend=None):
+    """
+    Splits a single text into a list of sentence strings.
+    """
+    return segment_texts([text], backend=backend)[0]
+
+
+# Abbreviations that are practically never the last word of a sentence.
+# Other abbreviations (Inc., U.S., etc.) end a sentence when the next word
+# is capitalised, which is what a reader would assume too.
+NON_TERMINAL_ABBREVIATIONS = frozenset({
+    'mr', 'mrs', 'ms', 'mx', 'dr', 'prof', 'sr', 'jr', 'st', 'mt', 'ft',
+    'gen', 'gov', 'sen', 'rep', 'rev', 'hon', 'pres', 'supt', 'lt', 'col',
+    'capt', 'cmdr', 'sgt', 'cpl', 'pvt', 'adm', 'maj', 'fr', 'atty',
+    'no', 'nos', 'vol', 'fig', 'approx', 'vs', 'v', 'e.g', 'i.e', 'cf',
+    'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'sept', 'oct', 'nov', 'dec',
+})
+
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+# Terminal punctuation, any closing quotes or brackets, then whitespace.
+_CANDIDATE_BOUNDARY = re.compile(r'[.!?\u2026]+["\'\u201d\u2019)\]]*\s+')
+_OPENING_QUOTES = '"\'\u201c\u2018'
+
+
+def split_sentences_rules(text):
+    """
+    Splits text into sentences with punctuation and abbreviation rules.
+
+    Blank lines always end a sentence. Within a block, a sentence ends at
+    '.', '!', '?' or an ellipsis (plus any closing quotes) followed by
+    whitespace and a capitalised word or a number. Decimals never match
+    because they have no whitespace after the point, and honorifics,
+    titles and single-letter initials never end a sentence.
+
+    Args:
+        text: The text to split.
+
+    Returns:
+        A list of sentence strings with surrounding whitespace removed.
+    """
+    sentences = []
+    for block in _PARAGRAPH_BREAK.split(text):
+        start = 0
+        for match in _CANDIDATE_BOUNDARY.finditer(block):
+            if not _starts_sentence(block, match.end()):
+                continue
+            if block[match.start()] == '.' and _is_non_terminal(block, start, match.start()):
+                continue
+            sentence = block[start:match.end()].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        sentence = block[start:].strip()
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+def _starts_sentence(text, pos):
+    while pos < len(text) and text[pos] in _OPENING_QUOTES:
+        pos += 1
+    return pos < len(text) and (text[pos].isupper() or text[pos].isdigit())
+
+
+def _is_non_terminal(text, start, period):
+    pos = period
+    while pos > start and not text[pos - 1].isspace():
+        pos -= 1
+    word = text[pos:period].lstrip(_OPENING_QUOTES + '([')
+    if len(word) == 1 and word.isalpha():
+        # An initial, as in "John F. Kennedy".
+        return True
+    return word.lower() in NON_TERMINAL_ABBREVIATIONS
@@ -0,0 +1,38 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from comments.models import Comment
+from qfb_main.fragments import invalidate_article_cards
+from qfb_main.models import NewsArticle
+from qfb_main.page_cache import mark_content_changed
+
+# Sent by qfb_main.ingestion after a batch that wrote rows is committed, with
+# the ids of the existing articles it changed. Bulk writes do not send
+# post_save.
+articles_upserted = Signal()
+
+
+def content_changed(article_ids):
+    """
+    Drops the cached cards of the given articles and every cached page.
+    """
+    invalidate_article_cards(article_ids)
+    mark_content_changed()
+
+
+@receiver(post_save, sender=NewsArticle)
+@receiver(post_delete, sender=NewsArticle)
+def article_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: content_changed([instance.id]))
+
+
+@receiver(articles_upserted)
+def articles_ingested(sender, updated_ids, **kwargs):
+    content_changed(updated_ids)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: content_changed([instance.news_article_id]))
@@ -0,0 +1,152 @@
+"""
+Incremental parsing of newsdata.io responses.
+
+A response is a JSON object whose 'results' array can hold thousands of
+articles. FeedStream reads the body chunk by chunk and yields one article
+at a time, so only the article being decoded and an unread chunk are held
+in memory, never the whole body or the whole object tree. The other
+top-level members, such as 'nextPage', are collected into FeedStream.fields
+as they are passed.
+
+Only the standard library is used: each value is decoded with
+json.JSONDecoder.raw_decode once the buffer holds all of it.
+"""
+import codecs
+import json
+
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = ' \t\n\r'
+
+
+class FeedStream:
+    """
+    Iterates over the 'results' of one JSON response read in chunks.
+
+    Args:
+        chunks: An iterable of bytes (decoded as UTF-8) or str chunks.
+        key: The member whose array items are streamed.
+
+    Raises:
+        ValueError: If the body is not a JSON object or is cut short.
+    """
+
+    def __init__(self, chunks, key='results'):
+        self.chunks = iter(chunks)
+        self.key = key
+        self.fields = {}
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._exhausted = False
+
+    def __iter__(self):
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            name = self._value()
+            self._expect(':')
+            if name == self.key and self._peek() == '[':
+                self._pos += 1
+                yield from self._items()
+            else:
+                self.fields[name] = self._value()
+            if self._next_delimiter(',}') == '}':
+                return
+
+    def _items(self):
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self._value()
+            if self._next_delimiter(',]') == ']':
+                return
+
+    def _value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number or literal at the very end of the buffer may continue
+            # in the next chunk.
+            if end == len(self._buffer) and self._fill():
+                continue
+            self._pos = end
+            self._compact()
+            return value
+
+    def _peek(self):
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON response")
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self._pos} of the JSON response")
+        self._pos += 1
+
+    def _next_delimiter(self, allowed):
+        char = self._peek()
+        if char not in allowed:
+            raise ValueError(f"Expected one of {allowed!r} at offset {self._pos} of the JSON response")
+        self._pos += 1
+        return char
+
+    def _fill(self):
+        # Appends the next non-empty chunk; returns False at the end of the body.
+        while not self._exhausted:
+            try:
+                chunk = next(self.chunks)
+            except StopIteration:
+                self._exhausted = True
+                chunk = self._text.decode(b'', final=True)
+            else:
+                if isinstance(chunk, bytes):
+                    chunk = self._text.decode(chunk)
+            if chunk:
+                self._buffer += chunk
+                return True
+        return False
+
+    def _compact(self):
+        # Drops what has been parsed so the buffer never grows with the body.
+        if self._pos > CHUNK_SIZE:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+
+
+def read_chunks(file, chunk_size=CHUNK_SIZE):
+    """
+    Yields the contents of a binary file object in chunks.
+    """
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def batched(items, size):
+    """
+    Yields lists of up to `size` consecutive items.
+    """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,77 @@
+"""
+Read-side summary and HTML of an article, computed when the article is written.
+
+The home page shows a short excerpt of every article with its reading time
+instead of the whole body. Both, and the excerpt's paragraph HTML, are
+stored on NewsArticle by ingestion and by NewsArticle.save(), so listing
+articles never loads or formats their content. The body's HTML is stored
+as well, so the detail page outputs it without running linebreaks; HTML
+from the admin editor is sanitized first.
+"""
+import math
+
+import bleach
+from django.utils.html import escape, linebreaks, strip_tags
+from django.utils.text import Truncator
+
+# Words in an excerpt at most; the cut falls on a word boundary.
+EXCERPT_WORDS = 60
+
+# Average adult reading speed used for the reading time estimate.
+WORDS_PER_MINUTE = 230
+
+# Markup kept in HTML from the admin editor; anything else is escaped.
+ALLOWED_TAGS = {
+    'a', 'b', 'blockquote', 'br', 'code', 'div', 'em', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img',
+    'li', 'ol', 'p', 'pre', 's', 'span', 'strike', 'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'th',
+    'thead', 'tr', 'u', 'ul',
+}
+ALLOWED_ATTRIBUTES = {
+    'a': ['href', 'title', 'target'],
+    'img': ['src', 'alt', 'title', 'width', 'height'],
+    'td': ['colspan', 'rowspan'],
+    'th': ['colspan', 'rowspan'],
+}
+
+
+def summarize(content, excerpt=''):
+    """
+    Returns the summary fields of an article body.
+
+    Args:
+        content: The article body; plain paragraphs separated by blank lines,
+            or HTML from the admin editor, whose tags are ignored.
+        excerpt: An excerpt written by hand, kept as is if given.
+
+    Returns:
+        A dict with the 'excerpt', its paragraph HTML as 'excerpt_html' and
+        the 'reading_time' in whole minutes, at least one.
+    """
+    text = strip_tags(content or '')
+    if not excerpt:
+        first_paragraph = text.strip().split('\n\n', 1)[0]
+        excerpt = Truncator(first_paragraph).words(EXCERPT_WORDS)
+    return {
+        'excerpt': excerpt,
+        'excerpt_html': linebreaks(excerpt, autoescape=True),
+        'reading_time': max(1, math.ceil(len(text.split()) / WORDS_PER_MINUTE)),
+    }
+
+
+def paragraphs_html(paragraphs):
+    """
+    Returns the HTML of plain-text paragraphs, escaped, one <p> each, with
+    line breaks inside a paragraph kept as <br>.
+    """
+    return '\n\n'.join('<p>%s</p>' % escape(paragraph).replace('\n', '<br>') for paragraph in paragraphs)
+
+
+def render_content(content, is_html=False):
+    """
+    Returns the HTML of an article body: the editor's HTML with anything
+    outside ALLOWED_TAGS and ALLOWED_ATTRIBUTES escaped if `is_html` is
+    set, otherwise what the linebreaks filter makes of plain text.
+    """
+    if is_html:
+        return bleach.clean(content or '', tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES)
+    return linebreaks(content or '', autoescape=True)
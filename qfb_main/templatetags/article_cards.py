@@ -0,0 +1,15 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from qfb_main.fragments import render_article_card
+
+register = template.Library()
+
+
+@register.simple_tag
+def article_card(news_article, full=False):
+    """
+    Renders the cached card of `news_article`, showing the whole article if
+    `full` is set and its excerpt otherwise.
+    """
+    return mark_safe(render_article_card(news_article, full))
@@ -0,0 +1,17 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from qfb_main.page_cache import HOLE_MARKER, is_shell_render, render_hole
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, arg=''):
+    """
+    Renders 'holes/<name>.html' for the current request, or leaves a marker
+    in its place when the page is being rendered into the page cache.
+    """
+    if is_shell_render(context):
+        return mark_safe(HOLE_MARKER.format(name=name, arg=arg))
+    return mark_safe(render_hole(context.get('request'), name, arg))
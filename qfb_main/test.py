@@ -1,19 +1,99 @@
-from django.test import TestCase
-from unittest.mock import patch
-from django.urls import reverse
-from qfb_main.models import NewsArticle
+import json
+import logging
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import MagicMock, patch
+from urllib.parse import parse_qs, urlparse
+
+from django.conf import settings
+from django.contrib import admin
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection, connections
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from django.utils import timezone
-from qfb_main.views import group_into_paragraphs, make_api_call
-import logging
+from django.utils.text import slugify
+
+from comments.counters import comments_added, refresh_comment_counts
+from comments.models import Comment
+from qfb_main import segmentation
+from qfb_main.admin import NewsArticleAdmin
+from qfb_main.fragments import card_cache_stats, render_article_card
+from qfb_main.ingestion import upsert_articles
+from qfb_main.models import ArticleFingerprint, IngestionJob, IngestionSource, NewsArticle, WorkerLease
+from qfb_main.news_feed import feed_queries, fetch_pages, make_api_call
+from qfb_main.pagination import paginate_keyset
+from qfb_main.pipeline import fetch_news, group_into_paragraphs
+from qfb_main.replay import synthetic_payloads, write_payloads
+from qfb_main.search import FTS_TABLE, search_backend
+from qfb_main.streaming import FeedStream
+from qfb_main.summaries import render_content, summarize
+from qfb_main.worker import Lease, NewsWorker, enqueue_fetch, run_job, schedule_due
+from quickfire_bulletin.coldstart import slowest_imports
+from quickfire_bulletin.db_routers import DatabaseHealthMonitor, ReplicaRouter
+from quickfire_bulletin.log import QueuedFileHandler, SampleFilter
+from quickfire_bulletin.perf import Histogram, recorder
+from quickfire_bulletin.sqlite import pragmas
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+def article_rows(count, author, revision=0):
+    """
+    Builds field values for `count` published articles to pass to upsert_articles.
+
+    Rows with the same index keep their title across revisions, so a higher
+    revision reads as an update of the same articles.
+    """
+    start = timezone.make_aware(datetime(2024, 1, 1))
+    rows = []
+    for i in range(count):
+        content = f"Body of article {i}, revision {revision}."
+        rows.append({
+            'title': f"Article {i}",
+            'slug': f"article-{i}",
+            'content': content,
+            'content_html': render_content(content),
+            **summarize(content),
+            'author_id': author.id,
+            'source_id': 'test',
+            'source_priority': i,
+            'category': 'top',
+            'language': 'english',
+            'pub_date': start + timedelta(minutes=i),
+            'image_url': '',
+            'status': 1,
+        })
+    return rows
+
+
+def create_articles(count, author):
+    """
+    Stores `count` published articles by `author` and returns them in id order.
+    """
+    upsert_articles(article_rows(count, author))
+    return list(NewsArticle.objects.order_by('id'))
+
 class TestMakeApiCall(TestCase):
 
-    @patch('qfb_main.views.requests.get')
+    @patch('qfb_main.news_feed.requests.get')
     def test_make_api_call_success(self, mock_get):
         mock_get.return_value.status_code = 200
         mock_get.return_value.json.return_value = {'key': 'value'}
@@ -36,6 +116,940 @@ class TestGroupIntoParagraphs(TestCase):
 
         self.assertEqual(paragraphs, expected_paragraphs)
 
+class StubNewsHandler(BaseHTTPRequestHandler):
+    """
+    Serves the pages of a StubNewsServer, keyed on (country, page cursor).
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        query = parse_qs(urlparse(self.path).query)
+        with server.lock:
+            server.in_flight += 1
+            server.peak = max(server.peak, server.in_flight)
+            server.clients.add(self.client_address)
+        try:
+            time.sleep(server.latency)
+            page = server.pages.get((query['country'][0], query.get('page', [''])[0]))
+            body = json.dumps(page).encode() if page is not None else b'{"status": "error"}'
+            self.send_response(200 if page is not None else 500)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+class StubNewsServer(ThreadingHTTPServer):
+    """
+    A local stand-in for the newsdata.io endpoint that records how many
+    requests were in flight at once.
+    """
+    daemon_threads = True
+
+    def __init__(self, pages, latency=0):
+        super().__init__(('127.0.0.1', 0), StubNewsHandler)
+        self.pages = pages
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+        self.clients = set()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/api/1/news"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+def feed_article(title):
+    return {
+        'title': title,
+        'content': 'First sentence. Second sentence.',
+        'pubDate': '2024-02-08 10:00:00',
+        'source_id': 'source_123',
+        'source_priority': 1,
+        'category': ['top', 'world'],
+        'language': 'english',
+    }
+
+class TestFeedStream(TestCase):
+
+    def setUp(self):
+        self.payload = {
+            'status': 'success',
+            'totalResults': 123456,
+            'results': [feed_article(f"Überschrift {i} – “quoted”") for i in range(5)],
+            'nextPage': 'cursor-2',
+        }
+
+    def test_articles_and_fields_survive_any_chunking(self):
+        body = json.dumps(self.payload, ensure_ascii=False, indent=1).encode()
+        for size in (1, 2, 7, 64, len(body)):
+            stream = FeedStream(body[i:i + size] for i in range(0, len(body), size))
+
+            self.assertEqual(list(stream), self.payload['results'])
+            self.assertEqual(stream.fields, {'status': 'success', 'totalResults': 123456, 'nextPage': 'cursor-2'})
+
+    def test_missing_or_empty_results(self):
+        self.assertEqual(list(FeedStream([b'{"results": [], "nextPage": null}'])), [])
+        stream = FeedStream([b'{"status": "error", "message": "quota"}'])
+        self.assertEqual(list(stream), [])
+        self.assertEqual(stream.fields['message'], 'quota')
+
+    def test_truncated_body_raises(self):
+        body = json.dumps(self.payload).encode()
+        with self.assertRaises(ValueError):
+            list(FeedStream([body[:len(body) // 2]]))
+
+    def test_fetched_pages_are_split_into_batches(self):
+        pages = {('us', ''): self.payload, ('us', 'cursor-2'): {'results': [feed_article('Last')]}}
+        stats = Counter()
+
+        with StubNewsServer(pages) as server, override_settings(NEWS_API_URL=server.url):
+            batches = list(fetch_pages(feed_queries(countries=['us'], languages=['en']), batch_size=2, stats=stats))
+
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1, 1])
+        self.assertEqual(stats['pages'], 2)
+
+class TestFetchNews(TestCase):
+
+    def setUp(self):
+        User.objects.create(id=1, username='newsbot')
+        self.pages = {
+            ('us', ''): {'results': [feed_article('Fetched Article')], 'nextPage': 'us-2'},
+            ('us', 'us-2'): {'results': [feed_article('Second Page Article')]},
+            ('gb', ''): {'results': [feed_article('British Article')]},
+        }
+
+    @patch('qfb_main.segmentation.segment_texts', side_effect=lambda texts, **kwargs: [['First sentence.', 'Second sentence.'] for _ in texts])
+    def test_fetch_news_stores_segmented_article(self, mock_segment):
+        with StubNewsServer(self.pages) as server, override_settings(NEWS_API_URL=server.url):
+            stats = fetch_news(queries=feed_queries(countries=['us'], languages=['en']))
+        article = NewsArticle.objects.get(title='Fetched Article')
+
+        logger.info(f"Test fetch_news: Stats = {dict(stats)}, Content = {article.content!r}")
+
+        self.assertEqual(stats['pages'], 2)
+        self.assertEqual(stats['inserted'], 2)
+        self.assertEqual(article.content, 'First sentence. Second sentence.')
+        self.assertEqual(article.content_html, render_content(article.content))
+        self.assertEqual(article.category, 'top,world')
+        self.assertTrue(NewsArticle.objects.filter(title='Second Page Article').exists())
+
+    @patch('qfb_main.segmentation.segment_texts', side_effect=lambda texts, **kwargs: [[text] for text in texts])
+    def test_unchanged_articles_skip_segmentation_and_keep_their_slug(self, mock_segment):
+        queries = feed_queries(countries=['us'], languages=['en'])
+        with StubNewsServer(self.pages) as server, override_settings(NEWS_API_URL=server.url):
+            fetch_news(queries=queries)
+            slug = NewsArticle.objects.get(title='Fetched Article').slug
+            self.pages[('us', 'us-2')]['results'][0]['content'] = 'Edited sentence.'
+            stats = fetch_news(queries=queries)
+
+        logger.info(f"Test fetch_news second run: Stats = {dict(stats)}")
+
+        self.assertEqual(stats['unchanged'], 1)
+        self.assertEqual(stats['updated'], 1)
+        self.assertEqual(mock_segment.call_count, 3)
+        self.assertEqual(NewsArticle.objects.get(title='Second Page Article').content, 'Edited sentence.')
+        self.assertEqual(NewsArticle.objects.get(title='Fetched Article').slug, slug)
+
+    def test_pages_behind_the_high_water_mark_are_not_followed(self):
+        IngestionSource.objects.create(source_id='source_123',
+                                       high_water_mark=timezone.make_aware(datetime(2024, 3, 1)))
+
+        with StubNewsServer(self.pages) as server, override_settings(NEWS_API_URL=server.url):
+            stats = fetch_news(queries=feed_queries(countries=['us'], languages=['en']))
+
+        logger.info(f"Test fetch_news high-water mark: Stats = {dict(stats)}")
+
+        self.assertEqual(stats['pages'], 1)
+        self.assertEqual(stats['stale'], 1)
+        self.assertFalse(NewsArticle.objects.exists())
+
+    def test_high_water_mark_advances_after_ingestion(self):
+        with StubNewsServer(self.pages) as server, override_settings(NEWS_API_URL=server.url), \
+                patch('qfb_main.segmentation.segment_texts', side_effect=lambda texts, **kwargs: [[text] for text in texts]):
+            fetch_news(queries=feed_queries(countries=['us'], languages=['en']))
+
+        source = IngestionSource.objects.get(source_id='source_123')
+
+        self.assertEqual(source.high_water_mark, timezone.make_aware(datetime(2024, 2, 8, 10)))
+        self.assertEqual(ArticleFingerprint.objects.count(), 2)
+
+    @override_settings(SEGMENTATION_BACKEND='rules', SEGMENTATION_N_PROCESS=1)
+    def test_call_news_replays_recorded_responses(self):
+        with tempfile.TemporaryDirectory() as directory:
+            write_payloads(directory, 120, page_size=50)
+            out = StringIO()
+            call_command('call_news', '--replay', os.path.join(directory, '*.json'), stdout=out)
+            call_command('call_news', '--replay', os.path.join(directory, '*.json'), stdout=out)
+
+        logger.info(f"Test call_news --replay: Output = {out.getvalue()!r}")
+
+        self.assertEqual(NewsArticle.objects.count(), 120)
+        self.assertIn('Replayed 3 recorded responses', out.getvalue())
+        self.assertIn('Skipped before processing: 120 of 120 articles (120 unchanged', out.getvalue())
+
+    def test_synthetic_payloads_are_paged_like_the_feed(self):
+        payloads = list(synthetic_payloads(120, page_size=50))
+
+        self.assertEqual([len(payload['results']) for payload in payloads], [50, 50, 20])
+        self.assertEqual([payload['nextPage'] for payload in payloads], ['synthetic-1', 'synthetic-2', None])
+        self.assertEqual(payloads, list(synthetic_payloads(120, page_size=50)))
+        self.assertEqual(len({article['title'] for payload in payloads for article in payload['results']}), 120)
+
+    def test_feed_queries_cover_every_combination(self):
+        queries = feed_queries(countries=['us', 'gb'], languages=['en'], categories=['top', 'world'])
+
+        self.assertEqual(len(queries), 4)
+        self.assertIn({'country': 'gb', 'language': 'en', 'category': 'world'}, queries)
+
+    def test_fetch_pages_follows_next_page_across_countries(self):
+        with StubNewsServer(self.pages) as server, override_settings(NEWS_API_URL=server.url):
+            pages = list(fetch_pages(feed_queries(countries=['us', 'gb'], languages=['en'])))
+
+        titles = {article['title'] for page in pages for article in page}
+
+        logger.info(f"Test fetch_pages: Titles = {sorted(titles)}")
+
+        self.assertEqual(titles, {'Fetched Article', 'Second Page Article', 'British Article'})
+
+    def test_fetch_pages_is_concurrent_and_bounded(self):
+        countries = ['us', 'gb', 'ca', 'au', 'nz', 'ie']
+        pages = {(country, ''): {'results': [feed_article(country)]} for country in countries}
+
+        with StubNewsServer(pages, latency=0.2) as server, override_settings(NEWS_API_URL=server.url):
+            fetched = list(fetch_pages(feed_queries(countries=countries, languages=['en']), concurrency=3))
+
+        logger.info(f"Test fetch_pages concurrency: Peak in flight = {server.peak}, Connections = {len(server.clients)}")
+
+        self.assertEqual(len(fetched), 6)
+        self.assertGreater(server.peak, 1)
+        self.assertLessEqual(server.peak, 3)
+        self.assertLessEqual(len(server.clients), 3)
+
+    def test_failed_query_does_not_stop_the_others(self):
+        with StubNewsServer(self.pages) as server, override_settings(NEWS_API_URL=server.url):
+            pages = list(fetch_pages(feed_queries(countries=['fr', 'gb'], languages=['en'])))
+
+        self.assertEqual([page[0]['title'] for page in pages], ['British Article'])
+
+@override_settings(NEWS_WORKER_BACKOFF=60, NEWS_WORKER_MAX_BACKOFF=3600, NEWS_WORKER_MAX_ATTEMPTS=3,
+                   NEWS_WORKER_INTERVAL=900, NEWS_WORKER_JITTER=0)
+class TestNewsWorker(TestCase):
+
+    def test_lease_is_held_by_one_worker_until_released_or_expired(self):
+        first = Lease(holder='first', ttl=60)
+        second = Lease(holder='second', ttl=60)
+
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+        self.assertTrue(first.acquire())
+        first.release()
+        self.assertTrue(second.acquire())
+        WorkerLease.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertTrue(first.acquire())
+
+    def test_periodic_fetch_is_queued_once_per_interval(self):
+        first = schedule_due()
+
+        self.assertIsNotNone(first)
+        self.assertIsNone(schedule_due())
+        IngestionJob.objects.update(state='done')
+        self.assertIsNone(schedule_due())
+        self.assertIsNotNone(schedule_due(now=timezone.now() + timedelta(seconds=901)))
+
+    @patch('qfb_main.worker.fetch_news', side_effect=ConnectionError('feed down'))
+    def test_failed_job_is_retried_with_exponential_backoff(self, mock_fetch):
+        job = enqueue_fetch({'max_pages': 1})
+
+        delays = []
+        for _ in range(3):
+            before = timezone.now()
+            job = run_job(job)
+            delays.append(round((job.run_after - before).total_seconds()))
+
+        logger.info(f"Test news_worker backoff: Delays = {delays[:2]}, State = {job.state}")
+
+        self.assertEqual(delays[:2], [60, 120])
+        self.assertEqual(job.state, 'failed')
+        self.assertIn('feed down', job.last_error)
+        mock_fetch.assert_called_with(max_pages=1)
+
+    @patch('qfb_main.worker.fetch_news', return_value=Counter(inserted=3, failed=1))
+    def test_partly_failed_fetch_is_retried(self, mock_fetch):
+        job = run_job(enqueue_fetch())
+
+        self.assertEqual(job.state, 'pending')
+        self.assertEqual(job.result['inserted'], 3)
+
+    @patch('qfb_main.worker.fetch_news', return_value=Counter(inserted=1))
+    def test_only_the_lease_holder_runs_jobs(self, mock_fetch):
+        Lease(holder='other', ttl=60).acquire()
+        enqueue_fetch()
+
+        self.assertIsNone(NewsWorker(lease=Lease(holder='mine', ttl=60)).run_once())
+        WorkerLease.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        job = NewsWorker(lease=Lease(holder='mine', ttl=60)).run_once()
+
+        self.assertEqual(job.state, 'done')
+        self.assertEqual(mock_fetch.call_count, 1)
+
+    @patch('qfb_main.worker.fetch_news', return_value=Counter())
+    def test_new_leader_requeues_interrupted_jobs(self, mock_fetch):
+        IngestionJob.objects.create(state='running', attempts=1)
+
+        job = NewsWorker(lease=Lease(holder='mine', ttl=60)).run_once()
+
+        self.assertEqual(job.state, 'done')
+        self.assertEqual(job.attempts, 2)
+
+class TestSegmentation(TestCase):
+
+    def setUp(self):
+        segmentation._pipeline = None
+        self.addCleanup(setattr, segmentation, '_pipeline', None)
+        self.spacy = MagicMock()
+        self.spacy.load.return_value.disabled = ['senter']
+
+    @override_settings(SPACY_MODEL='en_core_web_sm', SPACY_COMPONENT='senter')
+    def test_pipeline_is_loaded_once_and_trimmed(self):
+        with patch.dict(sys.modules, {'spacy': self.spacy}):
+            first = segmentation.get_pipeline()
+            second = segmentation.get_pipeline()
+
+        exclude = self.spacy.load.call_args.kwargs['exclude']
+
+        logger.info(f"Test spaCy pipeline load: Calls = {self.spacy.load.call_count}, Excluded = {exclude}")
+
+        self.assertIs(first, second)
+        self.assertEqual(self.spacy.load.call_count, 1)
+        self.assertIn('ner', exclude)
+        self.assertIn('parser', exclude)
+        first.enable_pipe.assert_called_once_with('senter')
+
+    @override_settings(SEGMENTATION_BATCH_SIZE=16, SEGMENTATION_N_PROCESS=2)
+    def test_segment_texts_uses_batched_pipe(self):
+        sentence = MagicMock(text='Only sentence.')
+        nlp = self.spacy.load.return_value
+        nlp.pipe.return_value = [MagicMock(sents=[sentence])]
+
+        with patch.dict(sys.modules, {'spacy': self.spacy}):
+            result = segmentation.segment_texts(['Only sentence.'])
+
+        self.assertEqual(result, [['Only sentence.']])
+        nlp.pipe.assert_called_once_with(['Only sentence.'], batch_size=16, n_process=2)
+
+    @override_settings(SPACY_MODEL='en_core_web_sm', SPACY_COMPONENT='senter')
+    def test_pool_loads_the_pipeline_once_per_worker_and_keeps_order(self):
+        nlp = self.spacy.load.return_value
+        nlp.pipe.side_effect = lambda texts, **kwargs: [
+            MagicMock(sents=[MagicMock(text=f"{os.getpid()}:{self.spacy.load.call_count}:{text}")]) for text in texts
+        ]
+        batches = [[f"text {i}" for i in range(start, start + 6)] for start in range(0, 18, 6)]
+
+        with patch.dict(sys.modules, {'spacy': self.spacy}):
+            with segmentation.SegmentationPool(processes=2, backend='spacy', chunk_size=2) as pool:
+                futures = [pool.submit(batch) for batch in batches]
+                results = [sentences[0].split(':') for future in futures for sentences in future.result()]
+
+        logger.info(f"Test segmentation pool: Workers = {len({pid for pid, _, _ in results})}")
+
+        self.assertEqual([text for _, _, text in results], [text for batch in batches for text in batch])
+        self.assertEqual({loads for _, loads, _ in results}, {'1'})
+        self.assertNotIn(str(os.getpid()), {pid for pid, _, _ in results})
+        self.assertEqual(self.spacy.load.call_count, 0)
+
+    def test_single_process_pool_runs_inline(self):
+        with segmentation.SegmentationPool(processes=1, backend='rules') as pool:
+            result = pool.submit(['One. Two.', 'Three.']).result()
+
+        self.assertIsNone(pool.executor)
+        self.assertEqual(result, [['One.', 'Two.'], ['Three.']])
+
+class TestRuleSegmentation(TestCase):
+
+    def test_split_sentences_rules(self):
+        text = 'Dr. Smith paid $3.50 for it. "It was cheap," he said. John F. Kennedy agreed!\n\nNew paragraph'
+        expected_sentences = ['Dr. Smith paid $3.50 for it.', '"It was cheap," he said.', 'John F. Kennedy agreed!', 'New paragraph']
+
+        sentences = segmentation.split_sentences_rules(text)
+
+        logger.info(f"Test split_sentences_rules: Expected Sentences = {expected_sentences}, Result = {sentences}")
+
+        self.assertEqual(sentences, expected_sentences)
+
+    @override_settings(SEGMENTATION_BACKEND='rules')
+    def test_rules_backend_never_loads_spacy(self):
+        with patch('qfb_main.segmentation.get_pipeline') as mock_pipeline:
+            sentences = segmentation.segment_texts(['One. Two.'])
+
+        self.assertEqual(sentences, [['One.', 'Two.']])
+        mock_pipeline.assert_not_called()
+
+class TestDatabaseHealthMonitor(TestCase):
+
+    def test_healthy_result_is_cached_within_ttl(self):
+        monitor = DatabaseHealthMonitor('default', ttl=60)
+
+        for _ in range(5):
+            self.assertTrue(monitor.is_healthy())
+
+        logger.info(f"Test health monitor caching: Stats = {monitor.stats()}")
+
+        self.assertEqual(monitor.stats()['probes'], 1)
+
+    def test_failure_is_probed_again(self):
+        monitor = DatabaseHealthMonitor('default', ttl=60)
+        with patch('django.db.backends.sqlite3.base.DatabaseWrapper.is_usable', return_value=False):
+            self.assertFalse(monitor.is_healthy())
+        self.assertTrue(monitor.is_healthy())
+
+        self.assertEqual(monitor.stats()['probes'], 2)
+        self.assertEqual(monitor.stats()['failures'], 1)
+
+    @override_settings(DATABASE_READ_FAILOVER='failover', DATABASE_HEALTH_TTL=60)
+    def test_reads_fail_over_while_default_is_down(self):
+        router = ReplicaRouter()
+
+        self.assertIsNone(router.db_for_read(NewsArticle))
+        with patch.object(router.monitor('default'), 'probe', return_value=False):
+            router.monitor('default').healthy = False
+
+            self.assertEqual(router.db_for_read(NewsArticle), 'failover')
+            self.assertEqual(router.db_for_write(NewsArticle), 'default')
+
+    def test_no_probes_without_replicas(self):
+        router = ReplicaRouter()
+
+        router.db_for_read(NewsArticle)
+        router.db_for_write(NewsArticle)
+
+        self.assertEqual(router.monitors, {})
+
+
+class TestReplicaRouting(TransactionTestCase):
+    # A copy of the test database, opened read-only, stands in for a replica
+    # that has not yet caught up with the primary. The copy needs committed
+    # rows, hence TransactionTestCase.
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='12345')
+        self.replicated = self.create_article("Replicated article")
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'replica.sqlite3')
+        replica = sqlite3.connect(path)
+        connection.connection.backup(replica)
+        replica.close()
+        connections.settings['replica0'] = dict(connection.settings_dict, NAME=f"file:{path}?mode=ro", OPTIONS={'uri': True})
+        self.addCleanup(self.remove_replica)
+        self.unreplicated = self.create_article("Unreplicated article")
+
+    def remove_replica(self):
+        connections['replica0'].close()
+        del connections['replica0']
+        del connections.settings['replica0']
+
+    def create_article(self, title):
+        return NewsArticle.objects.create(title=title, slug=slugify(title), author=self.user, content='Body',
+                                          source_priority=1, status=1, pub_date=timezone.now())
+
+    @override_settings(DATABASE_REPLICAS=['replica0'], PAGE_CACHE_TIMEOUT=0)
+    def test_list_reads_from_replica_until_client_writes(self):
+        self.client.force_login(self.user)
+
+        before = self.client.get(reverse('home')).context['news_article_list']
+        response = self.client.post(reverse('add_comment_to_article', kwargs={'article_id': self.replicated.id}),
+                                    {'comment_content': 'Read your writes'})
+        after = self.client.get(reverse('home')).context['news_article_list']
+
+        logger.info(f"Test replica routing: before = {list(before)}, after = {list(after)}")
+
+        self.assertEqual([article.id for article in before], [self.replicated.id])
+        self.assertIn(settings.REPLICA_STICKY_COOKIE, response.cookies)
+        self.assertEqual([article.id for article in after], [self.unreplicated.id, self.replicated.id])
+
+    @override_settings(DATABASE_REPLICAS=['replica0'], PAGE_CACHE_TIMEOUT=0)
+    def test_sessions_and_users_are_read_from_primary(self):
+        # Neither the user nor the session exists on the replica.
+        new_user = User.objects.create_user(username='newuser', password='12345')
+        self.client.force_login(new_user)
+
+        response = self.client.get(reverse('home'))
+
+        self.assertTrue(response.wsgi_request.user.is_authenticated)
+        self.assertContains(response, 'Log out')
+        self.assertEqual([article.id for article in response.context['news_article_list']], [self.replicated.id])
+
+    @override_settings(DATABASE_REPLICAS=['replica0'], PAGE_CACHE_TIMEOUT=0)
+    def test_unhealthy_replica_is_skipped(self):
+        router = ReplicaRouter()
+        with patch.object(router.monitor('replica0'), 'probe', return_value=False):
+            self.assertIsNone(router.healthy_replica())
+        self.assertEqual(router.healthy_replica(), 'replica0')
+
+
+class TestSQLitePragmas(TestCase):
+
+    def open(self, name, **options):
+        wrapper = connections['default'].__class__(dict(connection.settings_dict, NAME=name, OPTIONS=options), alias='pragmas')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def test_new_connections_are_tuned(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'tuned.sqlite3')
+
+            tuned = pragmas(self.open(path))
+            read_only = pragmas(self.open(f"file:{path}?mode=ro", uri=True))
+
+        logger.info(f"Test SQLite pragmas: {tuned}")
+
+        self.assertEqual(tuned['journal_mode'], 'wal')
+        self.assertEqual(tuned['synchronous'], 1)
+        self.assertEqual(tuned['busy_timeout'], settings.SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(tuned['cache_size'], settings.SQLITE_PRAGMAS['cache_size'])
+        self.assertEqual(read_only['busy_timeout'], settings.SQLITE_PRAGMAS['busy_timeout'])
+
+
+class TestQueuedLogging(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'app.log')
+        self.handler = QueuedFileHandler(self.path, max_bytes=2000, backup_count=1)
+        self.addCleanup(self.handler.stop)
+        self.log = logging.getLogger('qfb_main.test.queued')
+        self.log.propagate = False
+        self.log.addHandler(self.handler)
+        self.addCleanup(self.log.removeHandler, self.handler)
+
+    def entries(self):
+        self.handler.stop()
+        with open(self.path, encoding='utf-8') as log_file:
+            return [json.loads(line) for line in log_file]
+
+    def test_records_are_written_as_json_lines(self):
+        self.log.warning("Fetched %d pages", 3)
+        try:
+            raise ValueError("feed down")
+        except ValueError:
+            self.log.exception("Fetch failed")
+
+        entries = self.entries()
+
+        logger.info(f"Test queued logging: Entries = {entries}")
+
+        self.assertEqual([entry['message'] for entry in entries], ['Fetched 3 pages', 'Fetch failed'])
+        self.assertEqual(entries[1]['level'], 'ERROR')
+        self.assertIn('ValueError: feed down', entries[1]['exception'])
+
+    def test_sampling_keeps_warnings_and_file_rotates(self):
+        self.handler.addFilter(SampleFilter(rate=0))
+        for i in range(50):
+            self.log.info("Sampled out %d", i)
+            self.log.warning("Warning %d", i)
+
+        entries = self.entries()
+
+        self.assertTrue(os.path.exists(self.path + '.1'))
+        self.assertFalse(any(entry['level'] == 'INFO' for entry in entries))
+
+
+class TestPerfInstrumentation(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.stats_dir = directory.name
+        user = User.objects.create_user(username='testuser', password='12345')
+        self.article = NewsArticle.objects.create(title="Timed article", slug="timed-article", author=user,
+                                                  content="Body", source_priority=1, status=1)
+
+    def requests(self, view):
+        histograms = recorder.views.get(view)
+        return histograms['total_ms'].count if histograms else 0
+
+    def test_requests_are_timed_per_view(self):
+        before = self.requests('home'), self.requests('article_comments')
+        with self.settings(PAGE_CACHE_TIMEOUT=0, PERF_STATS_DIR=self.stats_dir):
+            page = self.client.get(reverse('home'))
+            comments = self.client.get(reverse('article_comments', args=[self.article.id]))
+
+        logger.info(f"Test perf instrumentation: Server-Timing = {page['Server-Timing']!r}")
+
+        self.assertRegex(page['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, total;dur=[\d.]+$')
+        self.assertIn('Server-Timing', comments)
+        self.assertEqual((self.requests('home'), self.requests('article_comments')), (before[0] + 1, before[1] + 1))
+        self.assertGreater(recorder.views['home']['render_ms'].largest, 0)
+        self.assertGreater(recorder.views['home']['queries'].largest, 0)
+
+    def test_perf_report_prints_percentiles(self):
+        with self.settings(PERF_STATS_DIR=self.stats_dir):
+            self.client.get(reverse('article_comments', args=[self.article.id]))
+            recorder.flush(force=True)
+            out = StringIO()
+            call_command('perf_report', stdout=out)
+
+        self.assertIn('p95 ms', out.getvalue())
+        self.assertIn('article_comments', out.getvalue())
+
+    def test_histogram_percentiles(self):
+        histogram = Histogram()
+        for value in range(1, 101):
+            histogram.add(value)
+
+        self.assertEqual(histogram.count, 100)
+        self.assertLessEqual(abs(histogram.percentile(50) - 50), 50 * 0.25)
+        self.assertLessEqual(abs(histogram.percentile(99) - 99), 99 * 0.25)
+        self.assertEqual(histogram.percentile(100), 100)
+
+
+class TestColdStart(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        # Keep the worker off the developer's database, log file, stats and queue.
+        env = {name: value for name, value in os.environ.items() if name != 'DATABASE_REPLICA_URLS'}
+        env.update({
+            'DATABASE_URL': f"sqlite:///{os.path.join(directory.name, 'db.sqlite3')}",
+            'LOG_FILE': os.path.join(directory.name, 'debug.log'),
+            'PERF_STATS_DIR': os.path.join(directory.name, 'perf'),
+            'COMMENT_QUEUE_PATH': os.path.join(directory.name, 'comment_queue.sqlite3'),
+        })
+        # A fresh interpreter, as a newly started gunicorn worker would be.
+        cls.result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-m', 'quickfire_bulletin.coldstart', reverse('account_login')],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, timeout=120,
+        )
+        cls.measured = json.loads(cls.result.stdout.splitlines()[-1]) if cls.result.returncode == 0 else None
+
+    def test_first_response_imports_no_lazy_modules(self):
+        self.assertEqual(self.result.returncode, 0, self.result.stderr[-2000:])
+
+        logger.info(f"Test cold start: {self.measured}")
+
+        self.assertEqual(self.measured['status'], '200 OK')
+        self.assertEqual(self.measured['lazy_modules'], [])
+
+    @skipUnless(settings.COLD_START_BUDGET, 'COLD_START_BUDGET is 0')
+    def test_first_response_within_budget(self):
+        self.assertEqual(self.result.returncode, 0, self.result.stderr[-2000:])
+        self.assertLessEqual(
+            self.measured['total_seconds'], settings.COLD_START_BUDGET,
+            f"Cold start over budget; slowest imports (us, module): {slowest_imports(self.result.stderr)}",
+        )
+
+
+class TestKeysetPagination(TestCase):
+
+    def setUp(self):
+        self.test_user = User.objects.create_user(username='testuser', password='12345')
+        rows = article_rows(7, self.test_user)
+        rows[2]['pub_date'] = rows[3]['pub_date']
+        rows[0]['pub_date'] = None
+        upsert_articles(rows)
+        self.queryset = NewsArticle.objects.filter(status=1)
+        self.expected = list(self.queryset.order_by(F('pub_date').desc(nulls_last=True), '-id'))
+
+    def test_walks_forward_and_back_without_gaps(self):
+        pages = [paginate_keyset(self.queryset, None, 3)]
+        while pages[-1].has_next():
+            pages.append(paginate_keyset(self.queryset, pages[-1].next_cursor, 3))
+        seen = [article for page in pages for article in page]
+
+        logger.info(f"Test keyset pagination: Pages = {[[a.id for a in page] for page in pages]}")
+
+        self.assertEqual(seen, self.expected)
+        self.assertFalse(pages[0].has_previous())
+
+        previous = paginate_keyset(self.queryset, pages[-1].previous_cursor, 3)
+        self.assertEqual(list(previous), list(pages[-2]))
+
+    def test_invalid_cursor_returns_first_page(self):
+        page = paginate_keyset(self.queryset, 'not-a-cursor', 3)
+
+        self.assertEqual(list(page), self.expected[:3])
+
+    @override_settings(NEWS_LIST_PAGINATION='cursor', PAGE_CACHE_TIMEOUT=0)
+    def test_cursor_mode_list_view_skips_page_count(self):
+        self.client.get(reverse('home'))
+
+        # Cached approximate total, then only the articles.
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('home'))
+
+        self.assertTrue(response.context['cursor_pagination'])
+        self.assertContains(response, '?cursor=')
+
+class TestArticleCardCache(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.test_user = User.objects.create_user(username='testuser', password='12345')
+        self.article, = create_articles(1, self.test_user)
+
+    def render_twice(self):
+        before = card_cache_stats()
+        first = render_article_card(self.article)
+        second = render_article_card(self.article)
+        after = card_cache_stats()
+        return first, second, after['hits'] - before['hits'], after['misses'] - before['misses']
+
+    def test_second_render_is_a_hit(self):
+        first, second, hits, misses = self.render_twice()
+
+        logger.info(f"Test article card cache: Hits = {hits}, Misses = {misses}")
+
+        self.assertEqual((hits, misses), (1, 1))
+        self.assertEqual(first, second)
+
+    def test_comment_save_invalidates_card(self):
+        render_article_card(self.article)
+        with self.captureOnCommitCallbacks(execute=True):
+            comment = Comment.objects.create(news_article=self.article, user=self.test_user, name='testuser',
+                                             email='t@example.com', comment_content='Fresh comment')
+            comments_added(self.article.id, 1, comment.created_on)
+
+        html = render_article_card(NewsArticle.objects.get())
+
+        self.assertIn('Show 1 comment', html)
+        self.assertNotIn('Fresh comment', html)
+
+    def test_file_based_cache_backend(self):
+        with tempfile.TemporaryDirectory() as location:
+            backend = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}
+            with override_settings(CACHES=backend):
+                _, _, hits, misses = self.render_twice()
+
+        self.assertEqual((hits, misses), (1, 1))
+
+class TestPageCache(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.test_user = User.objects.create_user(username='testuser', password='12345')
+        self.article = create_articles(2, self.test_user)[0]
+
+    def test_anonymous_repeat_visit_skips_database(self):
+        first = self.client.get(reverse('home'))
+
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse('home'))
+
+        logger.info(f"Test page cache: ETag = {second['ETag']}, Last-Modified = {second['Last-Modified']}")
+
+        self.assertEqual(first.content, second.content)
+        self.assertContains(second, 'Log in to be able to comment')
+
+    def test_matching_etag_returns_not_modified(self):
+        etag = self.client.get(reverse('newsarticle_detail', args=[self.article.id]))['ETag']
+
+        response = self.client.get(reverse('newsarticle_detail', args=[self.article.id]), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_new_comment_changes_etag(self):
+        etag = self.client.get(reverse('home'))['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            comment = Comment.objects.create(news_article=self.article, user=self.test_user, name='testuser',
+                                             email='t@example.com', comment_content='Fresh comment')
+            comments_added(self.article.id, 1, comment.created_on)
+
+        response = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Show 1 comment')
+
+    @override_settings(CONTENT_VERSION_TIMEOUT=0)
+    def test_write_from_another_process_changes_etag(self):
+        etag = self.client.get(reverse('home'))['ETag']
+        # A queryset update sends no signals, like a write made by another process.
+        NewsArticle.objects.filter(id=self.article.id).update(excerpt_html='<p>Updated elsewhere</p>',
+                                                              updated_on=timezone.now())
+
+        response = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Updated elsewhere')
+
+    def test_authenticated_holes_are_filled_per_user(self):
+        other_user = User.objects.create_user(username='otheruser', password='12345')
+        Comment.objects.create(news_article=self.article, user=self.test_user, name='testuser',
+                               email='t@example.com', comment_content='Own comment')
+        self.client.get(reverse('home'))
+
+        self.client.force_login(self.test_user)
+        own = self.client.get(reverse('home'))
+        self.client.force_login(other_user)
+        other = self.client.get(reverse('home'))
+
+        self.assertContains(own, 'csrfmiddlewaretoken')
+        self.assertContains(own, 'Log out')
+        self.assertNotContains(own, 'Log in to be able to comment')
+        self.assertContains(other, 'name="article_id"', count=2)
+        self.assertNotContains(own, 'Own comment')
+
+    def test_missing_article_is_not_cached(self):
+        response = self.client.get(reverse('newsarticle_detail', args=[99999]))
+
+        self.assertEqual(response.status_code, 404)
+
+class TestUpsertArticles(TestCase):
+
+    def setUp(self):
+        self.test_user = User.objects.create_user(username='testuser', password='12345')
+
+    def test_upsert_counts_inserted_updated_and_skipped(self):
+        upsert_articles(article_rows(3, self.test_user))
+        rows = article_rows(4, self.test_user)
+        rows[0]['content'] = 'Changed content'
+
+        stats = upsert_articles(rows)
+
+        logger.info(f"Test upsert_articles counts: {dict(stats)}")
+
+        self.assertEqual(stats, {'inserted': 1, 'updated': 1, 'skipped': 2})
+        self.assertEqual(NewsArticle.objects.get(title=rows[0]['title']).content, 'Changed content')
+        self.assertEqual(NewsArticle.objects.count(), 4)
+
+    def test_upsert_keeps_existing_slug(self):
+        upsert_articles(article_rows(1, self.test_user))
+        rows = article_rows(1, self.test_user, revision=1)
+        rows[0]['slug'] = 'a-fresh-slug'
+
+        upsert_articles(rows)
+
+        self.assertEqual(NewsArticle.objects.get().slug, 'article-0')
+
+    def test_bad_row_only_loses_itself(self):
+        rows = article_rows(5, self.test_user)
+        rows[2]['slug'] = rows[0]['slug']
+        failed = []
+
+        with self.assertLogs('qfb_main.ingestion', level='ERROR') as logs:
+            stats = upsert_articles(rows, failed=failed)
+
+        self.assertEqual(stats, {'inserted': 4, 'updated': 0, 'skipped': 0, 'failed': 1})
+        self.assertEqual(failed, [rows[2]['title']])
+        self.assertIn(rows[2]['title'], logs.output[0])
+        self.assertEqual(NewsArticle.objects.count(), 4)
+
+    def test_upsert_query_count_does_not_grow_per_article(self):
+        with CaptureQueriesContext(connection) as queries:
+            upsert_articles(article_rows(100, self.test_user))
+
+        logger.info(f"Test upsert_articles queries for 100 articles: {len(queries)}")
+
+        self.assertLess(len(queries), 10)
+
+class TestArticleSearch(TestCase):
+
+    def setUp(self):
+        self.test_user = User.objects.create_user(username='testuser', password='12345')
+        self.backend = search_backend()
+
+    def create_article(self, title, content, status=1):
+        return NewsArticle.objects.create(title=title, slug=title.lower().replace(' ', '-'), author=self.test_user,
+                                          content=content, status=status, source_priority=1)
+
+    def test_title_matches_rank_first_and_are_highlighted(self):
+        self.create_article("Budget talks stall", "Lawmakers met again on Tuesday.")
+        self.create_article("Harbour reopens", "The budget for dredging was approved last spring.")
+
+        results = self.backend.search('budget', 10)
+
+        logger.info(f"Test search ranking: {[result['title'] for result in results]}")
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0]['title'], '<mark>Budget</mark> talks stall')
+        self.assertIn('<mark>budget</mark>', results[1]['snippet'])
+
+    def test_results_are_html_escaped(self):
+        self.create_article("Storm <b>warning</b>", "Coastal towns <script>brace</script> for the storm.")
+
+        result = self.backend.search('storm', 10)[0]
+
+        self.assertNotIn('<script>', result['snippet'])
+        self.assertIn('&lt;script&gt;', result['snippet'])
+        self.assertIn('&lt;b&gt;', result['title'])
+
+    def test_index_follows_upserts_and_edits(self):
+        upsert_articles(article_rows(3, self.test_user))
+        article = NewsArticle.objects.get(slug='article-1')
+        article.content = "A satellite launch was delayed."
+        article.save()
+
+        logger.info(f"Test search index updates: satellite count = {self.backend.count('satellite')}")
+
+        self.assertEqual(self.backend.count('satellite'), 1)
+        self.assertEqual(self.backend.count('article'), 3)
+        article.delete()
+        self.assertEqual(self.backend.count('article'), 2)
+
+    def test_migrate_restores_dropped_triggers(self):
+        # What SQLite's table copy does to the triggers when a migration alters the table.
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TRIGGER {FTS_TABLE}_insert")
+        self.create_article("Ferry strike", "Crossings were cancelled.")
+        self.assertEqual(self.backend.count('ferry'), 0)
+
+        emit_post_migrate_signal(0, False, 'default')
+        self.create_article("Ferry timetable", "Crossings resume.")
+
+        self.assertEqual(self.backend.count('ferry'), 2)
+
+    def test_drafts_are_only_found_by_the_admin(self):
+        self.create_article("Tariff draft", "Not yet published.", status=0)
+
+        self.assertEqual(self.backend.count('tariff'), 0)
+        self.assertEqual(self.backend.filter_queryset(NewsArticle.objects.all(), 'tariff').count(), 1)
+
+    def test_last_word_matches_as_a_prefix(self):
+        self.create_article("Wildfire season", "Crews are ready.")
+
+        self.assertEqual(self.backend.count('wildf'), 1)
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.create_article("Court ruling", "The court ruled on Monday.")
+
+        for query in ('court"', 'court AND', '(court', 'NEAR(court', '*', '""'):
+            self.backend.search(query, 10)
+            self.backend.count(query)
+
+    def test_search_view_paginates(self):
+        for i in range(12):
+            self.create_article(f"Festival day {i}", "Crowds gathered for the festival.")
+
+        response = self.client.get(reverse('search'), {'q': 'festival'})
+        second_page = self.client.get(reverse('search'), {'q': 'festival', 'page': 2})
+
+        logger.info(f"Test search view: Status Code = {response.status_code}")
+
+        self.assertContains(response, '12 results')
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertEqual(len(second_page.context['page_obj']), 2)
+        self.assertContains(response, '<mark>Festival</mark>')
+
 class TestNewsArticleViews(TestCase):
 
     def setUp(self):
@@ -66,3 +1080,110 @@ class TestNewsArticleViews(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, "Test Article")
 
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_news_article_list_query_count_is_fixed(self):
+        commenters = [User.objects.create_user(username=f'commenter{i}', password='12345') for i in range(3)]
+        for commenter in commenters:
+            for _ in range(3):
+                Comment.objects.create(news_article=self.article, user=commenter, name=commenter.username,
+                                       email='c@example.com', comment_content='A comment')
+        Comment.objects.create(news_article=self.article, user=commenters[0], name='hidden',
+                               email='c@example.com', comment_content='Unapproved comment', approved=False)
+        refresh_comment_counts([self.article.id])
+        self.client.force_login(commenters[0])
+
+        # Session, user, page count and articles; comments are loaded on demand.
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('home'))
+
+        logger.info(f"Test news_article_list query count: Status Code = {response.status_code}")
+
+        self.assertContains(response, 'Show 9 comments')
+        self.assertNotContains(response, 'A comment')
+        self.assertNotContains(response, 'Unapproved comment')
+
+class TestArticleSummary(TestCase):
+
+    def setUp(self):
+        self.test_user = User.objects.create_user(username='testuser', password='12345')
+        paragraphs = [' '.join(f"Sentence {p}.{i} & things." for i in range(40)) for p in range(3)]
+        self.content = '\n\n'.join(paragraphs)
+
+    def test_summary_of_ingested_text(self):
+        summary = summarize(self.content)
+
+        logger.info(f"Test summarize: {summary['reading_time']} min, excerpt = {summary['excerpt'][:40]!r}")
+
+        self.assertEqual(len(summary['excerpt'].split()), 60)
+        self.assertTrue(summary['excerpt'].endswith('…'))
+        self.assertTrue(summary['excerpt_html'].startswith('<p>Sentence 0.0 &amp; things.'))
+        self.assertEqual(summary['reading_time'], 3)
+
+    def test_save_fills_blank_excerpt_and_keeps_written_one(self):
+        article = NewsArticle.objects.create(title='Edited', slug='edited', author=self.test_user,
+                                             content='<p>Admin <b>body</b></p>', source_priority=1)
+        article.refresh_from_db()
+        self.assertEqual(article.excerpt, 'Admin body')
+
+        article.excerpt = 'Written by hand'
+        article.save(update_fields=['excerpt'])
+        article.refresh_from_db()
+        self.assertEqual(article.excerpt_html, '<p>Written by hand</p>')
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_list_shows_excerpt_without_loading_content(self):
+        upsert_articles([dict(row, content=self.content, content_html=render_content(self.content), **summarize(self.content))
+                         for row in article_rows(3, self.test_user)])
+        article = NewsArticle.objects.order_by('id').first()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('home'))
+        detail = self.client.get(reverse('newsarticle_detail', args=[article.id]))
+
+        self.assertFalse(any('"content"' in query['sql'] for query in queries if 'qfb_main_newsarticle' in query['sql']))
+        self.assertContains(response, 'Read more', count=3)
+        self.assertContains(response, '3 min read', count=3)
+        self.assertNotContains(response, 'Sentence 2.0')
+        self.assertContains(detail, 'Sentence 2.0')
+
+    def test_admin_save_stores_editor_html(self):
+        article = NewsArticle.objects.create(title='Edited', slug='edited', author=self.test_user,
+                                             content='Plain <b>text</b>', source_priority=1, status=1)
+        self.assertEqual(article.content_html, '<p>Plain &lt;b&gt;text&lt;/b&gt;</p>')
+
+        article.content = '<p>Formatted <b>text</b></p>'
+        NewsArticleAdmin(NewsArticle, admin.site).save_model(None, article, None, True)
+        response = self.client.get(reverse('newsarticle_detail', args=[article.id]))
+
+        self.assertEqual(NewsArticle.objects.get().content_html, '<p>Formatted <b>text</b></p>')
+        self.assertContains(response, '<p>Formatted <b>text</b></p>')
+
+    def test_editor_html_is_sanitized_and_survives_later_saves(self):
+        article = NewsArticle(title='Edited', slug='edited', author=self.test_user, source_priority=1, status=1,
+                              content='<p onclick="steal()">Safe <i>text</i></p><script>steal()</script>')
+        NewsArticleAdmin(NewsArticle, admin.site).save_model(None, article, None, False)
+        sanitized = NewsArticle.objects.get().content_html
+
+        article = NewsArticle.objects.get()
+        article.comment_count = 3
+        article.save(update_fields=['comment_count'])
+        article.status = 0
+        article.save()
+        out = StringIO()
+        call_command('render_articles', '--all', stdout=out)
+
+        self.assertEqual(sanitized, '<p>Safe <i>text</i></p>&lt;script&gt;steal()&lt;/script&gt;')
+        self.assertEqual(NewsArticle.objects.get().content_html, sanitized)
+        self.assertIn('Rendered 0 articles', out.getvalue())
+
+    def test_render_articles_backfills_missing_html(self):
+        create_articles(3, self.test_user)
+        NewsArticle.objects.update(content_html='')
+        out = StringIO()
+
+        call_command('render_articles', stdout=out)
+
+        self.assertIn('Rendered 3 articles', out.getvalue())
+        for article in NewsArticle.objects.all():
+            self.assertEqual(article.content_html, render_content(article.content))
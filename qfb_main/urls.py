@@ -10,6 +10,8 @@ urlpatterns = [
     path('logout/', views.user_logout, name='logout'),
     path('feedback/', views.feedback_view, name='feedback'),
     path("article/<int:id>/", views.news_article_detail, name="newsarticle_detail"),
+    path('search/', views.search_articles, name='search'),
+    path('discussed/', views.most_discussed, name='most_discussed'),
     path("account/login/", 
          auth_views.LoginView.as_view(template_name="account/login.html"), 
          name="account_login"),
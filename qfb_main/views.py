@@ -1,108 +1,27 @@
-import json
 import logging
-import os
-import requests
-import traceback
-import uuid
-from datetime import datetime
+from datetime import timedelta
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import login, logout
 from django.core.paginator import Paginator
 from django.db.models import Q
 from django.shortcuts import get_object_or_404, redirect, render
-from django.contrib.auth.forms import UserCreationForm
 from django.utils import timezone
-from django.utils.text import slugify
+from django.contrib.auth.forms import UserCreationForm
 
-from comments.models import Comment
+from comments.counters import most_discussed as rank_most_discussed
 from feedback.forms import FeedbackForm
-from qfb_main.models import NewsArticle
+from qfb_main.fragments import card_articles
+from qfb_main.page_cache import cache_page_with_holes
+from qfb_main.pagination import approximate_count, paginate_keyset
+from qfb_main.search import SearchResults
+from quickfire_bulletin.db_routers import replica_reads
 
 logger = logging.getLogger(__name__)
 
-def make_api_call():
-    """
-    Makes an API call to fetch news data.
-
-    Returns:
-        Response object from the news API call.
-    """
-    api_key = os.getenv('NEWS_API_KEY')
-    url = f"https://newsdata.io/api/1/news?apikey={api_key}&country=us&language=en"
-    return requests.get(url)
-
-def fetch_news(request=None):
-    """
-    Fetches news from an API and processes the data.
-
-    Args:
-        request: HttpRequest object, optional.
-
-    Processes the fetched news data and stores it in the database.
-    """
-    response = make_api_call()
-    if response.status_code == 200:
-        try:
-            data = json.loads(response.text)
-            articles = data['results']
-            for article in articles:
-                try:
-                    pub_date_str = article.get('pubDate', None)
-                    if pub_date_str:
-                        pub_date = datetime.strptime(pub_date_str, '%Y-%m-%d %H:%M:%S')
-                        pub_date = timezone.make_aware(pub_date)
-                    slug = slugify(article['title']) + '-' + str(uuid.uuid4())[:8]
-                    doc = nlp(article.get('content', ''))
-                    sentences = [sent.text for sent in doc.sents]
-
-                    paragraphs = group_into_paragraphs(sentences, 5)
-                    formatted_content = "\n\n".join(paragraphs)
-                    news_article, created = NewsArticle.objects.update_or_create(
-                        title=article['title'],
-                        defaults={
-                            'slug': slug,
-                            'content': formatted_content,
-                            'author_id': 1,
-                            'source_id': article['source_id'],
-                            'source_priority': article['source_priority'],
-                            'category': ','.join(article['category']),
-                            'language': article['language'],
-                            'pub_date': pub_date if pub_date_str else None,
-                            'image_url': article.get('image_url', ''),
-                            'status': 1
-                        }
-                    )
-                    if request:
-                        messages.success(request, f"Article saved with ID: {news_article.id}")
-                except Exception as e:
-                    tb_str = traceback.format_exception(type(e), e, e.__traceback__)
-                    logger.error(f"Failed to save article: {e}\n{''.join(tb_str)}")
-        except KeyError:
-            logger.error(f"API response missing 'results' key: {response.text}")
-        except Exception as e:
-            tb_str = traceback.format_exception(type(e), e, e.__traceback__)
-            logger.error(f"An error occurred while processing the API response: {e}\n{''.join(tb_str)}")
-    else:
-        logger.error(f"API call failed with status code {response.status_code}: {response.text}")
-
-def group_into_paragraphs(sentences, n=5):
-    """
-    Groups sentences into paragraphs.
-
-    Args:
-        sentences: A list of sentences to group.
-        n: Number of sentences per paragraph.
-
-    Returns:
-        A list of paragraphs.
-    """
-    paragraphs = []
-    for i in range(0, len(sentences), n):
-        paragraph = " ".join(sentences[i:i+n])
-        paragraphs.append(paragraph)
-    return paragraphs
-
+@replica_reads
+@cache_page_with_holes
 def news_article_list(request):
     """
     Fetches a list of news articles from the database, paginates them, and renders 
@@ -112,14 +31,34 @@ def news_article_list(request):
     orders them by their publication date in descending order, and paginates the results with a fixed
     number of articles per page (currently set to 3).
 
+    With NEWS_LIST_PAGINATION = 'cursor', or a 'cursor' parameter, it uses keyset cursors (see qfb_main.pagination).
+    Only the summary card columns are loaded, so the article bodies are never read.
+    Comments are not loaded: each card shows the comment count and fetches the comments on demand.
+    The rendered page is cached for all visitors with the per-user parts filled in (see qfb_main.page_cache).
+
     Args:
         request: HttpRequest object containing metadata about the request.
 
     Returns:
         HttpResponse object with the rendered 'index.html' template including the paginated list of news articles,
         a flag indicating whether pagination is necessary ('is_paginated'), and the paginator's 'page_obj' for the current page.
-    """
-    articles_list = NewsArticle.objects.filter(Q(status=1)).order_by('-pub_date')
+        In cursor mode 'cursor_pagination' is set and 'approximate_total' holds a cached article count, if enabled.
+    """
+    articles_list = card_articles().filter(Q(status=1)).order_by('-pub_date')
+    cursor = request.GET.get('cursor')
+    if cursor or settings.NEWS_LIST_PAGINATION == 'cursor':
+        page_obj = paginate_keyset(articles_list, cursor, 3)
+        approximate_total = None
+        if settings.ARTICLE_COUNT_CACHE_TIMEOUT:
+            approximate_total = approximate_count(articles_list, settings.ARTICLE_COUNT_CACHE_TIMEOUT)
+        return render(request, 'index.html', {
+            'news_article_list': page_obj,
+            'is_paginated': page_obj.has_other_pages(),
+            'page_obj': page_obj,
+            'cursor_pagination': True,
+            'approximate_total': approximate_total,
+        })
+
     paginator = Paginator(articles_list, 3)  
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
@@ -131,11 +70,77 @@ def news_article_list(request):
     })
 
     
+@replica_reads
+@cache_page_with_holes
 def news_article_detail(request, id):
-    article = get_object_or_404(NewsArticle, id=id)
+    """
+    Renders a single news article to the 'news_article_detail.html' template.
+
+    The approved comments are not rendered with the page; the template fetches
+    them on demand from /comments/article/<id>/.
+
+    Args:
+        request: HttpRequest object containing metadata about the request.
+        id: Primary key of the NewsArticle to show.
+
+    Returns:
+        HttpResponse object with the rendered template, or a 404 if the article does not exist.
+    """
+    article = get_object_or_404(card_articles(full=True), id=id)
     return render(request, 'news_article_detail.html', {'article': article})
 
 
+@cache_page_with_holes(period=settings.MOST_DISCUSSED_REFRESH)
+def most_discussed(request):
+    """
+    Renders the published articles with the most comments in the last
+    MOST_DISCUSSED_HOURS hours, most first, to the 'most_discussed.html' template.
+
+    The ranking is a grouped count of the approved comments created in the window,
+    joined to NewsArticle for the status (see comments.counters.most_discussed).
+    The window moves with time, so the cached page and its ETag are renewed every
+    MOST_DISCUSSED_REFRESH seconds as well as on content changes.
+
+    Args:
+        request: HttpRequest object containing metadata about the request.
+
+    Returns:
+        HttpResponse object with the rendered template including the ranked articles ('articles')
+        and the window in hours ('hours').
+    """
+    since = timezone.now() - timedelta(hours=settings.MOST_DISCUSSED_HOURS)
+    ranked = list(rank_most_discussed(since)[:settings.MOST_DISCUSSED_LIMIT])
+    articles = card_articles().in_bulk(ranked)
+    return render(request, 'most_discussed.html', {
+        'articles': [articles[article_id] for article_id in ranked if article_id in articles],
+        'hours': settings.MOST_DISCUSSED_HOURS,
+    })
+
+
+def search_articles(request):
+    """
+    Searches published news articles and renders the ranked, highlighted and
+    paginated results to the 'search.html' template.
+
+    Args:
+        request: HttpRequest object; the search text is read from the 'q' parameter.
+
+    Returns:
+        HttpResponse object with the rendered 'search.html' template including the query,
+        the current page of results ('page_obj') and whether pagination is necessary ('is_paginated').
+    """
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        paginator = Paginator(SearchResults(query), 10)
+        page_obj = paginator.get_page(request.GET.get('page'))
+    return render(request, 'search.html', {
+        'query': query,
+        'page_obj': page_obj,
+        'is_paginated': page_obj is not None and page_obj.has_other_pages(),
+    })
+
+
 def feedback_view(request):
     """
     Handles the feedback form submission. If the request is POST and the form is valid,
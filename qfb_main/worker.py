@@ -0,0 +1,245 @@
+"""
+Background ingestion run by the news_worker command.
+
+Work is queued as IngestionJob rows. The worker enqueues a fetch every
+NEWS_WORKER_INTERVAL seconds, each delayed by a random jitter of up to
+NEWS_WORKER_JITTER seconds, and call_news --enqueue adds one on demand.
+Only the worker holding the WorkerLease runs jobs, so several workers can
+be started for redundancy and exactly one of them ingests. A job that
+fails, or finishes with failed queries or pages, is retried with
+exponential backoff up to NEWS_WORKER_MAX_ATTEMPTS times; a retry is
+cheap because everything the earlier attempt stored is skipped.
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from qfb_main.models import IngestionJob, WorkerLease
+from qfb_main.pipeline import fetch_news
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = 'news_worker'
+
+
+class IncompleteIngestion(Exception):
+    """
+    Raised when a fetch finished but some of its queries or pages failed.
+    """
+
+
+class Lease:
+    """
+    A named lock in the WorkerLease table that expires unless renewed.
+    """
+
+    def __init__(self, name=LEASE_NAME, holder=None, ttl=None):
+        self.name = name
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.ttl = timedelta(seconds=ttl or settings.NEWS_WORKER_LEASE_TTL)
+
+    def acquire(self):
+        """
+        Takes the lease if it is free or expired, or renews it if this holder
+        has it.
+
+        Returns:
+            True if this holder now has the lease.
+        """
+        now = timezone.now()
+        taken = WorkerLease.objects.filter(name=self.name).filter(
+            Q(holder=self.holder) | Q(expires_at__lt=now)
+        ).update(holder=self.holder, expires_at=now + self.ttl)
+        if taken:
+            return True
+        try:
+            with transaction.atomic():
+                WorkerLease.objects.create(name=self.name, holder=self.holder, expires_at=now + self.ttl)
+        except IntegrityError:
+            return False
+        return True
+
+    def release(self):
+        """
+        Lets another worker take the lease straight away.
+        """
+        WorkerLease.objects.filter(name=self.name, holder=self.holder).update(expires_at=timezone.now())
+
+    @contextmanager
+    def kept_alive(self):
+        """
+        Renews the lease from a background thread for as long as the block runs.
+        """
+        stop = threading.Event()
+
+        def heartbeat():
+            try:
+                while not stop.wait(self.ttl.total_seconds() / 3):
+                    if not self.acquire():
+                        logger.warning(f"Lease {self.name} was taken over while {self.holder} was running a job")
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=heartbeat, name='news-worker-lease', daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+
+def enqueue_fetch(params=None, run_after=None):
+    """
+    Queues a fetch_news run.
+
+    Args:
+        params: Keyword arguments for fetch_news, as JSON-serialisable values.
+        run_after: The earliest time the job may start; defaults to now.
+
+    Returns:
+        The new IngestionJob.
+    """
+    return IngestionJob.objects.create(params=params or {}, run_after=run_after or timezone.now())
+
+
+def schedule_due(now=None):
+    """
+    Queues the periodic fetch once the last job is NEWS_WORKER_INTERVAL
+    seconds old and nothing is waiting or running.
+
+    Returns:
+        The new IngestionJob, or None if none was due.
+    """
+    now = now or timezone.now()
+    if IngestionJob.objects.filter(state__in=('pending', 'running')).exists():
+        return None
+    last = IngestionJob.objects.order_by('-created_on').values_list('created_on', flat=True).first()
+    if last and last + timedelta(seconds=settings.NEWS_WORKER_INTERVAL) > now:
+        return None
+    jitter = timedelta(seconds=random.uniform(0, settings.NEWS_WORKER_JITTER))
+    return enqueue_fetch(run_after=now + jitter)
+
+
+def next_job(now=None):
+    """
+    Returns the pending job that has waited longest since it became due, or None.
+    """
+    return IngestionJob.objects.filter(state='pending', run_after__lte=now or timezone.now()).order_by('run_after', 'id').first()
+
+
+def backoff(attempts):
+    """
+    Returns the seconds to wait before retrying a job that failed `attempts` times.
+    """
+    return min(settings.NEWS_WORKER_BACKOFF * 2 ** (attempts - 1), settings.NEWS_WORKER_MAX_BACKOFF)
+
+
+def run_job(job):
+    """
+    Runs a job and records its outcome, rescheduling it if it should be retried.
+
+    Returns:
+        The updated IngestionJob.
+    """
+    job.state = 'running'
+    job.attempts += 1
+    job.started_on = timezone.now()
+    job.save(update_fields=['state', 'attempts', 'started_on'])
+    try:
+        stats = fetch_news(**job.params)
+        job.result = dict(stats)
+        if stats['failed']:
+            raise IncompleteIngestion(f"{stats['failed']} queries or pages failed")
+    except Exception as e:
+        job.last_error = ''.join(traceback.format_exception(type(e), e, e.__traceback__))
+        if job.attempts < settings.NEWS_WORKER_MAX_ATTEMPTS:
+            job.state = 'pending'
+            job.run_after = timezone.now() + timedelta(seconds=backoff(job.attempts))
+            logger.warning(f"Job {job.id} attempt {job.attempts} failed, retrying after {job.run_after}: {e}")
+        else:
+            job.state = 'failed'
+            job.finished_on = timezone.now()
+            logger.error(f"Job {job.id} failed after {job.attempts} attempts: {e}")
+    else:
+        job.state = 'done'
+        job.finished_on = timezone.now()
+        job.last_error = ''
+        logger.info(f"Job {job.id} done: {job.result}")
+    job.save()
+    return job
+
+
+class NewsWorker:
+    """
+    The scheduler loop of the news_worker command.
+    """
+
+    def __init__(self, lease=None, poll_interval=None):
+        self.lease = lease or Lease()
+        self.poll_interval = settings.NEWS_WORKER_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.stopping = threading.Event()
+        self.leader = False
+
+    def run_once(self):
+        """
+        Runs one scheduler tick: takes or renews the lease, queues the
+        periodic fetch if it is due and runs the next due job.
+
+        Returns:
+            The job that was run, or None.
+        """
+        close_old_connections()
+        if not self.lease.acquire():
+            if self.leader:
+                logger.warning(f"{self.lease.holder} lost the lease")
+            self.leader = False
+            return None
+        if not self.leader:
+            self.leader = True
+            # Only the lease holder runs jobs, so any job still marked as
+            # running was left behind by a worker that died.
+            recovered = IngestionJob.objects.filter(state='running').update(state='pending')
+            logger.info(f"{self.lease.holder} took the lease; {recovered} interrupted jobs requeued")
+        schedule_due()
+        job = next_job()
+        if job is None:
+            return None
+        with self.lease.kept_alive():
+            return run_job(job)
+
+    def run(self):
+        """
+        Runs ticks until stop() is called, waiting poll_interval seconds
+        whenever there was nothing to do.
+        """
+        try:
+            while not self.stopping.is_set():
+                try:
+                    job = self.run_once()
+                except Exception as e:
+                    tb_str = traceback.format_exception(type(e), e, e.__traceback__)
+                    logger.error(f"News worker tick failed: {e}\n{''.join(tb_str)}")
+                    job = None
+                if job is None:
+                    self.stopping.wait(self.poll_interval)
+        finally:
+            if self.leader:
+                self.lease.release()
+
+    def stop(self, *args):
+        """
+        Asks run() to return after the current job; usable as a signal handler.
+        """
+        self.stopping.set()
@@ -0,0 +1,72 @@
+"""
+Measures the cold start of a web worker.
+
+Run as ``python -m quickfire_bulletin.coldstart [PATH]`` in a fresh
+interpreter. It imports quickfire_bulletin.wsgi, as gunicorn does, and
+sends one GET request for PATH ('/' by default) through the WSGI
+application. It prints one JSON object with the seconds spent on each
+step and the LAZY_MODULES that got imported along the way, which should
+be none: the web process only serves pages. Add ``-X importtime``
+to the interpreter to see which imports the time went to.
+"""
+import json
+import sys
+import time
+
+# Modules a web process must not import to serve a page: those only the
+# ingestion commands and the worker need, and optional features that are
+# imported when first used.
+LAZY_MODULES = (
+    'requests', 'spacy', 'qfb_main.benchmarks', 'qfb_main.ingestion', 'qfb_main.news_feed',
+    'qfb_main.pipeline', 'qfb_main.replay', 'qfb_main.segmentation', 'qfb_main.streaming', 'qfb_main.worker',
+    'comments.write_behind',
+)
+
+
+def measure(path='/'):
+    """
+    Loads the WSGI application and serves one request for `path`.
+
+    Returns:
+        A dict with the 'import_seconds' of quickfire_bulletin.wsgi, the
+        'first_response_seconds' and their sum as 'total_seconds', the
+        response 'status' and size in 'bytes', and the 'lazy_modules'
+        that were imported.
+    """
+    from wsgiref.util import setup_testing_defaults
+
+    start = time.perf_counter()
+    from quickfire_bulletin.wsgi import application
+    loaded = time.perf_counter()
+
+    environ = {'PATH_INFO': path, 'REQUEST_METHOD': 'GET'}
+    setup_testing_defaults(environ)
+    statuses = []
+    body = b''.join(application(environ, lambda status, headers, exc_info=None: statuses.append(status)))
+    done = time.perf_counter()
+    return {
+        'import_seconds': loaded - start,
+        'first_response_seconds': done - loaded,
+        'total_seconds': done - start,
+        'status': statuses[0],
+        'bytes': len(body),
+        'lazy_modules': [name for name in LAZY_MODULES if name in sys.modules],
+    }
+
+
+def slowest_imports(importtime_output, count=10):
+    """
+    Returns the `count` imports with the most time of their own, as
+    (microseconds, module) pairs, from the stderr of ``python -X importtime``.
+    """
+    imports = []
+    for line in importtime_output.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            own, _, module = line[len('import time:'):].split('|')
+            if own.strip().isdigit():
+                imports.append((int(own), module.strip()))
+    return sorted(imports, reverse=True)[:count]
+
+
+if __name__ == '__main__':
+    print(json.dumps(measure(*sys.argv[1:2])))
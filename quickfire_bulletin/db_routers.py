@@ -1,25 +1,199 @@
-from django.db import connections
+"""
+Read routing between the primary database and its replicas.
+
+Writes, and reads by default, go to the primary ('default', configured
+from DATABASE_URL). Views wrapped in replica_reads, the article list and
+detail pages, read articles and comments from a healthy replica in
+DATABASE_REPLICAS instead. Sessions and users are always read from the
+primary, so a visitor who has just logged in is never shown as logged out.
+A replica lags the primary, so a client that has just written a comment
+gets a cookie from pin_to_primary and reads from the primary until it
+expires after REPLICA_STICKY_SECONDS. That way its own comment never
+seems to vanish. A replica whose health probe fails is left out until a
+later probe succeeds. While the primary is down, all reads go to a
+healthy replica or to DATABASE_READ_FAILOVER.
+
+Connections to every alias persist for CONN_MAX_AGE seconds, and a failed
+probe closes the probed connection so that the next use reconnects.
+"""
 import logging
+import random
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
 
 logger = logging.getLogger(__name__)
 
-class DatabaseErrorHandler:
-    def db_for_read(self, model, **hints):
+# Apps whose models replica_reads views read from a replica.
+REPLICA_APP_LABELS = ('qfb_main', 'comments')
+
+
+class DatabaseHealthMonitor:
+    """
+    Caches whether a database alias is reachable.
+
+    A healthy result is trusted for `ttl` seconds. After a failure, or once
+    the TTL has expired, the next check probes the database again. Probe
+    counts and latency are kept so the overhead can be inspected.
+    """
+
+    def __init__(self, alias='default', ttl=30):
+        self.alias = alias
+        self.ttl = ttl
+        self.healthy = None
+        self.checked_at = None
+        self.probes = 0
+        self.failures = 0
+        self.probe_seconds = 0.0
+        self.last_probe_seconds = None
+        self._lock = threading.Lock()
+
+    def is_healthy(self):
+        """
+        Returns the cached health state, probing only when it is stale or bad.
+        """
+        if self.healthy and time.monotonic() - self.checked_at < self.ttl:
+            return True
+        return self.probe()
+
+    def probe(self):
+        """
+        Checks the connection for this thread and records the result.
+        """
+        connection = connections[self.alias]
+        start = time.perf_counter()
         try:
-    
-            with connections['default'].cursor() as cursor:
-                cursor.execute("SELECT 1;")
+            # is_usable() pings on a raw cursor, so the probe never shows up
+            # in captured queries or the debug query log.
+            connection.ensure_connection()
+            healthy = connection.is_usable()
         except Exception as e:
-            logger.exception("Database error: %s", e)
-            return None 
-        return None
+            logger.exception("Database error on %s: %s", self.alias, e)
+            healthy = False
+        if not healthy and not connection.in_atomic_block:
+            # A persistent connection that went bad is reopened on next use.
+            connection.close()
+        elapsed = time.perf_counter() - start
 
-    def db_for_write(self, model, **hints):
+        with self._lock:
+            self.probes += 1
+            self.probe_seconds += elapsed
+            self.last_probe_seconds = elapsed
+            if not healthy:
+                self.failures += 1
+            self.healthy = healthy
+            self.checked_at = time.monotonic()
+        return healthy
+
+    def stats(self):
+        """
+        Returns probe counters and latency for this process.
+        """
+        return {
+            'alias': self.alias,
+            'healthy': self.healthy,
+            'probes': self.probes,
+            'failures': self.failures,
+            'probe_seconds_total': self.probe_seconds,
+            'last_probe_seconds': self.last_probe_seconds,
+        }
+
+
+# Set while a replica_reads view runs for a client that is not pinned to
+# the primary.
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_reads(view):
+    """
+    Sends the reads of a view to a replica, unless the client wrote
+    recently (see pin_to_primary).
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if settings.REPLICA_STICKY_COOKIE in request.COOKIES:
+            return view(request, *args, **kwargs)
+        token = _replica_reads.set(True)
         try:
-     
-            with connections['default'].cursor() as cursor:
-                cursor.execute("SELECT 1;")
-        except Exception as e:
-            logger.exception("Database error: %s", e)
-            return None  
+            return view(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+    return wrapper
+
+
+def pin_to_primary(view):
+    """
+    Keeps the client on the primary for REPLICA_STICKY_SECONDS after a
+    successful write through a view.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if response.status_code < 400 and settings.REPLICA_STICKY_SECONDS:
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS, httponly=True,
+                samesite='Lax',
+            )
+        return response
+    return wrapper
+
+
+class ReplicaRouter:
+    """
+    Routes the article and comment reads of replica_reads views to a
+    healthy replica, and every
+    read to a replica or DATABASE_READ_FAILOVER while the primary is
+    unreachable. Writes and migrations always go to the primary.
+    """
+
+    def __init__(self):
+        self.monitors = {}
+        self._lock = threading.Lock()
+
+    def monitor(self, alias):
+        """
+        Returns the health monitor of a database alias.
+        """
+        with self._lock:
+            if alias not in self.monitors:
+                self.monitors[alias] = DatabaseHealthMonitor(alias, ttl=settings.DATABASE_HEALTH_TTL)
+            return self.monitors[alias]
+
+    def healthy_replica(self):
+        """
+        Returns a random healthy replica alias, or None if there is none.
+        """
+        replicas = list(settings.DATABASE_REPLICAS)
+        random.shuffle(replicas)
+        for alias in replicas:
+            if self.monitor(alias).is_healthy():
+                return alias
+        return None
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and model._meta.app_label in REPLICA_APP_LABELS:
+            replica = self.healthy_replica()
+            if replica:
+                return replica
+        if settings.DATABASE_REPLICAS or settings.DATABASE_READ_FAILOVER:
+            # Only probed when there is somewhere else to read from.
+            if not self.monitor('default').is_healthy():
+                fallback = self.healthy_replica() or settings.DATABASE_READ_FAILOVER
+                if fallback:
+                    logger.warning("Default database unavailable; reading %s from %s", model.__name__, fallback)
+                    return fallback
         return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,128 @@
+"""
+Logging that keeps disk writes off the request thread.
+
+Records are passed to a QueuedFileHandler, which only puts them on an
+in-memory queue. A QueueListener thread takes them off the queue and
+writes them as one JSON object per line to a RotatingFileHandler, which
+starts a new file every LOG_MAX_BYTES. SampleFilter can keep only a share
+of the records below WARNING, so verbose loggers cost a fraction of their
+volume. When the queue is full, records are dropped and counted rather
+than blocking the request.
+
+The listener thread is started lazily in each process, so a handler
+configured before gunicorn forks its workers still writes from every
+worker.
+"""
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats a record as one line of JSON.
+    """
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class SampleFilter(logging.Filter):
+    """
+    Lets through a random `rate` share of the records below `level`, and
+    every record at or above it.
+    """
+
+    def __init__(self, rate=1.0, level='WARNING'):
+        super().__init__()
+        self.rate = float(rate)
+        self.level = logging.getLevelName(level) if isinstance(level, str) else level
+
+    def filter(self, record):
+        return record.levelno >= self.level or self.rate >= 1 or random.random() < self.rate
+
+
+class QueuedFileHandler(QueueHandler):
+    """
+    Queues records for a listener thread that writes them as JSON lines to
+    a rotating file.
+
+    Args:
+        filename: The log file; rotated copies get a .1, .2, ... suffix.
+        max_bytes: Size at which the file is rotated; 0 never rotates.
+        backup_count: Rotated copies kept.
+        queue_size: Records waiting to be written at most.
+    """
+
+    def __init__(self, filename, max_bytes=10 * 1024 * 1024, backup_count=5, queue_size=10000):
+        super().__init__(queue.Queue(queue_size))
+        self.target = RotatingFileHandler(
+            filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True,
+        )
+        self.target.setFormatter(JsonFormatter())
+        self.listener = None
+        self.dropped = 0
+        self._pid = None
+        self._start_lock = threading.Lock()
+        atexit.register(self.stop)
+
+    def start(self):
+        """
+        Starts the listener thread of this process if it is not running.
+        """
+        with self._start_lock:
+            if self._pid != os.getpid():
+                # A forked child inherits the queue but not the thread.
+                self.queue = queue.Queue(self.queue.maxsize)
+                self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+                self.listener.start()
+                self._pid = os.getpid()
+
+    def stop(self):
+        """
+        Writes out the queued records and stops the listener thread.
+        """
+        with self._start_lock:
+            if self.listener is not None and self._pid == os.getpid():
+                self.listener.stop()
+                self.target.close()
+            self.listener = None
+            self._pid = None
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # Like QueueHandler.prepare, but keeps the exception text apart from
+        # the message for JsonFormatter.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or self.target.formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
@@ -0,0 +1,284 @@
+"""
+Per-request performance instrumentation.
+
+PerfMiddleware times every request that reaches a view and counts and
+times its database queries with an execute_wrapper on each connection.
+Template rendering is timed by TimedDjangoTemplates, the template
+backend; nested renders, such as a card rendered inside a page, count
+once as part of the outer render. The timings go into the response's
+Server-Timing header and into per-view histograms kept in memory.
+
+A histogram is a count per fixed, geometrically growing bucket, so
+recording a request is one bisect, memory does not grow with traffic,
+and the histograms of several processes can be added together. Each
+process writes its histograms to PERF_STATS_DIR at most every
+PERF_FLUSH_INTERVAL seconds. manage.py perf_report merges the files and
+prints percentiles per view.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+# Upper bounds of the histogram buckets, from 0.05 to about 124,000 (ms,
+# queries or bytes), each 25% above the one before, so a percentile is off
+# by at most 25%. Larger values are reported as the largest one seen.
+BUCKETS = [0.05 * 1.25 ** i for i in range(67)]
+
+# The metrics of a request, each recorded in its own histogram.
+METRICS = ('total_ms', 'db_ms', 'queries', 'render_ms', 'bytes')
+
+
+class Histogram:
+    """
+    Counts of observed values per bucket in BUCKETS, plus one for larger values.
+    """
+
+    def __init__(self, counts=None, total=0.0, largest=0.0):
+        self.counts = counts or [0] * (len(BUCKETS) + 1)
+        self.total = total
+        self.largest = largest
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def add(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        if value > self.largest:
+            self.largest = value
+
+    def merge(self, other):
+        """
+        Adds the observations of another histogram to this one.
+        """
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+        self.total += other.total
+        self.largest = max(self.largest, other.largest)
+
+    def percentile(self, q):
+        """
+        Returns the upper bound of the bucket holding the q-th percentile,
+        capped at the largest value observed.
+        """
+        count = self.count
+        if not count:
+            return None
+        rank = q / 100 * count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                bound = BUCKETS[index] if index < len(BUCKETS) else self.largest
+                return min(bound, self.largest)
+        return self.largest
+
+    def mean(self):
+        count = self.count
+        return self.total / count if count else None
+
+    def to_dict(self):
+        return {'counts': self.counts, 'total': self.total, 'largest': self.largest}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(list(data['counts']), data['total'], data['largest'])
+
+
+class PerfRecorder:
+    """
+    Per-view histograms of this process's requests.
+    """
+
+    def __init__(self):
+        self.views = {}
+        self._lock = threading.Lock()
+        self._reset_process()
+
+    def _reset_process(self):
+        # A forked worker starts empty and writes its own file.
+        self.pid = os.getpid()
+        self.name = f"{self.pid}-{uuid.uuid4().hex[:8]}.json"
+        self.views = {}
+        self.flushed_at = time.monotonic()
+
+    def record(self, view, values):
+        """
+        Adds one request's `values`, keyed by the names in METRICS, to the
+        histograms of `view`.
+        """
+        with self._lock:
+            if self.pid != os.getpid():
+                self._reset_process()
+            histograms = self.views.get(view)
+            if histograms is None:
+                histograms = self.views[view] = {metric: Histogram() for metric in METRICS}
+            for metric, value in values.items():
+                if value is not None:
+                    histograms[metric].add(value)
+
+    def snapshot(self):
+        """
+        Returns the histograms as plain data.
+        """
+        with self._lock:
+            return {
+                view: {metric: histogram.to_dict() for metric, histogram in histograms.items()}
+                for view, histograms in self.views.items()
+            }
+
+    def flush(self, force=False):
+        """
+        Writes the histograms to PERF_STATS_DIR if PERF_FLUSH_INTERVAL has
+        passed since the last write, or if `force` is set.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if not self.views or (not force and now - self.flushed_at < settings.PERF_FLUSH_INTERVAL):
+                return
+            # Claimed under the lock, so one thread writes per interval.
+            self.flushed_at = now
+        directory = str(settings.PERF_STATS_DIR)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self.name)
+        with open(f"{path}.{threading.get_ident()}.tmp", 'w', encoding='utf-8') as stats_file:
+            json.dump(self.snapshot(), stats_file)
+        os.replace(stats_file.name, path)
+
+
+def load_stats(directory=None):
+    """
+    Returns the histograms written by every process, added together per view.
+    """
+    directory = str(directory or settings.PERF_STATS_DIR)
+    views = {}
+    if not os.path.isdir(directory):
+        return views
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(directory, name), encoding='utf-8') as stats_file:
+            data = json.load(stats_file)
+        for view, histograms in data.items():
+            merged = views.setdefault(view, {metric: Histogram() for metric in METRICS})
+            for metric, histogram in histograms.items():
+                merged[metric].merge(Histogram.from_dict(histogram))
+    return views
+
+
+recorder = PerfRecorder()
+atexit.register(lambda: recorder.flush(force=True))
+
+
+class RequestTimings:
+    """
+    Query and render timings of the request being handled.
+    """
+
+    __slots__ = ('queries', 'db_seconds', 'render_seconds', 'rendering')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+        self.rendering = False
+
+    def time_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - start
+            self.queries += 1
+
+
+_timings = ContextVar('request_timings', default=None)
+
+
+class TimedTemplate(Template):
+    """
+    A Django template whose outermost render adds to the request's render time.
+    """
+
+    def render(self, context=None, request=None):
+        timings = _timings.get()
+        if timings is None or timings.rendering:
+            return super().render(context, request)
+        timings.rendering = True
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timings.render_seconds += time.perf_counter() - start
+            timings.rendering = False
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    The Django template backend, with render times recorded by PerfMiddleware.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class PerfMiddleware:
+    """
+    Records the timings of every request that reaches a view, with
+    PERF_METRICS on, and adds a Server-Timing header with PERF_SERVER_TIMING.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.PERF_METRICS:
+            return self.get_response(request)
+        timings = RequestTimings()
+        token = _timings.set(timings)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings.time_query))
+                response = self.get_response(request)
+        finally:
+            _timings.reset(token)
+        total_ms = (time.perf_counter() - start) * 1000
+        db_ms = timings.db_seconds * 1000
+        render_ms = timings.render_seconds * 1000
+
+        if settings.PERF_SERVER_TIMING:
+            response['Server-Timing'] = (
+                f'db;dur={db_ms:.1f};desc="{timings.queries} queries", '
+                f'tpl;dur={render_ms:.1f}, total;dur={total_ms:.1f}'
+            )
+        # Static files and requests that match no URL have no view to report.
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            recorder.record(match.view_name, {
+                'total_ms': total_ms,
+                'db_ms': db_ms,
+                'queries': timings.queries,
+                'render_ms': render_ms,
+                'bytes': None if response.streaming else len(response.content),
+            })
+            recorder.flush()
+        return response
@@ -1,4 +1,5 @@
 import os
+import tempfile
 import dj_database_url
 from django.urls import reverse_lazy
 from pathlib import Path
@@ -11,6 +12,47 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 NEWS_API_KEY = os.environ.get('NEWS_API_KEY')
 
+# News feed queried by call_news (see qfb_main.news_feed); every combination
+# of the comma-separated countries, languages and categories is one query
+NEWS_API_URL = os.environ.get('NEWS_API_URL', 'https://newsdata.io/api/1/news')
+NEWS_COUNTRIES = [c for c in os.environ.get('NEWS_COUNTRIES', 'us').split(',') if c]
+NEWS_LANGUAGES = [l for l in os.environ.get('NEWS_LANGUAGES', 'en').split(',') if l]
+NEWS_CATEGORIES = [c for c in os.environ.get('NEWS_CATEGORIES', '').split(',') if c]
+# Pages followed through the nextPage cursor per query
+NEWS_MAX_PAGES = int(os.environ.get('NEWS_MAX_PAGES', 10))
+# Requests in flight at once, and seconds before one is abandoned
+NEWS_FETCH_CONCURRENCY = int(os.environ.get('NEWS_FETCH_CONCURRENCY', 4))
+NEWS_FETCH_TIMEOUT = float(os.environ.get('NEWS_FETCH_TIMEOUT', 30))
+# Articles parsed, segmented and written together; bounds ingestion memory
+INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', 100))
+# Hours before a source's newest ingested pubDate that articles are still checked for changes
+INGEST_LOOKBACK_HOURS = float(os.environ.get('INGEST_LOOKBACK_HOURS', 24))
+
+# news_worker scheduling (see qfb_main.worker): a fetch is queued every interval
+# plus up to the jitter, in seconds, and the queue is polled every poll interval
+NEWS_WORKER_INTERVAL = int(os.environ.get('NEWS_WORKER_INTERVAL', 900))
+NEWS_WORKER_JITTER = int(os.environ.get('NEWS_WORKER_JITTER', 120))
+NEWS_WORKER_POLL_INTERVAL = float(os.environ.get('NEWS_WORKER_POLL_INTERVAL', 5))
+# Seconds the single-worker lease lasts unless renewed
+NEWS_WORKER_LEASE_TTL = int(os.environ.get('NEWS_WORKER_LEASE_TTL', 300))
+# Failed jobs are retried after BACKOFF * 2**(attempt - 1) seconds, capped at MAX_BACKOFF
+NEWS_WORKER_MAX_ATTEMPTS = int(os.environ.get('NEWS_WORKER_MAX_ATTEMPTS', 5))
+NEWS_WORKER_BACKOFF = int(os.environ.get('NEWS_WORKER_BACKOFF', 60))
+NEWS_WORKER_MAX_BACKOFF = int(os.environ.get('NEWS_WORKER_MAX_BACKOFF', 3600))
+
+# Sentence segmentation used by fetch_news (see qfb_main.segmentation)
+SEGMENTATION_BACKEND = os.environ.get('SEGMENTATION_BACKEND', 'spacy')
+SPACY_MODEL = os.environ.get('SPACY_MODEL', 'en_core_web_sm')
+SPACY_COMPONENT = os.environ.get('SPACY_COMPONENT', 'senter')
+SEGMENTATION_BATCH_SIZE = int(os.environ.get('SEGMENTATION_BATCH_SIZE', 64))
+# Worker processes segmenting articles during ingestion, each with its own model
+SEGMENTATION_N_PROCESS = int(os.environ.get('SEGMENTATION_N_PROCESS', 1))
+
+# Home page pagination: 'pages' (numbered) or 'cursor' (keyset on pub_date, id)
+NEWS_LIST_PAGINATION = os.environ.get('NEWS_LIST_PAGINATION', 'pages')
+# Seconds the approximate article count shown in cursor mode is cached; 0 hides it
+ARTICLE_COUNT_CACHE_TIMEOUT = int(os.environ.get('ARTICLE_COUNT_CACHE_TIMEOUT', 300))
+
 SECRET_KEY = os.environ.get('SECRET_KEY', 'default_secret_key')
 DJANGO_ADMIN_USERNAME = os.environ.get('DJANGO_ADMIN_USERNAME')
 
@@ -33,22 +75,24 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'quickfire_bulletin.perf.PerfMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Serves static files before sessions, CSRF and auth are looked at
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
 ]
 
 ROOT_URLCONF = 'qfb_main.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates with render timing (see quickfire_bulletin.perf)
+        'BACKEND': 'quickfire_bulletin.perf.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -63,13 +107,111 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'quickfire_bulletin.wsgi.application'
+# Templates compiled when the WSGI application loads (see quickfire_bulletin.wsgi)
+PRELOAD_TEMPLATES = [
+    'index.html', 'news_article_detail.html', 'most_discussed.html', 'search.html', 'article_card.html',
+    'holes/admin_link.html', 'holes/auth_nav.html', 'holes/clock.html', 'holes/comment_form.html',
+    'holes/login_alert.html',
+]
+# Seconds from importing the WSGI application to its first response that
+# the cold start check in the test suite allows (see quickfire_bulletin.coldstart);
+# 0 skips the timing check, e.g. on slow CI machines
+COLD_START_BUDGET = float(os.environ.get('COLD_START_BUDGET', 2.0))
 
+# Seconds a database connection is reused across requests; 0 closes it after each one
+CONN_MAX_AGE = int(os.environ.get('CONN_MAX_AGE', 600))
+
+
+def read_only_database(url):
+    """
+    Returns the settings of a database that is only read from. A sqlite:///
+    URL is opened read-only, so a copy of the primary can stand in for a
+    replica locally.
+    """
+    database = dj_database_url.parse(url, conn_max_age=CONN_MAX_AGE)
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        database['NAME'] = f"file:{database['NAME']}?mode=ro"
+        database['OPTIONS'] = {'uri': True}
+    database['TEST'] = {'MIRROR': 'default'}
+    return database
+
+
+# The primary database, which takes every write
 DATABASES = {
+    'default': dj_database_url.config(default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}", conn_max_age=CONN_MAX_AGE),
+}
+if 'postgresql' in DATABASES['default']['ENGINE']:
+    DATABASES['default']['OPTIONS'] = {'connect_timeout': 5}
+
+# Comma-separated URLs of read replicas of the primary, which serve the
+# article list and detail pages (see quickfire_bulletin.db_routers)
+DATABASE_REPLICAS = []
+for index, url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(','))):
+    DATABASE_REPLICAS.append(f'replica{index}')
+    DATABASES[f'replica{index}'] = read_only_database(url.strip())
+
+# Optional database that serves reads while the primary is unreachable:
+# a replica URL, or a sqlite:/// URL of a snapshot
+DATABASE_READ_FAILOVER = None
+if os.environ.get('DATABASE_FAILOVER_URL'):
+    DATABASE_READ_FAILOVER = 'failover'
+    DATABASES['failover'] = read_only_database(os.environ['DATABASE_FAILOVER_URL'])
+
+# Pragmas set on every new SQLite connection (see quickfire_bulletin.sqlite).
+# A negative cache_size is in KiB; busy_timeout is in milliseconds.
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64000)),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+}
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+if os.environ.get('CACHE_DIR'):
+    # A file-based cache is shared by all workers on the same dyno.
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['CACHE_DIR'],
+    }
+
+# Seconds a rendered article card stays cached (see qfb_main.fragments)
+ARTICLE_CARD_CACHE_TIMEOUT = int(os.environ.get('ARTICLE_CARD_CACHE_TIMEOUT', 3600))
+# Seconds a rendered list/detail page stays cached (see qfb_main.page_cache); 0 disables it
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', 600))
+# Seconds a process reuses the content version before reading it from the database again,
+# i.e. how long writes made by other processes may take to show on cached pages
+CONTENT_VERSION_TIMEOUT = int(os.environ.get('CONTENT_VERSION_TIMEOUT', 5))
+# Comments per page of the comments JSON endpoint, by default and at most
+COMMENTS_PAGE_SIZE = int(os.environ.get('COMMENTS_PAGE_SIZE', 20))
+COMMENTS_MAX_PAGE_SIZE = int(os.environ.get('COMMENTS_MAX_PAGE_SIZE', 100))
+# Window and length of the "most discussed" list, in hours and articles
+MOST_DISCUSSED_HOURS = int(os.environ.get('MOST_DISCUSSED_HOURS', 24))
+MOST_DISCUSSED_LIMIT = int(os.environ.get('MOST_DISCUSSED_LIMIT', 10))
+# Seconds the cached "most discussed" page is reused before its window is moved on
+MOST_DISCUSSED_REFRESH = int(os.environ.get('MOST_DISCUSSED_REFRESH', 300))
+
+# Write-behind comments (see comments.write_behind): new comments are queued
+# in a local SQLite file and flushed to the database in batches
+COMMENT_WRITE_BEHIND = os.environ.get('COMMENT_WRITE_BEHIND') == 'True'
+COMMENT_QUEUE_PATH = os.environ.get('COMMENT_QUEUE_PATH', BASE_DIR / 'comment_queue.sqlite3')
+# Seconds a queue write waits for the queue's lock
+COMMENT_QUEUE_TIMEOUT = float(os.environ.get('COMMENT_QUEUE_TIMEOUT', 10))
+# Seconds between flushes, and comments written per flush transaction
+COMMENT_FLUSH_INTERVAL = float(os.environ.get('COMMENT_FLUSH_INTERVAL', 1))
+COMMENT_FLUSH_BATCH_SIZE = int(os.environ.get('COMMENT_FLUSH_BATCH_SIZE', 500))
+
+DATABASE_ROUTERS = ['quickfire_bulletin.db_routers.ReplicaRouter']
+# Seconds a successful health probe of a database is trusted for
+DATABASE_HEALTH_TTL = int(os.environ.get('DATABASE_HEALTH_TTL', 30))
+# Seconds a client reads from the primary after writing a comment, and the
+# cookie that marks it
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+REPLICA_STICKY_COOKIE = 'qfb_primary'
 
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -113,24 +255,55 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
-# Logging Configuration
+# Per-request timings and per-view histograms (see quickfire_bulletin.perf),
+# and whether responses carry them in a Server-Timing header
+PERF_METRICS = os.environ.get('PERF_METRICS', 'True') == 'True'
+PERF_SERVER_TIMING = os.environ.get('PERF_SERVER_TIMING', 'True') == 'True'
+# Where each process writes its histograms for perf_report, and how often
+PERF_STATS_DIR = os.environ.get('PERF_STATS_DIR', os.path.join(tempfile.gettempdir(), 'quickfire_bulletin_perf'))
+PERF_FLUSH_INTERVAL = float(os.environ.get('PERF_FLUSH_INTERVAL', 10))
+
+# Logging (see quickfire_bulletin.log): records are queued on the request
+# thread and written as JSON lines to a rotating file by a background thread
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'DEBUG' if DEBUG else 'INFO')
+LOG_FILE = os.environ.get('LOG_FILE', BASE_DIR / 'debug.log')
+LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', 5))
+# Share of the records below WARNING that are written
+LOG_SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', 1.0))
+# Every SQL statement is logged at DEBUG when DEBUG is on, so it is opt-in
+LOG_SQL = os.environ.get('LOG_SQL') == 'True'
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'filters': {
+        'sample': {
+            '()': 'quickfire_bulletin.log.SampleFilter',
+            'rate': LOG_SAMPLE_RATE,
+        },
+    },
     'handlers': {
         'file': {
             'level': 'DEBUG',
-            'class': 'logging.FileHandler',
-            'filename': 'debug.log',
+            'class': 'quickfire_bulletin.log.QueuedFileHandler',
+            'filename': LOG_FILE,
+            'max_bytes': LOG_MAX_BYTES,
+            'backup_count': LOG_BACKUP_COUNT,
+            'filters': ['sample'],
         },
     },
+    'root': {
+        'handlers': ['file'],
+        'level': LOG_LEVEL,
+    },
     'loggers': {
         'django': {
-            'handlers': ['file'],
-            'level': 'DEBUG',
-            'propagate': True,
+            'level': LOG_LEVEL,
+        },
+        'django.db.backends': {
+            'level': 'DEBUG' if LOG_SQL else 'WARNING',
         },
     },
-    
 }
 
@@ -0,0 +1,45 @@
+"""
+Production tuning of SQLite connections.
+
+Every new SQLite connection gets the pragmas in SQLITE_PRAGMAS. In WAL
+mode readers no longer block on the ingest writer, and it no longer
+waits for them, while synchronous=NORMAL only syncs at checkpoints. A
+power loss can then undo the last commits but never corrupts the file.
+mmap_size and cache_size keep hot pages in memory. busy_timeout lets a
+writer wait for the lock rather than fail at once with "database is
+locked". Connections live for CONN_MAX_AGE seconds, so the pragmas are
+paid once per connection instead of once per request.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# journal_mode is a property of the database file, so it is left alone on
+# connections that cannot write to it.
+FILE_PRAGMAS = ('journal_mode',)
+
+
+@receiver(connection_created)
+def apply_pragmas(sender, connection, **kwargs):
+    """
+    Sets SQLITE_PRAGMAS on a newly opened SQLite connection.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    read_only = 'mode=ro' in str(connection.settings_dict['NAME'])
+    # The raw connection keeps the pragmas out of query logs and counts.
+    for pragma, value in settings.SQLITE_PRAGMAS.items():
+        if read_only and pragma in FILE_PRAGMAS:
+            continue
+        connection.connection.execute(f"PRAGMA {pragma} = {value}")
+
+
+def pragmas(connection):
+    """
+    Returns the current value of each of SQLITE_PRAGMAS on a connection.
+    """
+    connection.ensure_connection()
+    return {
+        pragma: connection.connection.execute(f"PRAGMA {pragma}").fetchone()[0]
+        for pragma in settings.SQLITE_PRAGMAS
+    }
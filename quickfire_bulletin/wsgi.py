@@ -9,13 +9,23 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/wsgi/
 
 import os
 from django.core.wsgi import get_wsgi_application
-from whitenoise import WhiteNoise
 
 # Set the default Django settings
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'quickfire_bulletin.settings')
 
-# Get the base application
+# Get the base application; static files are served by WhiteNoiseMiddleware
 application = get_wsgi_application()
 
-# Use WhiteNoise for serving static files
-application = WhiteNoise(application)
+from django.conf import settings  # noqa: E402
+from django.db import connections  # noqa: E402
+from django.template.loader import get_template  # noqa: E402
+from django.urls import reverse  # noqa: E402
+
+# Import every view and compile the page templates now rather than on the
+# first request. Under gunicorn --preload (see gunicorn.conf.py) this runs
+# once in the master, and the forked workers share the result.
+reverse('home')
+for template_name in settings.PRELOAD_TEMPLATES:
+    get_template(template_name)
+# Workers must not inherit the master's database connections.
+connections.close_all()
@@ -1,25 +1,144 @@
 document.addEventListener("DOMContentLoaded", () => {
-    document.querySelectorAll(".user-feedback").forEach((form) => {
-        form.addEventListener("submit", function (event) {
-            event.preventDefault();
-            const formData = new FormData(this);
-            const commentId = formData.get("comment_id") || null;
-            const articleId = formData.get("article_id") || null;
-            const url = commentId ? `/comments/edit_comment/${commentId}/` : (articleId ? `/comments/add_comment/${articleId}/` : "/comments/add_comment/");
-            sendAjaxRequest(url, formData);
-        });
+    // Forms and buttons inside comment lists are added after the page loads,
+    // so their events are handled here rather than bound one by one.
+    document.addEventListener("submit", (event) => {
+        const form = event.target.closest(".user-feedback");
+        if (!form) {
+            return;
+        }
+        event.preventDefault();
+        const formData = new FormData(form);
+        const commentId = formData.get("comment_id") || null;
+        const articleId = formData.get("article_id") || null;
+        const url = commentId ? `/comments/edit_comment/${commentId}/` : (articleId ? `/comments/add_comment/${articleId}/` : "/comments/add_comment/");
+        sendAjaxRequest(url, formData);
     });
 
-    document.querySelectorAll(".delete-comment-btn").forEach(button => {
-        button.addEventListener('click', function (event) {
+    document.addEventListener("click", (event) => {
+        const deleteButton = event.target.closest(".delete-comment-btn");
+        if (deleteButton) {
             event.preventDefault();
-            const commentId = this.getAttribute('data-comment-id');
-            const url = `/comments/delete_comment/${commentId}/`;
-            sendAjaxRequest(url, new FormData());
-        });
+            if (!confirm("Are you sure?")) {
+                return;
+            }
+            const commentId = deleteButton.getAttribute("data-comment-id");
+            sendAjaxRequest(`/comments/delete_comment/${commentId}/`, new FormData());
+            return;
+        }
+        const loadButton = event.target.closest(".load-comments-btn");
+        if (loadButton) {
+            event.preventDefault();
+            loadComments(loadButton.closest(".comments-section"));
+        }
+    });
+
+    document.querySelectorAll(".comments-section[data-autoload]").forEach((section) => {
+        if (section.querySelector(".load-comments-btn")) {
+            loadComments(section);
+        }
     });
 });
 
+function loadComments(section) {
+    // Fetches the next page of an article's comments and appends it.
+    const button = section.querySelector(".load-comments-btn");
+    const list = section.querySelector(".comment-list");
+    const url = new URL(section.getAttribute("data-comments-url"), window.location.origin);
+    const cursor = section.getAttribute("data-next-cursor");
+    if (cursor) {
+        url.searchParams.set("cursor", cursor);
+    }
+    button.disabled = true;
+
+    fetch(url, { headers: { "Accept": "application/json" } })
+        .then((response) => {
+            if (!response.ok) {
+                throw new Error('Network response was not ok');
+            }
+            return response.json();
+        })
+        .then((data) => {
+            data.comments.forEach((comment) => list.appendChild(renderComment(comment)));
+            if (data.next_cursor) {
+                section.setAttribute("data-next-cursor", data.next_cursor);
+                button.textContent = "Show more comments";
+                button.disabled = false;
+            } else {
+                button.remove();
+            }
+        })
+        .catch((error) => {
+            console.error("Error:", error);
+            button.disabled = false;
+        });
+}
+
+function renderComment(comment) {
+    // Builds the markup the card used to render for each comment. Text is
+    // only ever assigned through textContent, so it needs no escaping.
+    const element = document.createElement("div");
+    element.className = "comment mb-2";
+    element.id = `comment-${comment.id}`;
+
+    const name = document.createElement("strong");
+    name.textContent = comment.name;
+    const content = document.createElement("p");
+    content.id = `comment-content-${comment.id}`;
+    content.textContent = comment.content;
+    const created = document.createElement("small");
+    created.className = "text-muted";
+    created.textContent = new Date(comment.created_on).toLocaleString();
+    element.append(name, content, created);
+
+    if (comment.own) {
+        const actions = document.createElement("div");
+        actions.className = "mt-2";
+        const edit = button("Edit", "btn btn-sm btn-secondary");
+        edit.addEventListener("click", () => showEditForm(comment.id));
+        const remove = button("Delete", "delete-comment-btn btn btn-sm btn-danger");
+        remove.setAttribute("data-comment-id", comment.id);
+        actions.append(edit, remove);
+
+        const editForm = document.createElement("div");
+        editForm.className = "edit-comment-form mt-2";
+        editForm.id = `edit-form-${comment.id}`;
+        editForm.style.display = "none";
+        const form = document.createElement("form");
+        form.className = "user-feedback";
+        form.method = "POST";
+        const commentId = document.createElement("input");
+        commentId.type = "hidden";
+        commentId.name = "comment_id";
+        commentId.value = comment.id;
+        const text = document.createElement("textarea");
+        text.className = "form-control";
+        text.name = "comment_content";
+        text.required = true;
+        text.value = comment.content;
+        const formButtons = document.createElement("div");
+        formButtons.className = "mt-2";
+        const save = button("Save changes", "btn btn-dark btn-sm");
+        save.type = "submit";
+        const cancel = button("Cancel", "btn btn-secondary btn-sm");
+        cancel.addEventListener("click", () => hideEditForm(comment.id));
+        formButtons.append(save, cancel);
+        form.append(commentId, text, formButtons);
+        editForm.appendChild(form);
+        element.append(actions, editForm);
+    }
+
+    element.appendChild(document.createElement("hr"));
+    return element;
+}
+
+function button(label, className) {
+    const element = document.createElement("button");
+    element.type = "button";
+    element.className = className;
+    element.textContent = label;
+    return element;
+}
+
 function sendAjaxRequest(url, formData) {
     const csrftoken = getCookie("csrftoken");
     const headers = {
@@ -41,11 +160,14 @@ function sendAjaxRequest(url, formData) {
             return response.json();
         })
         .then((data) => {
+            // Only success, message and error are read. The comment_id of a new
+            // comment is a number, or a string when comments are queued
+            // (COMMENT_WRITE_BEHIND), so it must not be relied on here.
             if (data.success) {
                 alert(data.message || "Operation successful.");
-                window.location.reload(); 
+                window.location.reload();
             } else {
-              
+
                 alert("Error: " + (data.error || "An unexpected error occurred."));
             }
         })